@@ -1,8 +1,14 @@
 const IMAGE_BASE_URL = 'https://raw.githubusercontent.com/jeembob/Room-Mavens/main/images';
+const RENDITION_BASE_URL = 'https://raw.githubusercontent.com/jeembob/Room-Mavens/main/renditions';
 
-let cardNameToCharacter = {};
-let normalizedToOriginal = {};
+// Built by tools/card_manifest.py: normalized names, their [character, filename]
+// targets and a BK-tree over the names for fuzzy matching
+let cardIndex = { max_distance: 2, names: [], targets: [], bktree: null };
+let normalizedToIndex = new Map();
 let itemCardsByImageId = {};
+// "Character/card" -> [{format, width, path}] from tools/image_renditions.py,
+// preferred format first and ordered by width within a format
+let cardRenditions = {};
 
 
 function normalizeForMatch(name) {
@@ -31,36 +37,31 @@ function levenshtein(a, b) {
   return matrix[b.length][a.length];
 }
 
+// Walk the BK-tree: a child at edge distance e can only hold names within
+// maxDistance of the query when |e - d| <= maxDistance
 function findClosestMatch(normalized) {
-  let bestMatch = null;
-  let bestDistance = Infinity;
-  for (const key of Object.keys(normalizedToOriginal)) {
-    const dist = levenshtein(normalized, key);
-    if (dist < bestDistance && dist <= 2) {
+  const maxDistance = cardIndex.max_distance;
+  let best = -1;
+  let bestDistance = maxDistance + 1;
+  const stack = cardIndex.bktree ? [cardIndex.bktree] : [];
+  while (stack.length) {
+    const [index, children] = stack.pop();
+    const dist = levenshtein(normalized, cardIndex.names[index]);
+    if (dist < bestDistance || (dist === bestDistance && index < best)) {
       bestDistance = dist;
-      bestMatch = key;
+      best = index;
     }
-  }
-  return bestMatch ? normalizedToOriginal[bestMatch] : null;
-}
-
-function buildCardLookup(manifest) {
-  for (const [character, cards] of Object.entries(manifest)) {
-    for (const cardName of cards) {
-      cardNameToCharacter[cardName] = character;
-      const normalized = normalizeForMatch(cardName);
-      normalizedToOriginal[normalized] = cardName;
+    const radius = Math.min(maxDistance, bestDistance);
+    for (const [edge, child] of Object.entries(children)) {
+      if (Math.abs(edge - dist) <= radius) stack.push(child);
     }
   }
+  return best >= 0 ? best : null;
 }
 
-function buildItemCardLookup(itemCards) {
-  for (const item of itemCards) {
-    const match = item.image_url.match(/\/(\d+)\.image\.webp$/);
-    if (match) {
-      itemCardsByImageId[match[1]] = item;
-    }
-  }
+function loadCardIndex(index) {
+  cardIndex = index;
+  normalizedToIndex = new Map(index.names.map((name, i) => [name, i]));
 }
 
 function findCardName(svgElement) {
@@ -70,13 +71,14 @@ function findCardName(svgElement) {
     if (!text) continue;
     const normalized = normalizeForMatch(text);
     // Try exact match first
-    let originalFilename = normalizedToOriginal[normalized];
+    let index = normalizedToIndex.get(normalized);
     // Fall back to fuzzy match (within 2 edits)
-    if (!originalFilename) {
-      originalFilename = findClosestMatch(normalized);
+    if (index === undefined) {
+      index = findClosestMatch(normalized);
     }
-    if (originalFilename) {
-      return { displayName: text, filename: originalFilename };
+    if (index !== null) {
+      const [character, filename] = cardIndex.targets[index];
+      return { displayName: text, character, filename };
     }
   }
   return null;
@@ -89,14 +91,39 @@ function isCardSvg(svgElement) {
   return href && href.includes('/public/images/byid/');
 }
 
+// Card width in CSS pixels. Before layout the bounding box is 0 wide, so fall
+// back to the SVG's width attribute (when it's in pixels), then its viewBox;
+// Infinity (the largest rendition) if neither is known
+function cardDisplayWidth(svgElement) {
+  const rectWidth = svgElement.getBoundingClientRect().width;
+  if (rectWidth > 0) return rectWidth;
+  const widthAttr = svgElement.getAttribute('width') || '';
+  if (/^\s*[\d.]+(px)?\s*$/.test(widthAttr) && parseFloat(widthAttr) > 0) return parseFloat(widthAttr);
+  const viewBox = svgElement.viewBox && svgElement.viewBox.baseVal;
+  if (viewBox && viewBox.width > 0) return viewBox.width;
+  return Infinity;
+}
+
+// Smallest rendition in the preferred format that covers the card's on-screen
+// width in device pixels; falls back to the original JPEG
+function cardImageUrl(cardInfo, svgElement) {
+  const renditions = cardRenditions[`${cardInfo.character}/${cardInfo.filename}`];
+  if (!renditions || renditions.length === 0) {
+    return `${IMAGE_BASE_URL}/${cardInfo.character}/${cardInfo.filename}.jpeg`;
+  }
+  const needed = cardDisplayWidth(svgElement) * (window.devicePixelRatio || 1);
+  const preferred = renditions.filter(r => r.format === renditions[0].format);
+  const rendition = preferred.find(r => r.width >= needed) || preferred[preferred.length - 1];
+  return `${RENDITION_BASE_URL}/${rendition.path}`;
+}
+
 function processCard(svgElement) {
   if (!isCardSvg(svgElement)) return;
 
   const cardInfo = findCardName(svgElement);
   if (!cardInfo) return;
 
-  const character = cardNameToCharacter[cardInfo.filename];
-  const newImageUrl = `${IMAGE_BASE_URL}/${character}/${cardInfo.filename}.jpeg`;
+  const newImageUrl = cardImageUrl(cardInfo, svgElement);
 
   const imageEl = svgElement.querySelector('image');
   const currentHref = imageEl.getAttribute('href') || imageEl.getAttribute('xlink:href');
@@ -279,16 +306,27 @@ async function init() {
     return;
   }
 
-  // Load ability cards manifest
-  const response = await fetch(chrome.runtime.getURL('cards.json'));
-  const manifest = await response.json();
-  buildCardLookup(manifest);
-  console.log('[Card Injector] Loaded ability cards:', Object.keys(manifest).length, 'characters');
+  // Load ability card lookup index
+  const response = await fetch(chrome.runtime.getURL('cards-index.json'));
+  loadCardIndex(await response.json());
+  console.log('[Card Injector] Loaded ability cards:', cardIndex.names.length, 'cards');
+
+  // Renditions are optional: without them cards use the full-size JPEGs
+  try {
+    const renditionResponse = await fetch(chrome.runtime.getURL('card-renditions.json'));
+    const renditionData = await renditionResponse.json();
+    // Rows of [format, width, path] (renditionData.fields)
+    for (const [card, rows] of Object.entries(renditionData.cards || {})) {
+      cardRenditions[card] = rows.map(([format, width, path]) => ({ format, width, path }));
+    }
+  } catch (e) {
+    console.log('[Card Injector] No card renditions, using full-size images');
+  }
 
-  // Load item cards manifest
-  const itemResponse = await fetch(chrome.runtime.getURL('itemcards.json'));
+  // Load item cards manifest (already keyed by image id; see tools/item-scanner/item_manifest.py)
+  const itemResponse = await fetch(chrome.runtime.getURL('itemcards.min.json'));
   const itemData = await itemResponse.json();
-  buildItemCardLookup(itemData.items || []);
+  itemCardsByImageId = itemData.items || {};
   console.log('[Card Injector] Loaded item cards:', Object.keys(itemCardsByImageId).length, 'items');
   
   processAllCards();
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark card name lookups as the number of cards grows.
+
+Builds synthetic card names from the words in the real manifest, then times
+fuzzy lookups (queries 1-2 edits away from a card, plus misses) with the old
+linear Levenshtein scan from content.js and with the BK-tree from
+card_manifest.build_index. Also times a cold vs cached scan of images/.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from card_manifest import (IMAGES_DIR, MANIFEST_FILE, MAX_DISTANCE, BKTree, build_index, levenshtein,
+                           scan_images)
+
+
+def linear_closest(names: list[str], query: str, max_distance: int = MAX_DISTANCE):
+    """The old findClosestMatch: first name with the smallest distance <= max_distance."""
+    best, best_distance = None, max_distance + 1
+    for i, name in enumerate(names):
+        distance = levenshtein(query, name)
+        if distance < best_distance:
+            best, best_distance = i, distance
+    return best
+
+
+def synthetic_cards(count: int, words: list[str], rng: random.Random) -> dict:
+    cards = {}
+    seen = set()
+    while len(seen) < count:
+        name = "-".join(rng.choice(words) for _ in range(rng.randint(2, 3)))
+        if name not in seen:
+            seen.add(name)
+            cards.setdefault(f"Character {len(seen) % 30}", []).append(name)
+    return cards
+
+
+def mutate(name: str, edits: int, rng: random.Random) -> str:
+    chars = list(name)
+    for _ in range(edits):
+        position = rng.randrange(len(chars))
+        op = rng.choice(("delete", "replace", "insert"))
+        if op == "delete" and len(chars) > 1:
+            del chars[position]
+        elif op == "replace":
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        else:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(chars)
+
+
+def time_lookups(lookup, queries: list[str]) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [lookup(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def bench_lookups(sizes: list[int], queries_per_size: int, seed: int) -> list[dict]:
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        real = json.load(f)
+    words = sorted({word for names in real.values() for name in names for word in name.split("-")})
+
+    rows = []
+    print(f"{'cards':>7} {'build':>9} {'index KB':>9} {'linear/query':>13} {'bktree/query':>13} {'speedup':>8}")
+    for size in sizes:
+        rng = random.Random(seed)
+        cards = synthetic_cards(size, words, rng)
+
+        start = time.perf_counter()
+        index = build_index(cards)
+        build_time = time.perf_counter() - start
+        index_kb = len(json.dumps(index, separators=(',', ':'))) / 1024
+
+        names = index["names"]
+        tree = BKTree.from_json(names, index["bktree"])
+        queries = [mutate(rng.choice(names), rng.randint(0, 2), rng) for _ in range(queries_per_size)]
+
+        linear_time, expected = time_lookups(lambda q: linear_closest(names, q), queries)
+        tree_time, actual = time_lookups(tree.closest, queries)
+        assert actual == expected, "BK-tree and linear scan disagree"
+
+        rows.append({"cards": len(names), "build_s": build_time, "index_kb": index_kb,
+                     "linear_ms": linear_time * 1000, "bktree_ms": tree_time * 1000})
+        print(f"{len(names):>7} {build_time:>8.2f}s {index_kb:>9.1f} {linear_time * 1000:>11.2f}ms "
+              f"{tree_time * 1000:>11.2f}ms {linear_time / tree_time:>7.1f}x")
+    return rows
+
+
+def bench_scan(repeats: int = 5) -> None:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        _, cache, _ = scan_images(IMAGES_DIR, {})
+    cold = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        scan_images(IMAGES_DIR, cache)
+    cached = (time.perf_counter() - start) / repeats
+
+    print(f"\nScan images/: {cold * 1000:.2f}ms cold, {cached * 1000:.2f}ms with stat cache")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark linear vs BK-tree card name lookup")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[174, 1000, 2000, 5000])
+    parser.add_argument("--queries", type=int, default=30, help="Lookups per size (default: 30)")
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    bench_lookups(args.sizes, args.queries, args.seed)
+    bench_scan()
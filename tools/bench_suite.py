@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the card and item tooling hot paths.
+
+Cases:
+    manifest.*      build_manifest (what generate_cards_manifest runs) over
+                    synthetic images/ trees of 10^2..10^5 files, cold and
+                    with the stat cache, plus the lookup index build
+    ocr.*           load_crops (decode + crop) and extract_card_data with OCR
+                    stubbed out, with the template engine and, when EasyOCR
+                    is installed, with EasyOCR
+    links.*         download_all.parse_linksandnames
+    urls.*          the URL-to-filename logic of extract_images
+                    (scraper.image_filename) and scrape_items
+                    (item_scraper.build_item) over HTML fixtures fetched
+                    from a local HTTP server
+    hashes.*        image_hashes: batch dHash/pHash of real card images, and
+                    the all-pairs near-duplicate search (multi-index hash
+                    table vs. a blockwise linear scan) over synthetic hashes
+
+Results are written as JSON (default: tools/bench-results/<commit>.json)
+with the commit, machine and per-case timings, so runs can be compared:
+
+    python bench_suite.py --compare bench-results/<old>.json
+"""
+
+import argparse
+import contextlib
+import html.parser
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS_DIR / "card-scanner"))
+sys.path.insert(0, str(TOOLS_DIR / "item-scanner"))
+
+from bench_card_manifest import synthetic_cards
+from bench_downloads import serve_directory
+from card_manifest import IMAGES_DIR, MANIFEST_FILE, REPO_ROOT, build_index, build_manifest
+
+RESULTS_DIR = TOOLS_DIR / "bench-results"
+MANIFEST_SIZES = (100, 1000, 10000, 100000)
+MAX_INDEX_SIZE = 10000
+OCR_SAMPLE = 20
+HASH_SIZES = (1000, 10000, 50000)
+MAX_LINEAR_HASHES = 10000
+
+CASES = []
+
+
+def case(fn):
+    """Register a benchmark case; it yields result dicts from measure()."""
+    CASES.append(fn)
+    return fn
+
+
+def measure(name: str, fn, params: dict = None, repeat: int = 5, number: int = 1, setup=None) -> dict:
+    """
+    Time fn() `number` times per round for `repeat` rounds.
+
+    Args:
+        name: Case name
+        fn: Callable to time
+        params: Parameters recorded alongside the timings
+        repeat: Rounds
+        number: Calls per round
+        setup: Called (untimed) before every round
+
+    Returns:
+        Result dict with per-call min/median/mean/stdev in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    result = {
+        "name": name,
+        "params": params or {},
+        "unit": "s",
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+    print(f"  {name:<36} {json.dumps(params or {}):<28} median {result['median'] * 1000:>10.3f}ms")
+    return result
+
+
+def skipped(name: str, reason: str) -> dict:
+    print(f"  {name:<36} skipped: {reason}")
+    return {"name": name, "params": {}, "skipped": reason}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the tools' progress prints while timing them."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def make_tree(root: Path, count: int, rng: random.Random) -> dict:
+    """Create count empty card images in character folders like images/."""
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        real = json.load(f)
+    words = sorted({word for names in real.values() for name in names for word in name.split("-")})
+    cards = synthetic_cards(count, words, rng)
+    for character, names in cards.items():
+        folder = root / character
+        folder.mkdir(parents=True)
+        for name in names:
+            (folder / f"{name}.jpeg").touch()
+    return cards
+
+
+@case
+def bench_manifest(args):
+    for size in args.manifest_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            images_dir = tmp / "images"
+            cards = make_tree(images_dir, size, random.Random(size))
+            paths = {"images_dir": images_dir, "manifest_file": tmp / "cards.json", "index_file": None,
+                     "stat_cache_file": tmp / "stat-cache.json"}
+            repeat = 3 if size >= 10000 else 5
+
+            def cold():
+                with quiet():
+                    build_manifest(force=True, **paths)
+
+            def warm():
+                with quiet():
+                    build_manifest(**paths)
+
+            yield measure("manifest.build_cold", cold, {"images": size}, repeat=repeat)
+            warm()
+            yield measure("manifest.build_cached", warm, {"images": size}, repeat=repeat)
+            if size <= args.max_index_size:
+                yield measure("manifest.build_index", lambda: build_index(cards), {"images": size}, repeat=1)
+
+
+@case
+def bench_ocr(args):
+    import ocr_scan
+
+    images = sorted(p for folder in IMAGES_DIR.iterdir() if folder.is_dir() and folder.name != "Items"
+                    for p in folder.glob("*.jpeg"))[:args.ocr_sample]
+    params = {"cards": len(images)}
+
+    def per_card(fn):
+        return lambda: [fn(str(path)) for path in images]
+
+    yield measure("ocr.load_crops", per_card(ocr_scan.load_crops), params, repeat=3)
+
+    real_recognize = ocr_scan.recognize_digits
+    ocr_scan.recognize_digits = lambda crops, kind, engine="easyocr": [""] * len(crops)
+    try:
+        yield measure("ocr.extract_card_data", per_card(ocr_scan.extract_card_data),
+                      {**params, "ocr": "stubbed"}, repeat=3)
+    finally:
+        ocr_scan.recognize_digits = real_recognize
+
+    ocr_scan.get_templates()
+    yield measure("ocr.extract_card_data", per_card(lambda p: ocr_scan.extract_card_data(p, "template")),
+                  {**params, "ocr": "template"}, repeat=3)
+
+    try:
+        ocr_scan.get_reader()
+    except ImportError as e:
+        yield skipped("ocr.extract_card_data[easyocr]", str(e))
+        return
+    yield measure("ocr.extract_card_data", per_card(lambda p: ocr_scan.extract_card_data(p, "easyocr")),
+                  {**params, "ocr": "easyocr"}, repeat=3)
+
+
+@case
+def bench_links(args):
+    from download_all import parse_linksandnames
+
+    real = TOOLS_DIR / "card-scanner" / "linksandnames.md"
+    yield measure("links.parse_linksandnames", lambda: parse_linksandnames(real), {"lines": "real"},
+                  repeat=20, number=100)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "linksandnames.md"
+        lines = ["Folder name (charachter name), URL link last part"]
+        lines += [f"Character {i}, C{i}" for i in range(10000)]
+        path.write_text("\n".join(lines) + "\n")
+        yield measure("links.parse_linksandnames", lambda: parse_linksandnames(path), {"lines": 10000},
+                      repeat=10)
+
+
+class AttributeCollector(html.parser.HTMLParser):
+    """Collect one attribute of every matching start tag."""
+
+    def __init__(self, tag: str, attribute: str):
+        super().__init__()
+        self.tag = tag
+        self.attribute = attribute
+        self.values = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == self.tag:
+            value = dict(attrs).get(self.attribute)
+            if value:
+                self.values.append(value)
+
+
+def card_page(count: int) -> str:
+    """A character page fixture: count card <img>s like gloomhavencards.com renders."""
+    images = sorted(p for p in IMAGES_DIR.rglob("*.jpeg"))
+    cards = [
+        f'<div class="card-img"><img src="/images/{images[i % len(images)].parent.name}/'
+        f'{i:05d}-{images[i % len(images)].name}?v=2"></div>'
+        for i in range(count)
+    ]
+    return "<!DOCTYPE html><html><body>" + "\n".join(cards) + "</body></html>"
+
+
+@case
+def bench_urls(args):
+    import requests
+    from scraper import image_filename
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "cards.html").write_text(card_page(1000))
+        shop = None
+        try:
+            from bench_item_scraper import build_shop_page
+            (tmp / "shop.html").write_text(build_shop_page(REPO_ROOT / "extension" / "itemcards.json"))
+            shop = True
+        except ImportError as e:
+            shop = str(e)
+
+        server = serve_directory(tmp)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            collector = AttributeCollector("img", "src")
+            collector.feed(requests.get(f"{base_url}/cards.html", timeout=30).text)
+            image_urls = [base_url + src for src in collector.values]
+            yield measure("urls.image_filename", lambda: [image_filename(u, i) for i, u in enumerate(image_urls)],
+                          {"urls": len(image_urls)}, repeat=10, number=10)
+
+            if shop is not True:
+                yield skipped("urls.build_item", shop)
+                return
+            from item_scraper import build_item
+
+            page = requests.get(f"{base_url}/shop.html", timeout=30).text
+            cards = shop_cards(page)
+            yield measure("urls.build_item", lambda: [build_item(i, c, base_url) for i, c in enumerate(cards)],
+                          {"cards": len(cards)}, repeat=10, number=10)
+        finally:
+            server.shutdown()
+
+
+def shop_cards(page: str) -> list[dict]:
+    """The fields EXTRACT_CARDS_JS returns, read from static shop HTML."""
+    class ShopParser(html.parser.HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.cards = []
+            self.field = None
+
+        def handle_starttag(self, tag, attrs):
+            attrs = dict(attrs)
+            if tag == "div" and "overlay-card" in (attrs.get("class") or "").split():
+                self.cards.append({"name": None, "cost": None, "code": None, "equip_slot_svg": None,
+                                   "image_href": None})
+            elif tag == "p" and self.cards:
+                self.field = attrs.get("class")
+            elif tag == "image" and self.cards:
+                self.cards[-1]["image_href"] = attrs.get("href")
+
+        def handle_data(self, data):
+            if self.field in ("name", "cost", "code"):
+                self.cards[-1][self.field] = data
+
+        def handle_endtag(self, tag):
+            self.field = None
+
+    parser = ShopParser()
+    parser.feed(page)
+    return parser.cards
+
+
+def synthetic_hashes(count: int, seed: int):
+    """count random 256 bit hashes, 5% of them copies of another with up to 12 bits flipped."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 256, (count, 32), dtype=np.uint8)
+    for source, target in rng.integers(0, count, (count // 20, 2)):
+        bits = np.unpackbits(hashes[source])
+        bits[rng.choice(bits.size, rng.integers(0, 13), replace=False)] ^= 1
+        hashes[target] = np.packbits(bits)
+    return hashes
+
+
+@case
+def bench_hashes(args):
+    import numpy as np
+    from image_hashes import DEFAULT_MAX_DISTANCE, MultiIndexHash, hamming, hash_files
+
+    images = sorted(str(p) for folder in IMAGES_DIR.iterdir() if folder.is_dir() and folder.name != "Items"
+                    for p in folder.glob("*.jpeg"))
+    yield measure("hashes.hash_files", lambda: hash_files(images), {"images": len(images)}, repeat=3)
+
+    def linear_pairs(hashes):
+        found = 0
+        for start in range(0, len(hashes), 256):
+            block = hamming(hashes[start:start + 256, None], hashes[None, :])
+            rows, cols = np.nonzero(block <= DEFAULT_MAX_DISTANCE)
+            found += int(np.count_nonzero(cols > rows + start))
+        return found
+
+    for size in args.hash_sizes:
+        hashes = synthetic_hashes(size, size)
+        params = {"hashes": size, "max_distance": DEFAULT_MAX_DISTANCE}
+        yield measure("hashes.pairs_mih", lambda: MultiIndexHash(hashes).pairs(), params, repeat=3)
+        if size <= args.max_linear_hashes:
+            yield measure("hashes.pairs_linear", lambda: linear_pairs(hashes), params, repeat=1)
+
+
+def git_commit() -> tuple[str, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def compare(results: list[dict], baseline_file: Path) -> None:
+    """Print each case's median next to the baseline run's."""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"] if "median" in r}
+
+    print(f"\nCompared with {baseline['commit'][:10]} ({baseline_file}):")
+    for r in results:
+        before = old.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if "median" not in r or before is None:
+            continue
+        ratio = r["median"] / before["median"] if before["median"] else float("inf")
+        print(f"  {r['name']:<36} {json.dumps(r['params']):<28} "
+              f"{before['median'] * 1000:>10.3f}ms -> {r['median'] * 1000:>10.3f}ms  x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the card and item tooling hot paths")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("-o", "--output", type=Path, help="Results JSON (default: bench-results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--manifest-sizes", type=int, nargs="+", default=list(MANIFEST_SIZES))
+    parser.add_argument("--max-index-size", type=int, default=MAX_INDEX_SIZE,
+                        help=f"Largest tree to time the lookup index build on (default: {MAX_INDEX_SIZE})")
+    parser.add_argument("--hash-sizes", type=int, nargs="+", default=list(HASH_SIZES))
+    parser.add_argument("--max-linear-hashes", type=int, default=MAX_LINEAR_HASHES,
+                        help=f"Largest hash set to time the linear all-pairs scan on (default: {MAX_LINEAR_HASHES})")
+    parser.add_argument("--ocr-sample", type=int, default=OCR_SAMPLE, help=f"Cards per OCR round (default: {OCR_SAMPLE})")
+
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    results = []
+    for fn in CASES:
+        if args.filter in fn.__name__:
+            print(fn.__name__)
+            results.extend(fn(args))
+
+    output = args.output or RESULTS_DIR / f"{commit[:10]}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Build the card browser's per-character data bundles from the OCR output.
+
+Inputs:
+    extension/cards.json               which cards each character has (the card manifest)
+    tools/card-browser/data/<C>.csv    initiative and level per card, from ocr_scan.py
+    tools/card-browser/card-data.csv   hand-entered corrections; they win over OCR
+    tools/card-browser/x-cards.csv     cards whose level is the "X" glyph (character, card_name)
+
+Outputs, next to the CSVs:
+    data/index.json   {"version", "fields", "characters": [{"name", "bundle", "cards", "inputs"}]}
+    data/<C>.json     {"version", "character", "cards": [[file, initiative, level], ...]}
+
+Cards are stored as rows in the order given by "fields" and are already
+sorted by level, then initiative, so card-browser.html only fetches the
+character being viewed and renders it as is. Level "X" cards sort right
+after level 1 (they're picked alongside the level 1 cards). ocr_scan.py
+can't read the X glyph, so a card is only level X if a correction or
+x-cards.csv says so; any other level the OCR couldn't read sorts last.
+
+Generation is incremental: every character's entry in index.json records a
+hash of its inputs, and its bundle is only rebuilt when that hash changed.
+
+The browser fetches the bundles, so serve the repo over HTTP
+(python -m http.server) rather than opening the page from disk.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+from card_manifest import write_if_changed
+
+BROWSER_DIR = Path(__file__).parent
+REPO_ROOT = BROWSER_DIR.parent.parent
+MANIFEST_FILE = REPO_ROOT / "extension" / "cards.json"
+DATA_DIR = BROWSER_DIR / "data"
+CORRECTIONS_FILE = BROWSER_DIR / "card-data.csv"
+X_CARDS_FILE = BROWSER_DIR / "x-cards.csv"
+INDEX_FILE = DATA_DIR / "index.json"
+
+BUNDLE_VERSION = 1
+FIELDS = ["file", "initiative", "level"]
+X_LEVEL = "X"
+
+
+def parse_level(value: str):
+    """CSV level column to 1-9, "X", or None when empty/unreadable."""
+    value = (value or "").strip()
+    if value.upper() == X_LEVEL:
+        return X_LEVEL
+    return int(value) if value.isdigit() else None
+
+
+def parse_initiative(value: str):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def read_rows(csv_file: Path) -> list[dict]:
+    """Rows of an ocr_scan.py style CSV (card_name, initiative, level, file); [] if missing."""
+    try:
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            return list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+
+
+def read_corrections(csv_file: Path = CORRECTIONS_FILE) -> dict:
+    """
+    Hand-entered rows grouped by character (taken from the file column).
+
+    Returns:
+        {character: {card_name: row}}
+    """
+    corrections = {}
+    for row in read_rows(csv_file):
+        # Written on Windows: images/Bruiser\balanced-measure.jpeg
+        parts = row["file"].replace("\\", "/").split("/")
+        if len(parts) < 2:
+            continue
+        corrections.setdefault(parts[-2], {})[row["card_name"]] = row
+    return corrections
+
+
+def read_x_cards(csv_file: Path = X_CARDS_FILE) -> dict:
+    """
+    Level X cards grouped by character.
+
+    Returns:
+        {character: sorted [card_name]}
+    """
+    x_cards = {}
+    for row in read_rows(csv_file):
+        x_cards.setdefault(row["character"], []).append(row["card_name"])
+    return {character: sorted(names) for character, names in x_cards.items()}
+
+
+def sort_key(card: list):
+    """Level (X right after 1), then initiative, unreadable values last."""
+    file, initiative, level = card
+    if level == X_LEVEL:
+        level_rank = 1.5
+    else:
+        level_rank = level if level is not None else float("inf")
+    return (level_rank, initiative if initiative is not None else float("inf"), file)
+
+
+def build_bundle(character: str, card_names: list[str], ocr_rows: list[dict], corrections: dict,
+                 x_cards: list[str] = ()) -> dict:
+    """
+    Merge one character's manifest, OCR rows and corrections into a bundle.
+
+    Args:
+        character: Character folder name
+        card_names: The character's cards from cards.json (filename stems)
+        ocr_rows: Rows of data/<character>.csv
+        corrections: {card_name: row} from card-data.csv for this character
+        x_cards: This character's level X cards from x-cards.csv
+
+    Returns:
+        Bundle dict, cards sorted with sort_key
+
+    Raises:
+        ValueError: ocr_rows has rows but not one card ended up with an
+            initiative or level (e.g. the OCR engine failed to load)
+    """
+    by_name = {row["card_name"]: row for row in ocr_rows}
+    for name in sorted(set(by_name) - set(card_names)):
+        print(f"  {character}: {name} is in the OCR output but not in cards.json, skipped")
+    for name in sorted(set(corrections) - set(card_names)):
+        print(f"  {character}: correction for unknown card {name}, skipped")
+    for name in sorted(set(x_cards) - set(card_names)):
+        print(f"  {character}: unknown level X card {name}, skipped")
+
+    cards = []
+    for name in card_names:
+        row = by_name.get(name, {})
+        initiative, level = parse_initiative(row.get("initiative")), parse_level(row.get("level"))
+        fix = corrections.get(name)
+        if fix:
+            initiative = parse_initiative(fix["initiative"]) or initiative
+            level = parse_level(fix["level"]) or level
+        if level is None and name in x_cards:
+            level = X_LEVEL
+        elif level is None and row:
+            print(f"  {character}: {name} has no level")
+        if not row and not fix:
+            print(f"  {character}: {name} has no OCR row")
+        file = Path(row.get("file") or (fix or {}).get("file", "").replace("\\", "/")).name or f"{name}.jpeg"
+        cards.append([file, initiative, level])
+
+    if ocr_rows and cards and all(initiative is None and level is None for _, initiative, level in cards):
+        raise ValueError(f"{character}: no card has an initiative or level; not writing an empty bundle "
+                         f"(check the OCR output)")
+    cards.sort(key=sort_key)
+    return {"version": BUNDLE_VERSION, "character": character, "cards": cards}
+
+
+def bundle_json(bundle: dict) -> str:
+    """One card per line: small, and still reviewable in a diff."""
+    rows = ",\n".join(json.dumps(card, separators=(",", ":")) for card in bundle["cards"])
+    return (f'{{"version":{bundle["version"]},"character":{json.dumps(bundle["character"])},'
+            f'"cards":[\n{rows}\n]}}\n')
+
+
+def input_hash(*parts) -> str:
+    digest = hashlib.sha256(str(BUNDLE_VERSION).encode())
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True).encode() + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def build_data(manifest_file: Path = MANIFEST_FILE, data_dir: Path = DATA_DIR,
+               corrections_file: Path = CORRECTIONS_FILE, x_cards_file: Path = X_CARDS_FILE,
+               force: bool = False) -> dict:
+    """
+    Rebuild the bundles of characters whose inputs changed, then the index.
+
+    Args:
+        manifest_file: cards.json
+        data_dir: Directory holding the OCR CSVs; bundles are written here too
+        corrections_file: Hand-entered card-data.csv
+        x_cards_file: x-cards.csv
+        force: Rebuild every bundle
+
+    Returns:
+        The index dict
+    """
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    corrections = read_corrections(corrections_file)
+    x_cards = read_x_cards(x_cards_file)
+    index_file = data_dir / INDEX_FILE.name
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            previous = {entry["name"]: entry for entry in json.load(f)["characters"]}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        previous = {}
+
+    characters = []
+    rebuilt = 0
+    for character in sorted(manifest):
+        bundle_file = data_dir / f"{character}.json"
+        ocr_rows = read_rows(data_dir / f"{character}.csv")
+        character_corrections = corrections.get(character, {})
+        character_x_cards = x_cards.get(character, [])
+        inputs = input_hash(manifest[character], ocr_rows, character_corrections, character_x_cards)
+
+        entry = previous.get(character)
+        if force or not entry or entry.get("inputs") != inputs or not bundle_file.exists():
+            with metrics.span("bundle"):
+                bundle = build_bundle(character, manifest[character], ocr_rows, character_corrections,
+                                      character_x_cards)
+                if write_if_changed(bundle_file, bundle_json(bundle)):
+                    print(f"Wrote {len(bundle['cards'])} cards to {bundle_file}")
+            rebuilt += 1
+            metrics.count("bundles.rebuilt")
+            entry = {"name": character, "bundle": bundle_file.name, "cards": len(bundle["cards"]), "inputs": inputs}
+        characters.append(entry)
+
+    index = {"version": BUNDLE_VERSION, "fields": FIELDS, "characters": characters}
+    write_if_changed(index_file, json.dumps(index, indent=2) + "\n")
+    print(f"{len(characters)} characters, {rebuilt} bundles rebuilt, {len(characters) - rebuilt} up to date")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the card browser's per-character data bundles")
+    parser.add_argument("--force", action="store_true", help="Rebuild every bundle even if its inputs are unchanged")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics.run(build_data, args, force=args.force)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Compare card URL discovery over plain HTTP with discovery in headless Chrome.
+
+Serves fixtures/ on localhost and discovers the cards of --pages copies of
+a fixture page (one per simulated character) with:
+
+    static    scraper.discover_static (page + script bundle + JSON endpoint)
+    browser   download_all.discover_all with one browser: pages one after another
+    browsers  download_all.discover_all with one browser per page, in parallel
+
+Each run happens in a fresh process, and reports wall-clock time (browser
+startup included) and the peak RSS of that process together with every
+process it started (chromedriver and Chrome), sampled from /proc.
+"""
+
+import argparse
+import os
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bench_downloads import serve_directory
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+MODES = ("static", "browser", "browsers")
+SAMPLE_INTERVAL = 0.05
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Resident memory of pid and all its descendants, in MB (Linux /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+        stack.extend(children.get(current, []))
+    return total_kb / 1024
+
+
+class PeakSampler:
+    """Track the peak RSS of this process tree from a background thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0.0
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.done.is_set():
+            self.peak = max(self.peak, tree_rss_mb(os.getpid()))
+            self.done.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+        # ru_maxrss (KB on Linux) catches peaks of this process between samples
+        self.peak = max(self.peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def _discover(mode: str, url: str, wait_time: float, pages: int = 1) -> tuple[float, int, float]:
+    """Discover the cards of `pages` copies of url with one mode in this (fresh) process; returns (seconds, cards, peak MB)."""
+    import contextlib
+    import io
+
+    with PeakSampler() as sampler, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if mode == "static":
+            from scraper import discover_static
+            image_urls = []
+            for _ in range(pages):
+                image_urls += discover_static(url)[0]
+        else:
+            from download_all import discover_all
+            # A query string per copy keeps the pages distinct, like separate characters
+            characters = [(f"page-{i}", f"?page={i}") for i in range(pages)]
+            image_urls = []
+            for _, urls in discover_all(characters, 1 if mode == "browser" else pages, wait_time, base_url=url):
+                image_urls += urls
+        elapsed = time.perf_counter() - start
+    return elapsed, len(set(image_urls)), sampler.peak
+
+
+def bench_mode(mode: str, url: str, runs: int, wait_time: float, pages: int = 1):
+    """
+    Time one discovery mode over several fresh processes.
+
+    Returns:
+        (median seconds, cards found, max peak RSS in MB), or an error string
+    """
+    timings, peaks, cards = [], [], 0
+    for _ in range(runs):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                elapsed, cards, peak = executor.submit(_discover, mode, url, wait_time, pages).result()
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+        timings.append(elapsed)
+        peaks.append(peak)
+    return statistics.median(timings), cards, max(peaks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark static vs. browser card discovery on a local fixture")
+    parser.add_argument("--page", default="static_cards.html", help="Fixture page in fixtures/")
+    parser.add_argument("--pages", type=int, default=3, help="Copies of the page to discover, like characters (default: 3)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("-n", "--runs", type=int, default=3, help="Runs per mode, each in a fresh process (default: 3)")
+    parser.add_argument("--wait", type=float, default=10, help="Maximum seconds per browser page phase (default: 10)")
+    parser.add_argument("--latency", type=float, default=20, help="Simulated per-request latency in ms (default: 20)")
+
+    args = parser.parse_args()
+
+    server = serve_directory(FIXTURES_DIR, args.latency / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}/{args.page}"
+    print(f"Discovering {args.pages} x {url} ({args.latency:g} ms latency), {args.runs} run(s) per mode\n")
+    print(f"{'mode':<8} {'wall s':>8} {'cards':>6} {'peak RSS MB':>12}")
+    try:
+        for mode in args.modes:
+            result = bench_mode(mode, url, args.runs, args.wait, args.pages)
+            if isinstance(result, str):
+                print(f"{mode:<8} skipped: {result}")
+                continue
+            elapsed, cards, peak = result
+            print(f"{mode:<8} {elapsed:>8.3f} {cards:>6} {peak:>12.1f}")
+    finally:
+        server.shutdown()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark scraper.download_images against a local HTTP server.
+
+Serves the repo's images/ tree from http.server on localhost and downloads
+every card image with the old serial loop and with the pooled downloader,
+then re-runs the pooled downloader with --refresh semantics to show the
+cost of a conditional (304) pass.
+"""
+
+import argparse
+import contextlib
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import requests
+
+from scraper import HEADERS, download_images, image_filename
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    # Simulated round-trip time per request, in seconds
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory: Path, latency: float = 0.0) -> http.server.ThreadingHTTPServer:
+    """Serve directory on an ephemeral localhost port from a background thread."""
+    QuietHandler.latency = latency
+    handler = functools.partial(QuietHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serial_download(image_urls: list[str], output_dir: str) -> None:
+    """The previous download loop: one bare requests.get per image."""
+    os.makedirs(output_dir, exist_ok=True)
+    for i, img_url in enumerate(image_urls):
+        img_response = requests.get(img_url, headers=HEADERS)
+        img_response.raise_for_status()
+        with open(os.path.join(output_dir, image_filename(img_url, i)), "wb") as f:
+            f.write(img_response.content)
+
+
+def time_quietly(func, *args, **kwargs) -> float:
+    """Run func with its per-file progress output suppressed; return seconds taken."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float, count: int, total_bytes: int) -> None:
+    print(f"{label:<28} {elapsed:>7.2f}s {count / elapsed:>9.1f} img/s {total_bytes / elapsed / 1e6:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    repo_root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description="Benchmark pooled image downloads against a local server")
+    parser.add_argument("--images", default=str(repo_root / "images"), help="Image tree to serve")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="Pool sizes to benchmark (default: 1 4 8 16)")
+    parser.add_argument("--latency", type=float, default=50, help="Simulated per-request latency in ms (default: 50)")
+
+    args = parser.parse_args()
+
+    images_dir = Path(args.images)
+    files = sorted(p for p in images_dir.rglob("*") if p.is_file())
+    total_bytes = sum(p.stat().st_size for p in files)
+
+    server = serve_directory(images_dir, args.latency / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}/"
+    urls = [base + urllib.parse.quote(p.relative_to(images_dir).as_posix()) for p in files]
+    print(f"Serving {len(urls)} files ({total_bytes / 1e6:.1f} MB) from {base} with {args.latency:g} ms latency\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        elapsed = time_quietly(serial_download, urls, os.path.join(tmp, "serial"))
+        report("serial requests.get", elapsed, len(urls), total_bytes)
+
+        for workers in args.workers:
+            output_dir = os.path.join(tmp, f"pool_{workers}")
+            elapsed = time_quietly(download_images, urls, output_dir, max_workers=workers)
+            report(f"pool, {workers} workers", elapsed, len(urls), total_bytes)
+
+        # Re-runs over the last pool's output: existence check, then conditional requests
+        elapsed = time_quietly(download_images, urls, output_dir, max_workers=args.workers[-1])
+        report("re-run, files exist", elapsed, len(urls), total_bytes)
+        elapsed = time_quietly(download_images, urls, output_dir, max_workers=args.workers[-1], refresh=True)
+        report("re-run, --refresh (304s)", elapsed, len(urls), total_bytes)
+
+    server.shutdown()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Measure ocr_scan performance.
+
+Default: throughput (cards per second) for different worker counts.
+--extract: per-card latency and peak RSS of the old extract_card_data
+(synchronous debug PNGs) against the current one, with and without
+--debug-crops, over a whole image tree (each path runs in a fresh process).
+"""
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from card_manifest import EXCLUDED_FOLDERS
+
+from ocr_scan import (ENGINES, INITIATIVE_BOX, LEVEL_BOX, extract_card_data, list_card_images, parse_initiative,
+                      parse_level, recognize_digits, scan_cards, start_debug_writer, stop_debug_writer)
+
+EXTRACT_MODES = ("baseline", "current", "current-debug")
+
+
+def bench_workers(image_dir: str, worker_counts: list[int]) -> list[tuple[int, float, bool]]:
+    """
+    Scan image_dir once per worker count.
+
+    Args:
+        image_dir: Directory containing card images
+        worker_counts: Worker counts to try; the first run is the reference
+
+    Returns:
+        List of (workers, cards_per_second, csv_matches_reference) tuples
+    """
+    card_count = len(list_card_images(image_dir))
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reference_csv = None
+        for workers in worker_counts:
+            output_csv = os.path.join(tmp, f"cards_{workers}.csv")
+
+            start = time.perf_counter()
+            scan_cards(image_dir, output_csv, workers, use_cache=False)
+            elapsed = time.perf_counter() - start
+
+            if reference_csv is None:
+                reference_csv = output_csv
+            matches = filecmp.cmp(reference_csv, output_csv, shallow=False)
+            results.append((workers, card_count / elapsed, matches))
+
+    return results
+
+
+def _baseline_extract(image_path: str, debug_dir: str, engine: str) -> dict:
+    """
+    extract_card_data as it was before debug crops became opt-in.
+
+    Full decode with the image left open until collected, and both crops
+    saved as PNGs on the calling thread for every card, then one
+    recognition call per crop.
+    """
+    img = Image.open(image_path)
+    initiative_crop, level_crop = img.crop(INITIATIVE_BOX), img.crop(LEVEL_BOX)
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    initiative_crop.save(os.path.join(debug_dir, f"{base_name}_initiative.png"))
+    level_crop.save(os.path.join(debug_dir, f"{base_name}_level.png"))
+    initiative_text = recognize_digits([np.array(initiative_crop)], "initiative", engine)[0]
+    level_text = recognize_digits([np.array(level_crop)], "level", engine)[0]
+    return {"initiative": parse_initiative(initiative_text), "level": parse_level(level_text)}
+
+
+def _time_extract(filepaths: list[str], mode: str, engine: str) -> tuple[list[float], float, list]:
+    """Return (ms per card, peak RSS in MB, results) for one extract path in this process."""
+    import resource
+
+    # Load the recognizer before timing, like a worker's initializer does
+    recognize_digits([np.zeros((LEVEL_BOX[3] - LEVEL_BOX[1], LEVEL_BOX[2] - LEVEL_BOX[0], 3), np.uint8)],
+                     "level", engine)
+    latencies, results = [], []
+    with tempfile.TemporaryDirectory() as debug_dir:
+        if mode == "current-debug":
+            start_debug_writer(debug_dir)
+        for filepath in filepaths:
+            start = time.perf_counter()
+            if mode == "baseline":
+                data = _baseline_extract(filepath, debug_dir, engine)
+            else:
+                data = extract_card_data(filepath, engine)
+            latencies.append(1000 * (time.perf_counter() - start))
+            results.append((data["initiative"], data["level"]))
+        if mode == "current-debug":
+            # Crops still queued count against the run
+            start = time.perf_counter()
+            stop_debug_writer()
+            latencies[-1] += 1000 * (time.perf_counter() - start)
+
+    # ru_maxrss is kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return latencies, peak_rss, results
+
+
+def bench_extract(image_root: str, modes: list[str], engine: str = "template") -> list[tuple]:
+    """
+    Run every card under image_root through each extract path.
+
+    Modes:
+        baseline       the old extract_card_data: full decode, debug PNGs
+                       written synchronously for every card
+        current        extract_card_data with debug crops off (the default)
+        current-debug  extract_card_data with --debug-crops (background writer)
+
+    Returns:
+        List of (mode, mean ms/card, p95 ms/card, peak_rss_mb, matches_baseline) tuples
+    """
+    filepaths = []
+    for dirpath, _, _ in sorted(os.walk(image_root)):
+        # Item art has no initiative or level
+        if not EXCLUDED_FOLDERS & set(Path(dirpath).relative_to(image_root).parts):
+            filepaths.extend(list_card_images(dirpath))
+    print(f"{len(filepaths)} card(s), {engine} engine")
+
+    results = []
+    reference = None
+    for mode in modes:
+        # A fresh process per mode so peak RSS isn't inherited from the last one
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            latencies, peak_rss, cards = executor.submit(_time_extract, filepaths, mode, engine).result()
+        reference = reference if reference is not None else cards
+        results.append((mode, float(np.mean(latencies)), float(np.percentile(latencies, 95)), peak_rss,
+                        cards == reference))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel OCR card scanning")
+    parser.add_argument("image_dir", nargs="?", default="images", help="Directory containing card images")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts to benchmark (default: 1 2 4 8)")
+    parser.add_argument("--extract", action="store_true",
+                        help="Benchmark the old and current extract_card_data over every card under image_dir")
+    parser.add_argument("--engine", choices=ENGINES, default="template",
+                        help="Recognizer for --extract (default: template)")
+
+    args = parser.parse_args()
+
+    if args.extract:
+        results = bench_extract(args.image_dir, EXTRACT_MODES, args.engine)
+        print(f"\n{'mode':>14} {'ms/card':>9} {'p95 ms':>8} {'peak RSS MB':>12}  same results")
+        for mode, mean_ms, p95_ms, peak_rss, matches in results:
+            print(f"{mode:>14} {mean_ms:>9.2f} {p95_ms:>8.2f} {peak_rss:>12.1f}  {'yes' if matches else 'NO'}")
+        raise SystemExit
+
+    results = bench_workers(args.image_dir, args.workers)
+
+    print(f"\n{'workers':>8} {'cards/s':>10}  matches serial")
+    for workers, rate, matches in results:
+        print(f"{workers:>8} {rate:>10.2f}  {'yes' if matches else 'NO'}")
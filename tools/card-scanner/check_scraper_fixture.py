@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Run scraper.collect_image_urls against the local lazy-loading fixture.
+
+Serves fixtures/ over localhost, opens fixtures/lazy_cards.html in headless
+Chrome and checks that every card was discovered, printing the per-phase
+timings. The fixture re-renders --slider-delay ms after the level slider
+moves, longer than scraper.STABLE_FOR. With --static, scraper.discover_static is checked instead (use it
+with --page static_cards.html, static_shared.html --character Fixture, or
+static_level1.html, whose "expected-static" count of 0 means the result must
+be rejected as partial). Exits non-zero on a mismatch.
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from bench_downloads import serve_directory
+from scraper import collect_image_urls, create_driver, discover_static
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check page-readiness detection against a local fixture")
+    parser.add_argument("--page", default="lazy_cards.html", help="Fixture page in fixtures/")
+    parser.add_argument("--wait", type=float, default=10, help="Maximum seconds per page phase (default: 10)")
+    parser.add_argument("--static", action="store_true", help="Check browserless discovery instead of Selenium")
+    parser.add_argument("--slider-delay", type=int, default=1500,
+                        help="Milliseconds the lazy fixture takes to re-render after the slider moves; "
+                             "kept above scraper.STABLE_FOR so a wait that only checks stability fails (default: 1500)")
+    parser.add_argument("--character", default=None, help="Character name to scope static discovery to")
+    parser.add_argument("--min-cards", type=int, default=0, help="Fewest cards static discovery may accept")
+
+    args = parser.parse_args()
+
+    server = serve_directory(FIXTURES_DIR)
+    url = f"http://127.0.0.1:{server.server_address[1]}/{args.page}"
+
+    if args.static:
+        try:
+            start = time.monotonic()
+            image_urls, page = discover_static(url, div_class="card-img", character=args.character,
+                                               min_cards=args.min_cards)
+            elapsed = time.monotonic() - start
+        finally:
+            server.shutdown()
+        expected = re.search(r'name="expected-static" content="(\d+)"', page) or \
+            re.search(r'name="expected-cards" content="(\d+)"', page)
+        expected = int(expected.group(1))
+        print(f"\n{len(image_urls)}/{expected} cards in {elapsed:.2f}s")
+        sys.exit(0 if len(set(image_urls)) == expected else 1)
+
+    driver = create_driver()
+    try:
+        start = time.monotonic()
+        driver.get(f"{url}?slider_delay={args.slider_delay}")
+        image_urls = collect_image_urls(driver, args.wait)
+        elapsed = time.monotonic() - start
+        expected = int(driver.execute_script(
+            "return document.querySelector('meta[name=\"expected-cards\"]').content"
+        ))
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    print(f"\n{len(image_urls)}/{expected} cards in {elapsed:.2f}s")
+    sys.exit(0 if len(set(image_urls)) == expected else 1)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Export the initiative and level crops of every card into one memory-mapped array.
+
+Tuning the crop boxes, thresholds or templates otherwise means decoding
+every JPEG under images/ again for each try. The export decodes each card
+once and appends its two crops, with PADDING pixels of extra context, as
+one record to DATA_FILE:
+
+    crops/crops.u8    raw records of CropDataset.dtype, one per row
+    crops/crops.json  {"version", "settings", "rows": [{"card_name", "character",
+                       "file", "sha256", "size", "mtime_ns", "stale"?}]}
+
+CropDataset maps the data file read-only, so crops are views into the page
+cache rather than copies:
+
+    dataset = CropDataset()
+    for rows, crops in dataset.batches("initiative", padding=0):
+        templates.recognize_batch(list(crops), "initiative")
+
+Exports are incremental: cards already in the dataset (same file, size and
+mtime, or same content hash) are skipped and only new cards are appended.
+Rows of changed or deleted files are marked stale rather than rewritten;
+--compact drops them. A change to the boxes, reference size or padding
+rebuilds the dataset. The index is written after the records it lists, so
+an interrupted export leaves at most some unindexed records at the end of
+DATA_FILE, which the next export truncates away.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ocr_scan import INITIATIVE_BOX, LEVEL_BOX, REFERENCE_SIZE, list_card_images, load_crops
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+from card_manifest import EXCLUDED_FOLDERS, IMAGES_DIR, REPO_ROOT, write_if_changed
+from file_hash import file_sha256
+
+DEFAULT_OUTPUT = Path(__file__).parent / "crops"
+DATA_FILE = "crops.u8"
+INDEX_FILE = "crops.json"
+DEFAULT_PADDING = 8
+DATASET_VERSION = 1
+REGIONS = {"initiative": INITIATIVE_BOX, "level": LEVEL_BOX}
+CHUNK_SIZE = 32
+
+
+def dataset_settings(padding: int) -> dict:
+    """Settings baked into the stored crops; a change means a rebuild."""
+    return {
+        "reference_size": list(REFERENCE_SIZE),
+        "boxes": {kind: list(box) for kind, box in REGIONS.items()},
+        "padding": padding,
+    }
+
+
+def record_dtype(padding: int) -> np.dtype:
+    """One row: an RGB (height, width, 3) uint8 crop per region, padding included."""
+    return np.dtype([
+        (kind, np.uint8, (box[3] - box[1] + 2 * padding, box[2] - box[0] + 2 * padding, 3))
+        for kind, box in REGIONS.items()
+    ])
+
+
+def _rgb(crop: np.ndarray) -> np.ndarray:
+    if crop.ndim == 2:
+        return np.repeat(crop[..., None], 3, axis=2)
+    return crop[..., :3]
+
+
+def _crop_chunk(paths: list[str], padding: int) -> list:
+    """Process pool task: one packed record (bytes) per path, None if it can't be read."""
+    dtype = record_dtype(padding)
+    records = []
+    for path in paths:
+        try:
+            crops = load_crops(path, padding)
+        except Exception as e:
+            print(f"  Error reading {path}: {e}")
+            records.append(None)
+            continue
+        record = np.zeros((), dtype)
+        for kind, crop in zip(REGIONS, crops):
+            record[kind] = _rgb(crop)
+        records.append(record.tobytes())
+    return records
+
+
+class CropDataset:
+    """Read-only view of an exported crop dataset."""
+
+    def __init__(self, directory: Path = DEFAULT_OUTPUT):
+        self.directory = Path(directory)
+        with open(self.directory / INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.settings = index["settings"]
+        self.padding = self.settings["padding"]
+        self.rows = index["rows"]
+        self.dtype = record_dtype(self.padding)
+        if self.rows:
+            self.records = np.memmap(self.directory / DATA_FILE, dtype=self.dtype, mode="r", shape=(len(self.rows),))
+        else:
+            self.records = np.zeros(0, self.dtype)
+        self.live = np.array([i for i, row in enumerate(self.rows) if not row.get("stale")], dtype=np.int64)
+        self.by_file = {row["file"]: i for i, row in enumerate(self.rows) if not row.get("stale")}
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def crops(self, kind: str, padding: int = None) -> np.ndarray:
+        """
+        Every row's crops of one region, as a view of the memmap.
+
+        Args:
+            kind: "initiative" or "level"
+            padding: Context to keep around the box (<= the stored padding; default: all of it)
+
+        Returns:
+            (rows, height, width, 3) uint8 array, stale rows included
+        """
+        padding = self.padding if padding is None else padding
+        if not 0 <= padding <= self.padding:
+            raise ValueError(f"padding must be between 0 and {self.padding}")
+        trim = self.padding - padding
+        region = self.records[kind]
+        return region[:, trim:region.shape[1] - trim, trim:region.shape[2] - trim]
+
+    def crop(self, file: str, kind: str, padding: int = None) -> np.ndarray:
+        """One card's crop by repo-relative file path (KeyError if not exported)."""
+        return self.crops(kind, padding)[self.by_file[file]]
+
+    def batches(self, kind: str, batch_size: int = 256, padding: int = None):
+        """
+        Yield (row indices, crops) over the live rows, batch_size at a time.
+
+        Runs of live rows come straight from the memmap; only batches that
+        skip a stale row are gathered into a copy.
+        """
+        crops = self.crops(kind, padding)
+        for start in range(0, len(self.live), batch_size):
+            rows = self.live[start:start + batch_size]
+            if rows[-1] - rows[0] + 1 == len(rows):
+                yield rows, crops[rows[0]:rows[-1] + 1]
+            else:
+                yield rows, crops[rows]
+
+
+def card_images(images_dir: Path = IMAGES_DIR) -> list[Path]:
+    """Card images of every character folder (item art has no initiative or level)."""
+    paths = []
+    for folder in sorted(p for p in images_dir.iterdir() if p.is_dir() and p.name not in EXCLUDED_FOLDERS):
+        paths.extend(Path(path) for path in list_card_images(str(folder)))
+    return paths
+
+
+def export_crops(images_dir: Path = IMAGES_DIR, output_dir: Path = DEFAULT_OUTPUT, padding: int = DEFAULT_PADDING,
+                 workers: int = None, rebuild: bool = False, compact: bool = False) -> CropDataset:
+    """
+    Append the crops of cards not yet in the dataset.
+
+    Args:
+        images_dir: Directory holding one folder per character
+        output_dir: Dataset directory
+        padding: Reference-size pixels of context around each box
+        workers: Decoder processes (default: all cores)
+        rebuild: Start over instead of appending
+        compact: Rewrite the data file without stale rows
+
+    Returns:
+        The updated dataset
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    data_file, index_file = output_dir / DATA_FILE, output_dir / INDEX_FILE
+    settings = dataset_settings(padding)
+    dtype = record_dtype(padding)
+
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = None
+    indexed_size = len(index["rows"]) * dtype.itemsize if index else 0
+    if (rebuild or index is None or index.get("version") != DATASET_VERSION or index["settings"] != settings
+            or not data_file.exists() or data_file.stat().st_size < indexed_size):
+        if index is not None and not rebuild:
+            print("Crop settings changed (or the data file is shorter than its index); rebuilding")
+        index = {"version": DATASET_VERSION, "settings": settings, "rows": []}
+        data_file.write_bytes(b"")
+    elif data_file.stat().st_size > indexed_size:
+        # Records appended by an export that stopped before writing the index
+        print(f"Dropping {(data_file.stat().st_size - indexed_size) // dtype.itemsize} unindexed record(s)")
+        os.truncate(data_file, indexed_size)
+    rows = index["rows"]
+
+    current = {row["file"]: row for row in rows if not row.get("stale")}
+    known_hashes = {row["sha256"] for row in rows if not row.get("stale")}
+    todo, seen = [], set()
+    for path in card_images(images_dir):
+        file = path.relative_to(REPO_ROOT).as_posix()
+        seen.add(file)
+        stat = path.stat()
+        row = current.get(file)
+        if row and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            continue
+        sha256 = file_sha256(str(path))
+        if row and row["sha256"] == sha256:
+            row["size"], row["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            continue
+        if row:
+            row["stale"] = True
+        todo.append({"card_name": path.stem, "character": path.parent.name, "file": file, "sha256": sha256,
+                     "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    for file, row in current.items():
+        if file not in seen:
+            row["stale"] = True
+
+    duplicates = sum(1 for row in todo if row["sha256"] in known_hashes)
+    print(f"{len(seen)} card(s): {len(todo)} to crop ({duplicates} with content already in the dataset), "
+          f"{len(seen) - len(todo)} unchanged")
+    metrics.count("crops.appended", len(todo))
+
+    if todo:
+        chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+        with metrics.span("crops.decode"), ProcessPoolExecutor(max_workers=workers) as executor, \
+                open(data_file, "ab") as f:
+            results = executor.map(_crop_chunk, [[str(REPO_ROOT / row["file"]) for row in chunk] for chunk in chunks],
+                                   [padding] * len(chunks))
+            for chunk, records in zip(chunks, results):
+                for row, record in zip(chunk, records):
+                    if record is None:
+                        continue
+                    f.write(record)
+                    rows.append(row)
+
+    if compact and any(row.get("stale") for row in rows):
+        old = np.memmap(data_file, dtype=dtype, mode="r", shape=(len(rows),))
+        keep = [i for i, row in enumerate(rows) if not row.get("stale")]
+        tmp_file = data_file.with_name(data_file.name + ".part")
+        old[keep].tofile(tmp_file)
+        del old
+        os.replace(tmp_file, data_file)
+        print(f"Compacted away {len(rows) - len(keep)} stale row(s)")
+        index["rows"] = rows = [rows[i] for i in keep]
+
+    # Written after the records it lists (see the module docstring)
+    write_if_changed(index_file, json.dumps(index, indent=1))
+    dataset = CropDataset(output_dir)
+    size_mb = len(rows) * dtype.itemsize / 1e6
+    print(f"{len(dataset)} live row(s) ({len(rows)} stored, {size_mb:.1f} MB) in {data_file}")
+    return dataset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export initiative/level crops of every card into a memmap dataset")
+    parser.add_argument("--images", type=Path, default=IMAGES_DIR, help="Directory with one folder per character")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_OUTPUT, help="Dataset directory")
+    parser.add_argument("-p", "--padding", type=int, default=DEFAULT_PADDING,
+                        help=f"Pixels of context around each box (default: {DEFAULT_PADDING})")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Decoder processes (default: all cores)")
+    parser.add_argument("--rebuild", action="store_true", help="Start the dataset over")
+    parser.add_argument("--compact", action="store_true", help="Drop rows of changed or deleted files")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(export_crops, args, args.images.resolve(), args.output, args.padding, args.workers,
+                args.rebuild, args.compact)
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Template-matching digit recognizer for the initiative and level boxes.
+
+Every card prints its initiative and level in the same font at the same
+place, so a few averaged glyph templates per digit are enough to read them
+without loading an OCR model. Templates are bootstrapped from a labelled
+CSV (for example tools/card-browser/card-data.csv).
+
+Usage:
+    python digit_templates.py build ../card-browser/card-data.csv --root ../..
+    python digit_templates.py report ../card-browser/card-data.csv --root ../..
+    python digit_templates.py holdout ../card-browser/card-data.csv --root ../.. \
+        --against ../card-browser/data/Cragheart.csv ../card-browser/data/Tinkerer.csv
+
+report scores engines on the CSV the templates were built from; holdout
+scores templates only on cards they were not built from.
+
+--crops crops/ (any command) reads the crops from a crop_dataset.py export
+instead of decoding every card image again; report then times recognition
+only.
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+
+TEMPLATE_SHAPE = (24, 16)  # (rows, cols) every glyph is resampled to
+KINDS = ("initiative", "level")
+DEFAULT_TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "digit_templates.npz")
+
+# Column runs smaller than this are treated as noise, not glyphs
+MIN_GLYPH_HEIGHT = 0.4  # fraction of crop height
+MIN_GLYPH_PIXELS = 0.01  # fraction of crop area
+# Runs wider than this (relative to their height) are two touching digits
+MAX_GLYPH_ASPECT = 0.8
+
+
+def to_gray(crop: np.ndarray) -> np.ndarray:
+    """Return a 2-D uint8 grayscale version of a crop."""
+    if crop.ndim == 3:
+        crop = crop[..., :3].mean(axis=2)
+    return crop.astype(np.uint8)
+
+
+def binarize(crop: np.ndarray) -> np.ndarray:
+    """
+    Threshold a crop with Otsu's method and return a boolean glyph mask.
+
+    Initiative digits are light on dark and level digits dark on light, so
+    the foreground is taken to be whichever side of the threshold covers
+    fewer pixels.
+    """
+    gray = to_gray(crop)
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+
+    weight_low = np.cumsum(hist)
+    weight_high = weight_low[-1] - weight_low
+    sum_low = np.cumsum(hist * levels)
+    mean_low = sum_low / np.maximum(weight_low, 1)
+    mean_high = (sum_low[-1] - sum_low) / np.maximum(weight_high, 1)
+    between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    threshold = int(np.argmax(between))
+
+    bright = gray > threshold
+    return bright if bright.sum() * 2 < bright.size else ~bright
+
+
+def segment(mask: np.ndarray) -> list[np.ndarray]:
+    """
+    Split a glyph mask into per-glyph masks, left to right.
+
+    Glyphs are runs of columns containing foreground, trimmed to the rows
+    they use. Runs too short or too sparse to be a digit are dropped.
+    """
+    height, width = mask.shape
+    columns = mask.any(axis=0)
+    # Starts and ends of each run of foreground columns
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], columns.view(np.int8), [0]))))
+    glyphs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        glyph = mask[:, start:end]
+        rows = np.flatnonzero(glyph.any(axis=1))
+        glyph = glyph[rows[0]:rows[-1] + 1]
+        if glyph.shape[0] < MIN_GLYPH_HEIGHT * height or glyph.sum() < MIN_GLYPH_PIXELS * mask.size:
+            continue
+        glyphs.extend(_split_touching(glyph))
+    return glyphs
+
+
+def _split_touching(glyph: np.ndarray) -> list[np.ndarray]:
+    """Split a run that is too wide for one digit at its thinnest middle column."""
+    rows, cols = glyph.shape
+    if cols <= MAX_GLYPH_ASPECT * rows:
+        return [glyph]
+    middle = slice(cols // 3, cols - cols // 3)
+    cut = middle.start + int(np.argmin(glyph[:, middle].sum(axis=0)))
+    halves = []
+    for half in (glyph[:, :cut], glyph[:, cut:]):
+        used = np.flatnonzero(half.any(axis=1))
+        if used.size:
+            halves.append(half[used[0]:used[-1] + 1])
+    return halves
+
+
+def resample(glyph: np.ndarray) -> np.ndarray:
+    """Nearest-neighbour resample a glyph mask to TEMPLATE_SHAPE as float32."""
+    rows = (np.arange(TEMPLATE_SHAPE[0]) + 0.5) * glyph.shape[0] / TEMPLATE_SHAPE[0]
+    cols = (np.arange(TEMPLATE_SHAPE[1]) + 0.5) * glyph.shape[1] / TEMPLATE_SHAPE[1]
+    return glyph[rows.astype(int)[:, None], cols.astype(int)[None, :]].astype(np.float32)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-norm each row so dot products are correlations."""
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class DigitTemplates:
+    """Per-kind digit templates and a batched matcher."""
+
+    def __init__(self, templates: dict, counts: dict):
+        """
+        Args:
+            templates: kind -> (10, rows, cols) float array of mean glyphs
+            counts: kind -> (10,) array of samples behind each template
+        """
+        self.templates = templates
+        self.counts = counts
+        self._matchers = {kind: self._matcher(kind) for kind in KINDS}
+
+    def _matcher(self, kind: str):
+        """Return (digits, normalized template matrix) for a kind.
+
+        Digits never seen for this kind borrow the other kind's template.
+        """
+        other = KINDS[1 - KINDS.index(kind)]
+        digits, rows = [], []
+        for digit in range(10):
+            for source in (kind, other):
+                if self.counts[source][digit]:
+                    digits.append(str(digit))
+                    rows.append(self.templates[source][digit].ravel())
+                    break
+        if not rows:
+            return [], np.zeros((0, TEMPLATE_SHAPE[0] * TEMPLATE_SHAPE[1]), np.float32)
+        return digits, _normalize_rows(np.stack(rows))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TEMPLATES_FILE) -> "DigitTemplates":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No digit templates at {path}; run 'python digit_templates.py build <labelled.csv>' first")
+        with np.load(path) as data:
+            templates = {kind: data[kind] for kind in KINDS}
+            counts = {kind: data[f"{kind}_count"] for kind in KINDS}
+        return cls(templates, counts)
+
+    def save(self, path: str = DEFAULT_TEMPLATES_FILE) -> None:
+        arrays = dict(self.templates)
+        arrays.update({f"{kind}_count": self.counts[kind] for kind in KINDS})
+        np.savez(path, **arrays)
+
+    @classmethod
+    def build(cls, samples) -> "DigitTemplates":
+        """
+        Average labelled glyphs into templates.
+
+        Args:
+            samples: Iterable of (kind, crop, label) where label is the
+                digit string printed in the crop
+
+        Samples whose glyph count doesn't match the label length are skipped.
+        """
+        sums = {kind: np.zeros((10,) + TEMPLATE_SHAPE, np.float64) for kind in KINDS}
+        counts = {kind: np.zeros(10, np.int64) for kind in KINDS}
+        for kind, crop, label in samples:
+            glyphs = segment(binarize(crop))
+            if len(glyphs) != len(label):
+                continue
+            for glyph, char in zip(glyphs, label):
+                sums[kind][int(char)] += resample(glyph)
+                counts[kind][int(char)] += 1
+
+        templates = {
+            kind: (sums[kind] / np.maximum(counts[kind], 1)[:, None, None]).astype(np.float32)
+            for kind in KINDS
+        }
+        return cls(templates, counts)
+
+    def recognize_batch(self, crops: list[np.ndarray], kind: str) -> list[tuple[str, float]]:
+        """
+        Read the digits in a batch of crops of one kind.
+
+        All glyphs of all crops are matched against the templates in a
+        single matrix product.
+
+        Returns:
+            (text, confidence) per crop; confidence is the weakest glyph's
+            correlation with its best template, 0.0 when nothing was found
+        """
+        digits, matrix = self._matchers[kind]
+        glyph_counts, vectors = [], []
+        for crop in crops:
+            glyphs = segment(binarize(crop))
+            glyph_counts.append(len(glyphs))
+            vectors.extend(resample(glyph).ravel() for glyph in glyphs)
+
+        if not vectors or not digits:
+            return [("", 0.0) for _ in crops]
+
+        scores = _normalize_rows(np.stack(vectors)) @ matrix.T
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+
+        results = []
+        offset = 0
+        for count in glyph_counts:
+            if count == 0:
+                results.append(("", 0.0))
+                continue
+            text = "".join(digits[i] for i in best[offset:offset + count])
+            results.append((text, float(best_scores[offset:offset + count].min())))
+            offset += count
+        return results
+
+    def recognize(self, crop: np.ndarray, kind: str) -> tuple[str, float]:
+        """Read the digits in one crop; see recognize_batch."""
+        return self.recognize_batch([crop], kind)[0]
+
+
+def read_labelled_csv(csv_path: str, root: str) -> list[dict]:
+    """Return rows of a labelled card CSV with 'file' resolved against root."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["file"] = os.path.join(root, row["file"].replace("\\", "/"))
+    return rows
+
+
+def load_labelled_crops(rows: list[dict], crops_dir: str = None) -> tuple[list[dict], list[tuple]]:
+    """
+    The (initiative, level) crops of every CSV row whose image exists.
+
+    Args:
+        rows: Rows from read_labelled_csv
+        crops_dir: crop_dataset.py export to read crops from; cards missing
+            from it (and every card without one) are decoded from their image
+
+    Returns:
+        (rows, crops) with the rows of missing files left out
+    """
+    from ocr_scan import load_crops
+
+    dataset = None
+    if crops_dir:
+        from crop_dataset import REPO_ROOT, CropDataset
+        dataset = CropDataset(crops_dir)
+
+    found, crops = [], []
+    for row in rows:
+        if not os.path.exists(row["file"]):
+            print(f"  Skipping missing file: {row['file']}")
+            continue
+        file = os.path.relpath(os.path.abspath(row["file"]), REPO_ROOT).replace(os.sep, "/") if dataset else None
+        if dataset and file in dataset.by_file:
+            crops.append(tuple(dataset.crop(file, kind, padding=0) for kind in KINDS))
+        else:
+            crops.append(load_crops(row["file"]))
+        found.append(row)
+    return found, crops
+
+
+def labelled_samples(rows: list[dict], crops_dir: str = None):
+    """
+    Yield (kind, crop, label) for every digit label in the CSV rows.
+
+    Args:
+        rows: Rows from read_labelled_csv
+        crops_dir: crop_dataset.py export to read crops from (see load_labelled_crops)
+    """
+    for row, crops in zip(*load_labelled_crops(rows, crops_dir)):
+        for kind, crop in zip(KINDS, crops):
+            label = row[kind].strip()
+            if label.isdigit():
+                yield kind, crop, label
+
+
+def build_templates(csv_path: str, root: str, output: str, crops_dir: str = None) -> None:
+    """Bootstrap templates from a labelled CSV and save them."""
+    rows = read_labelled_csv(csv_path, root)
+    templates = DigitTemplates.build(labelled_samples(rows, crops_dir))
+    templates.save(output)
+
+    print(f"Saved digit templates to {output}")
+    for kind in KINDS:
+        seen = "".join(str(d) for d in range(10) if templates.counts[kind][d])
+        print(f"  {kind}: {int(templates.counts[kind].sum())} glyphs, digits {seen or '-'}")
+
+
+def _accuracy(templates: DigitTemplates, rows: list[dict], crops: list[tuple]) -> dict:
+    """
+    kind -> (correct, labelled) of templates read against the digit labels of rows.
+
+    Reads are parsed the way ocr_scan.py parses them, so "06" counts as a
+    correct read of initiative 6.
+    """
+    from ocr_scan import parse_initiative, parse_level
+    parsers = {"initiative": parse_initiative, "level": parse_level}
+    scores = {}
+    for k, kind in enumerate(KINDS):
+        labelled = [(int(row[kind]), crop[k]) for row, crop in zip(rows, crops) if row[kind].strip().isdigit()]
+        texts = templates.recognize_batch([crop for _, crop in labelled], kind) if labelled else []
+        scores[kind] = (sum(parsers[kind](text) == label for (label, _), (text, _) in zip(labelled, texts)),
+                        len(labelled))
+    return scores
+
+
+def holdout(csv_path: str, root: str, against: list[str], crops_dir: str = None) -> None:
+    """
+    Print template accuracy on cards the templates were not built from.
+
+    - leave-one-out: for every card of csv_path, templates are built from
+      all the other cards and scored on the one left out
+    - every CSV in against is scored with templates built from all of
+      csv_path; the per-character CSVs of card-browser/data were written by
+      the template engine itself, so their rows are labelled "agreement"
+      and measure consistency, not accuracy
+
+    With crops_dir, crops come from a crop_dataset.py export.
+    """
+    rows, crops = load_labelled_crops(read_labelled_csv(csv_path, root), crops_dir)
+
+    def samples(indices):
+        for i in indices:
+            for k, kind in enumerate(KINDS):
+                label = rows[i][kind].strip()
+                if label.isdigit():
+                    yield kind, crops[i][k], label
+
+    print(f"{'split':<36} {'initiative':>11} {'level':>7} {'cards':>6}")
+
+    def print_row(split, scores, cards):
+        cells = [f"{correct / total:.1%} ({correct}/{total})" if total else "-" for correct, total in
+                 (scores[kind] for kind in KINDS)]
+        print(f"{split:<36} {cells[0]:>11} {cells[1]:>7} {cards:>6}")
+
+    loo = {kind: [0, 0] for kind in KINDS}
+    for i in range(len(rows)):
+        templates = DigitTemplates.build(samples(j for j in range(len(rows)) if j != i))
+        for kind, (correct, total) in _accuracy(templates, rows[i:i + 1], crops[i:i + 1]).items():
+            loo[kind][0] += correct
+            loo[kind][1] += total
+    print_row(f"leave-one-out {os.path.basename(csv_path)}", loo, len(rows))
+
+    templates = DigitTemplates.build(samples(range(len(rows))))
+    for path in against:
+        other_rows, other_crops = load_labelled_crops(read_labelled_csv(path, root), crops_dir)
+        print_row(f"agreement {os.path.basename(path)}", _accuracy(templates, other_rows, other_crops), len(other_rows))
+
+
+def report(csv_path: str, root: str, engines: list[str], crops_dir: str = None) -> None:
+    """
+    Print accuracy and per-card time of each engine against a labelled CSV.
+
+    With crops_dir, crops come from a crop_dataset.py export instead of
+    being decoded from the images, and ms/card is recognition time only.
+    """
+    from ocr_scan import extract_batch, parse_initiative, parse_level, recognize_digits
+
+    rows = [row for row in read_labelled_csv(csv_path, root) if os.path.exists(row["file"])]
+    if crops_dir:
+        rows, crops = load_labelled_crops(rows, crops_dir)
+
+        def extract(engine, count=None):
+            texts = [recognize_digits([card[k] for card in crops[:count]], kind, engine)
+                     for k, kind in enumerate(KINDS)]
+            return [{"initiative": parse_initiative(initiative), "level": parse_level(level)}
+                    for initiative, level in zip(*texts)]
+    else:
+        paths = [row["file"] for row in rows]
+
+        def extract(engine, count=None):
+            return extract_batch(paths[:count], engine)
+
+    print(f"{'engine':>10} {'initiative':>11} {'level':>7} {'ms/card':>9}")
+    for engine in engines:
+        # Warm-up so model loading isn't counted as per-card time
+        extract(engine, 1)
+
+        start = time.perf_counter()
+        results = extract(engine)
+        elapsed = time.perf_counter() - start
+
+        accuracy = {}
+        for kind in KINDS:
+            labelled = [(row, data) for row, data in zip(rows, results) if row[kind].strip().isdigit()]
+            correct = sum(str(data[kind]) == row[kind].strip() for row, data in labelled)
+            accuracy[kind] = correct / len(labelled) if labelled else 0.0
+
+        print(f"{engine:>10} {accuracy['initiative']:>10.1%} {accuracy['level']:>7.1%} "
+              f"{1000 * elapsed / max(len(rows), 1):>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or evaluate template-matching digit recognition")
+    parser.add_argument("command", choices=["build", "report", "holdout"],
+                        help="build templates, report engine accuracy, or report held-out template accuracy")
+    parser.add_argument("csv", help="Labelled CSV with card_name, initiative, level, file columns")
+    parser.add_argument("--root", default=".", help="Directory the CSV 'file' paths are relative to")
+    parser.add_argument("-o", "--output", default=DEFAULT_TEMPLATES_FILE, help="Templates file to write (build)")
+    parser.add_argument("--engines", nargs="+", default=["easyocr", "template", "hybrid"],
+                        help="Engines to compare (report)")
+    parser.add_argument("--against", nargs="*", default=[],
+                        help="More labelled CSVs to score templates built from csv against (holdout)")
+    parser.add_argument("--crops", default=None, help="crop_dataset.py export to read crops from")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_templates(args.csv, args.root, args.output, args.crops)
+    elif args.command == "holdout":
+        holdout(args.csv, args.root, args.against, args.crops)
+    else:
+        report(args.csv, args.root, args.engines, args.crops)
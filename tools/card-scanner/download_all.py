@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 """Download card images for all characters listed in linksandnames.md."""
 
+import argparse
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from scraper import extract_images
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+import replay_store
+from scraper import (DOWNLOAD_WORKERS, collect_image_urls, count_card_images, create_driver, create_session,
+                     discover_static, download_images, record_discovery, replayed_image_urls)
 
 
 BASE_URL = "https://gloomhavencards.com/gh2/characters/"
+CARD_CLASS = "card-img"
+WAIT_TIME = 10
 
 
 def parse_linksandnames(filepath: Path) -> list[tuple[str, str]]:
@@ -24,32 +33,149 @@ def parse_linksandnames(filepath: Path) -> list[tuple[str, str]]:
     return entries
 
 
+def discover_all(characters: list[tuple[str, str]], concurrency: int, wait_time: float = WAIT_TIME,
+                 base_url: str = BASE_URL):
+    """
+    Discover card image URLs for every character, `concurrency` pages at a time.
+
+    Each worker thread drives its own headless Chrome (started on first use
+    and reused for its next characters), so every page has a focused window
+    of its own: the slider wait and the scroll-until-stable loop of
+    collect_image_urls run in parallel instead of one tab after another, and
+    background-tab throttling never stalls lazy loading.
+
+    Yields:
+        (folder_name, image_urls) as soon as each character is discovered
+    """
+    local = threading.local()
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def discover(entry):
+        folder_name, url_part = entry
+        if not hasattr(local, "driver"):
+            local.driver = create_driver()
+            with drivers_lock:
+                drivers.append(local.driver)
+        print(f"\nDiscovering: {folder_name}")
+        try:
+            local.driver.get(base_url + url_part)
+            image_urls = collect_image_urls(local.driver, wait_time)
+            record_discovery(base_url + url_part, local.driver.page_source, image_urls)
+        except Exception as e:
+            print(f"Error discovering {folder_name}: {e}")
+            image_urls = []
+        return folder_name, image_urls
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(characters)))) as pool:
+            futures = [pool.submit(discover, entry) for entry in characters]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def discover_with_fallback(characters: list[tuple[str, str]], concurrency: int, session, browser: bool = False,
+                           images_dir: Path = None):
+    """
+    Discover card image URLs over plain HTTP, starting Selenium only if needed.
+
+    Every character page is first searched with discover_static, `concurrency`
+    at a time, scoped to the character and required to find at least as many
+    cards as images_dir/<folder> already holds. The browser is only started
+    for the characters where that failed or looked partial (or for all of
+    them when browser is set).
+
+    Yields:
+        (folder_name, image_urls) as soon as each character is discovered
+    """
+    fallback = list(characters) if browser else []
+    if not browser:
+        def static(entry):
+            folder_name, url_part = entry
+            discovery = {"div_class": CARD_CLASS, "character": folder_name,
+                         "min_cards": count_card_images(str(images_dir / folder_name)) if images_dir else 0}
+            try:
+                return (*discover_static(BASE_URL + url_part, session, **discovery), discovery)
+            except Exception as e:
+                print(f"Static discovery failed for {folder_name}: {e}")
+                return [], None, discovery
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for (folder_name, url_part), (image_urls, page, discovery) in zip(characters, pool.map(static, characters)):
+                if image_urls:
+                    record_discovery(BASE_URL + url_part, page, image_urls, {"source": "static", **discovery})
+                    yield folder_name, image_urls
+                else:
+                    fallback.append((folder_name, url_part))
+
+    if fallback:
+        print(f"\nDiscovering {len(fallback)} character(s) with Selenium")
+        yield from discover_all(fallback, concurrency)
+
+
+def replay_all(characters: list[tuple[str, str]]):
+    """Yield (folder_name, image_urls) from the replay store, without a browser."""
+    for folder_name, url_part in characters:
+        try:
+            yield folder_name, replayed_image_urls(BASE_URL + url_part)
+        except replay_store.ReplayMiss:
+            print(f"Not in replay store: {folder_name} (record it with --record)")
+            yield folder_name, []
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Download card images for every character in linksandnames.md")
+    parser.add_argument("-c", "--concurrency", type=int, default=3,
+                        help="Character pages fetched (or browsers discovering) at once (default: 3)")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate existing images instead of skipping them")
+    parser.add_argument("--browser", action="store_true",
+                        help="Discover every character with Selenium instead of trying plain HTTP first")
+    replay_store.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    replay_store.configure_from_args(args)
+    metrics.run(download_all, args)
+
+
+def download_all(args):
+    """Discover every character's card URLs and download them, per the parsed CLI args."""
+    store = replay_store.get_store()
     scanner_dir = Path(__file__).parent
     repo_root = scanner_dir.parent.parent
     images_dir = repo_root / "images"
     linksandnames_file = scanner_dir / "linksandnames.md"
-    
+
     characters = parse_linksandnames(linksandnames_file)
     print(f"Found {len(characters)} characters to download")
-    
-    for folder_name, url_part in characters:
-        url = BASE_URL + url_part
+
+    # Up to `concurrency` characters download at once, DOWNLOAD_WORKERS threads each, all on this session
+    session = create_session(args.concurrency * DOWNLOAD_WORKERS)
+
+    def download(folder_name: str, image_urls: list[str]) -> None:
         output_dir = images_dir / folder_name
-        
-        print(f"\n{'='*60}")
-        print(f"Downloading: {folder_name} from {url}")
-        print(f"Output: {output_dir}")
-        print('='*60)
-        
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
         try:
-            images = extract_images(url, "card-img", str(output_dir))
+            images = download_images(image_urls, str(output_dir), refresh=args.refresh, session=session)
             print(f"Downloaded {len(images)} cards for {folder_name}")
         except Exception as e:
             print(f"Error downloading {folder_name}: {e}")
-    
+
+    # Downloads for one character run while the browsers discover the next
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as downloads:
+            # Replays never start a browser: URL lists come straight from the store
+            if store.replaying:
+                discovered = replay_all(characters)
+            else:
+                discovered = discover_with_fallback(characters, args.concurrency, session, args.browser, images_dir)
+            for folder_name, image_urls in discovered:
+                print(f"Queued {len(image_urls)} downloads for {folder_name} -> {images_dir / folder_name}")
+                downloads.submit(download, folder_name, image_urls)
+    finally:
+        session.close()
+
     print("\n" + "="*60)
     print("All downloads complete!")
 
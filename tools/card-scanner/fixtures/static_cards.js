@@ -0,0 +1,47 @@
+// Script bundle for static_cards.html: loads the card list, then renders it
+// in lazy batches filtered by the level slider.
+(() => {
+  const BATCH = 6;
+  const CARD_LIST_URL = "static_cards.json";
+  let allCards = [];
+  let visible = [];
+  let rendered = 0;
+
+  function renderBatch() {
+    const cards = document.getElementById('cards');
+    const end = Math.min(rendered + BATCH, visible.length);
+    for (; rendered < end; rendered++) {
+      const div = document.createElement('div');
+      div.className = 'card-img';
+      const img = document.createElement('img');
+      img.src = visible[rendered].image;
+      div.appendChild(img);
+      cards.appendChild(div);
+    }
+  }
+
+  function renderLevel(level) {
+    document.getElementById('cards').innerHTML = '';
+    rendered = 0;
+    visible = allCards.filter(card => card.level <= level);
+    renderBatch();
+  }
+
+  window.addEventListener('DOMContentLoaded', () => {
+    fetch(CARD_LIST_URL)
+      .then(response => response.json())
+      .then(data => {
+        allCards = data.cards;
+        setTimeout(() => renderLevel(1), 300);
+      });
+
+    const slider = document.getElementById('level');
+    slider.addEventListener('input', () => setTimeout(() => renderLevel(Number(slider.value)), 400));
+
+    new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting) && rendered < visible.length) {
+        setTimeout(renderBatch, 300);
+      }
+    }).observe(document.getElementById('sentinel'));
+  });
+})();
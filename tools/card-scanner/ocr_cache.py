@@ -0,0 +1,116 @@
+"""Persistent SQLite cache of card OCR results, keyed on image content."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from file_hash import file_sha256
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    initiative INTEGER,
+    level INTEGER
+);
+"""
+
+
+def cache_path_for(output_csv: str) -> str:
+    """Return the cache file that lives next to an output CSV."""
+    return os.path.splitext(output_csv)[0] + ".ocrcache.sqlite"
+
+
+class OcrCache:
+    """
+    OCR results keyed on (image content hash, OCR settings).
+
+    File hashes are remembered by path, size and mtime so unchanged images
+    are not re-read on every run. Every stored result is committed right
+    away, which doubles as a checkpoint: an interrupted scan picks up where
+    it stopped on the next run.
+    """
+
+    def __init__(self, path: str, settings: dict):
+        self.path = path
+        self.settings_fingerprint = json.dumps(settings, sort_keys=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def content_hash(self, image_path: str) -> str:
+        """Return the content hash of an image, re-hashing only if it changed on disk."""
+        file = os.path.abspath(image_path)
+        st = os.stat(file)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha256 FROM files WHERE file = ?", (file,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        sha256 = file_sha256(file)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (file, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (file, st.st_size, st.st_mtime_ns, sha256),
+        )
+        self.conn.commit()
+        return sha256
+
+    def key_for(self, image_path: str) -> str:
+        """Return the cache key for an image under the current OCR settings."""
+        sha256 = self.content_hash(image_path)
+        return hashlib.sha256(f"{sha256}:{self.settings_fingerprint}".encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return (initiative, level) for a key, or None on a miss."""
+        row = self.conn.execute(
+            "SELECT initiative, level FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, image_path: str, key: str, initiative, level) -> None:
+        """Store and commit one result."""
+        sha256 = self.content_hash(image_path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, sha256, initiative, level) VALUES (?, ?, ?, ?)",
+            (key, sha256, initiative, level),
+        )
+        self.conn.commit()
+
+    def clear(self) -> None:
+        """Drop every cached hash and result."""
+        self.conn.execute("DELETE FROM results")
+        self.conn.execute("DELETE FROM files")
+        self.conn.commit()
+
+    def prune(self) -> int:
+        """
+        Evict entries for files that no longer exist.
+
+        Returns:
+            Number of file entries removed
+        """
+        files = [row[0] for row in self.conn.execute("SELECT file FROM files")]
+        missing = [(file,) for file in files if not os.path.exists(file)]
+        self.conn.executemany("DELETE FROM files WHERE file = ?", missing)
+        self.conn.execute("DELETE FROM results WHERE sha256 NOT IN (SELECT sha256 FROM files)")
+        self.conn.commit()
+        return len(missing)
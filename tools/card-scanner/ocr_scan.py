@@ -1,10 +1,23 @@
-import easyocr
 from PIL import Image
 import os
 import csv
 import argparse
-import re
+import importlib.util
 import numpy as np
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from digit_templates import DEFAULT_TEMPLATES_FILE, DigitTemplates
+from ocr_cache import OcrCache, cache_path_for
+from ocr_server import default_socket_path, read_digits_remote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import metrics
+from file_hash import file_sha256
 
 # Initialize EasyOCR reader (downloads model on first run)
 READER = None
@@ -12,112 +25,494 @@ READER = None
 def get_reader():
     global READER
     if READER is None:
+        # Imported here so the template engine never loads torch
+        import easyocr
         print("Loading EasyOCR model...")
         READER = easyocr.Reader(['en'], gpu=False)
     return READER
 
 
-DEBUG_CROPS = True  # Set to True to save crop images for debugging
+def easyocr_available() -> bool:
+    """Whether EasyOCR can run: a warm ocr_server.py, or the package installed here."""
+    return os.path.exists(default_socket_path()) or importlib.util.find_spec("easyocr") is not None
+
+
+TEMPLATES = None
+
+def get_templates():
+    global TEMPLATES
+    if TEMPLATES is None:
+        TEMPLATES = DigitTemplates.load(DEFAULT_TEMPLATES_FILE)
+    return TEMPLATES
+
+
+# easyocr: EasyOCR only; template: digit templates only;
+# hybrid: templates, with EasyOCR for crops below MIN_TEMPLATE_CONFIDENCE
+# (without EasyOCR, hybrid keeps the template reads, like template does)
+ENGINES = ("easyocr", "template", "hybrid")
+MIN_TEMPLATE_CONFIDENCE = 0.9
+# Template-only matches below this are reported as unreadable (e.g. level "X")
+MIN_TEMPLATE_MATCH = 0.5
+
+
+# Set by start_debug_writer() (--debug-crops DIR) to save every crop as PNG
+DEBUG_WRITER = None
+
+# Card size the crop boxes below are measured on
+REFERENCE_SIZE = (750, 1050)
+
+# Level: upper left corner (44, 40), size 32x47
+LEVEL_BOX = (44, 40, 44 + 32, 40 + 47)  # (left, top, right, bottom)
+
+# Initiative: position (331, 520), size 90x85
+INITIATIVE_BOX = (331, 520, 331 + 90, 520 + 85)  # (left, top, right, bottom)
+
+ALLOWLIST = '0123456789'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+CSV_FIELDS = ["card_name", "initiative", "level", "file"]
+
+# Cards handed to a worker (or to one batched readtext call) at a time
+CHUNK_SIZE = 16
+
+
+class CropWriter:
+    """Background thread that saves debug crops off the OCR hot loop."""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                path, crop = item
+                crop.save(path)
+            except Exception as e:
+                print(f"  Error saving debug crop: {e}")
+            finally:
+                self.queue.task_done()
+    
+    def submit(self, image_path: str, initiative_crop: Image.Image, level_crop: Image.Image) -> None:
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        self.queue.put((os.path.join(self.directory, f"{base_name}_initiative.png"), initiative_crop))
+        self.queue.put((os.path.join(self.directory, f"{base_name}_level.png"), level_crop))
+    
+    def flush(self) -> None:
+        """Block until every submitted crop is on disk."""
+        self.queue.join()
+    
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+
+def start_debug_writer(directory: str) -> None:
+    global DEBUG_WRITER
+    if DEBUG_WRITER is None:
+        DEBUG_WRITER = CropWriter(directory)
+
+
+def stop_debug_writer() -> None:
+    global DEBUG_WRITER
+    if DEBUG_WRITER is not None:
+        DEBUG_WRITER.close()
+        DEBUG_WRITER = None
+
+
+def _scale_box(box: tuple, scale_x: float, scale_y: float) -> tuple:
+    left, top, right, bottom = box
+    return (round(left * scale_x), round(top * scale_y), round(right * scale_x), round(bottom * scale_y))
+
+
+def pad_box(box: tuple, padding: int) -> tuple:
+    """Grow a (left, top, right, bottom) box by padding pixels on every side."""
+    left, top, right, bottom = box
+    return (left - padding, top - padding, right + padding, bottom + padding)
 
-def extract_card_data(image_path: str) -> dict:
+
+def load_crops(image_path: str, padding: int = 0) -> tuple[np.ndarray, np.ndarray]:
     """
-    Extract initiative and level from a Gloomhaven card image.
+    Crop the initiative and level regions out of a card image.
+    
+    Boxes are scaled to the image's size and the crops resized back to
+    REFERENCE_SIZE, so every crop of a kind has the same shape. The image
+    is closed as soon as both crops are taken.
     
     Args:
         image_path: Path to the card image
+        padding: Extra reference-size pixels of context around each box
         
     Returns:
-        Dict with card_name, initiative, level
+        Tuple of (initiative_crop, level_crop) as numpy arrays
     """
-    img = Image.open(image_path)
-    width, height = img.size
+    with Image.open(image_path) as img:
+        scale_x = img.width / REFERENCE_SIZE[0]
+        scale_y = img.height / REFERENCE_SIZE[1]
+        crops = []
+        for box in (pad_box(INITIATIVE_BOX, padding), pad_box(LEVEL_BOX, padding)):
+            crop = img.crop(_scale_box(box, scale_x, scale_y))
+            if crop.size != (box[2] - box[0], box[3] - box[1]):
+                # Oversized source: bring crops back to reference size so batches stay uniform
+                crop = crop.resize((box[2] - box[0], box[3] - box[1]))
+            crops.append(crop)
     
-    # Level: upper left corner (44, 40), size 32x47
-    level_box = (44, 40, 44 + 32, 40 + 47)  # (left, top, right, bottom)
-    
-    # Initiative: position (331, 520), size 90x85
-    initiative_box = (331, 520, 331 + 90, 520 + 85)  # (left, top, right, bottom)
-    
-    initiative_crop = img.crop(initiative_box)
-    level_crop = img.crop(level_box)
+    initiative_crop, level_crop = crops
     
     # Save debug crops
-    if DEBUG_CROPS:
-        os.makedirs("debug_crops", exist_ok=True)
-        base_name = os.path.splitext(os.path.basename(image_path))[0]
-        initiative_crop.save(f"debug_crops/{base_name}_initiative.png")
-        level_crop.save(f"debug_crops/{base_name}_level.png")
+    if DEBUG_WRITER is not None:
+        DEBUG_WRITER.submit(image_path, initiative_crop, level_crop)
     
     # Convert crops to numpy arrays for EasyOCR
-    initiative_np = np.array(initiative_crop)
-    level_np = np.array(level_crop)
+    return np.array(initiative_crop), np.array(level_crop)
+
+
+def read_digits(crops: list[np.ndarray]) -> list[str]:
+    """
+    Run OCR over a batch of equally sized crops in one grouped call.
+    
+    Args:
+        crops: Crops of the same region (all initiative or all level)
+        
+    Returns:
+        Recognized text per crop ("" when nothing was found)
+    """
+    if not crops:
+        return []
+    
+    # A warm ocr_server.py saves loading the model in this process
+    texts = read_digits_remote(crops, ALLOWLIST)
+    if texts is not None:
+        return texts
     
     reader = get_reader()
     
     # OCR - allowlist only digits
-    initiative_results = reader.readtext(initiative_np, allowlist='0123456789')
-    level_results = reader.readtext(level_np, allowlist='0123456789')
+    results = reader.readtext_batched(crops, allowlist=ALLOWLIST, batch_size=len(crops))
     
     # Extract text from results
-    initiative_text = initiative_results[0][1] if initiative_results else ""
-    level_text = level_results[0][1] if level_results else ""
+    return [result[0][1] if result else "" for result in results]
+
+
+def recognize_digits(crops: list[np.ndarray], kind: str, engine: str = "easyocr") -> list[str]:
+    """
+    Read a batch of crops of one kind with the chosen engine.
     
-    # Validate range
-    initiative = None
-    if initiative_text.isdigit():
-        val = int(initiative_text)
-        if 1 <= val <= 99:
-            initiative = val
+    Args:
+        crops: Crops of the same region
+        kind: "initiative" or "level" (selects the digit templates)
+        engine: One of ENGINES
+        
+    Returns:
+        Recognized text per crop ("" when nothing was found)
+    """
+    if engine == "easyocr":
+        return read_digits(crops)
     
-    level = None
-    if level_text.isdigit():
-        val = int(level_text)
-        if 1 <= val <= 9:
-            level = val
+    matches = get_templates().recognize_batch(crops, kind)
+    if engine == "template":
+        return [text if confidence >= MIN_TEMPLATE_MATCH else "" for text, confidence in matches]
     
-    card_name = os.path.splitext(os.path.basename(image_path))[0]
+    texts = [text for text, _ in matches]
+    uncertain = [i for i, (_, confidence) in enumerate(matches) if confidence < MIN_TEMPLATE_CONFIDENCE]
+    if uncertain and not easyocr_available():
+        _warn_no_easyocr()
+        return [text if confidence >= MIN_TEMPLATE_MATCH else "" for text, confidence in matches]
     
+    # hybrid: only low-confidence crops go through EasyOCR
+    for i, text in zip(uncertain, read_digits([crops[i] for i in uncertain])):
+        texts[i] = text
+    return texts
+
+
+EASYOCR_WARNED = False
+
+def _warn_no_easyocr() -> None:
+    global EASYOCR_WARNED
+    if not EASYOCR_WARNED:
+        print("EasyOCR is not installed and no OCR server is running; "
+              "hybrid keeps the template reads of uncertain crops")
+        EASYOCR_WARNED = True
+
+
+def parse_initiative(text: str):
+    """Return the initiative (1-99) from OCR text, or None."""
+    if text.isdigit():
+        val = int(text)
+        if 1 <= val <= 99:
+            return val
+    return None
+
+
+def parse_level(text: str):
+    """Return the level (1-9) from OCR text, or None."""
+    if text.isdigit():
+        val = int(text)
+        if 1 <= val <= 9:
+            return val
+    return None
+
+
+def ocr_settings(engine: str = "easyocr") -> dict:
+    """Settings that change OCR output; part of every cache key."""
+    settings = {
+        "initiative_box": INITIATIVE_BOX,
+        "level_box": LEVEL_BOX,
+        "allowlist": ALLOWLIST,
+        "engine": engine,
+    }
+    if engine != "easyocr":
+        settings["templates"] = file_sha256(DEFAULT_TEMPLATES_FILE)
+        settings["min_template_confidence"] = MIN_TEMPLATE_CONFIDENCE
+        settings["min_template_match"] = MIN_TEMPLATE_MATCH
+    if engine == "hybrid":
+        # Results differ with and without the EasyOCR fallback; installing it re-reads the cards
+        settings["easyocr"] = easyocr_available()
+    return settings
+
+
+def empty_card_data(image_path: str) -> dict:
+    """Row used when a card could not be read."""
     return {
-        "card_name": card_name,
-        "initiative": initiative,
-        "level": level,
+        "card_name": os.path.splitext(os.path.basename(image_path))[0],
+        "initiative": None,
+        "level": None,
         "file": image_path
     }
 
 
-def scan_cards(image_dir: str, output_csv: str) -> None:
+def extract_batch(image_paths: list[str], engine: str = "easyocr") -> list[dict]:
+    """
+    Extract initiative and level from several card images.
+    
+    The initiative crops of all cards go through OCR in one grouped call,
+    and the level crops in another, instead of two calls per card.
+    
+    Args:
+        image_paths: Paths to the card images
+        engine: One of ENGINES
+        
+    Returns:
+        List of dicts with card_name, initiative, level, file (same order
+        as image_paths; cards that failed to load have None values)
+    """
+    loaded = []
+    with metrics.span("ocr.decode"):
+        for image_path in image_paths:
+            start = time.perf_counter()
+            try:
+                loaded.append((image_path, load_crops(image_path)))
+            except Exception as e:
+                print(f"  Error reading {image_path}: {e}")
+                metrics.count("ocr.load_errors")
+            metrics.observe("ocr.decode_ms", (time.perf_counter() - start) * 1000)
+    
+    texts = {}
+    for i, kind in enumerate(("initiative", "level")):
+        start = time.perf_counter()
+        with metrics.span("ocr.recognize"):
+            texts[kind] = recognize_digits([crops[i] for _, crops in loaded], kind, engine)
+        if loaded:
+            # Crops are recognized in one batch; record the per-crop share
+            metrics.observe(f"ocr.{kind}_latency_ms", (time.perf_counter() - start) * 1000 / len(loaded))
+    initiative_texts, level_texts = texts["initiative"], texts["level"]
+    metrics.count("ocr.cards", len(image_paths))
+    
+    by_path = {}
+    for (image_path, _), initiative_text, level_text in zip(loaded, initiative_texts, level_texts):
+        data = empty_card_data(image_path)
+        data["initiative"] = parse_initiative(initiative_text)
+        data["level"] = parse_level(level_text)
+        by_path[image_path] = data
+    
+    return [by_path.get(image_path) or empty_card_data(image_path) for image_path in image_paths]
+
+
+def extract_card_data(image_path: str, engine: str = "easyocr") -> dict:
+    """
+    Extract initiative and level from a Gloomhaven card image.
+    
+    Args:
+        image_path: Path to the card image
+        engine: One of ENGINES
+        
+    Returns:
+        Dict with card_name, initiative, level
+    """
+    return extract_batch([image_path], engine)[0]
+
+
+def _init_worker(torch_threads: int, engine: str, debug_crops: str = None) -> None:
+    """Process pool initializer: load the recognizer once per worker."""
+    if debug_crops:
+        start_debug_writer(debug_crops)
+    if engine != "easyocr":
+        get_templates()
+    if engine == "template" or os.path.exists(default_socket_path()):
+        # Nothing to preload: no EasyOCR needed, or a warm server handles it
+        # (read_digits still loads a model lazily if the server goes away)
+        return
+    if engine == "hybrid" and not easyocr_available():
+        return
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    get_reader()
+
+
+def _scan_chunk(image_paths: list[str], engine: str = "easyocr") -> list[dict]:
+    """
+    Process pool task: scan one chunk.
+    
+    Unreadable images become empty rows (extract_batch), but a recognizer
+    that can't be loaded or fails raises, so the scan exits non-zero
+    instead of writing a CSV of blanks.
+    """
+    try:
+        return extract_batch(image_paths, engine)
+    finally:
+        # Worker processes can be torn down at any time after returning
+        if DEBUG_WRITER is not None:
+            DEBUG_WRITER.flush()
+
+
+def _scan_chunk_in_worker(image_paths: list[str], engine: str = "easyocr") -> tuple[list[dict], dict]:
+    """Process pool task: scan one chunk and hand this worker's metrics back to the parent."""
+    rows = _scan_chunk(image_paths, engine)
+    return rows, metrics.snapshot(reset=True)
+
+
+def iter_card_data(filepaths: list[str], workers: int = 1, engine: str = "easyocr",
+                   debug_crops: str = None):
+    """
+    Yield card data for each file, in the order given.
+    
+    With workers > 1 the files are sharded into chunks across a process
+    pool. Results are streamed back in input order, so the output is
+    identical to a serial run.
+    
+    Args:
+        filepaths: Card image paths
+        workers: Number of OCR worker processes
+        engine: One of ENGINES
+        debug_crops: Directory to save crop PNGs to (off by default)
+    """
+    chunks = [filepaths[i:i + CHUNK_SIZE] for i in range(0, len(filepaths), CHUNK_SIZE)]
+    
+    if workers <= 1 or len(chunks) <= 1:
+        if debug_crops:
+            start_debug_writer(debug_crops)
+        try:
+            for chunk in chunks:
+                yield from _scan_chunk(chunk, engine)
+        finally:
+            stop_debug_writer()
+        return
+    
+    workers = min(workers, len(chunks))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(torch_threads, engine, debug_crops)) as executor:
+        for rows, worker_metrics in executor.map(partial(_scan_chunk_in_worker, engine=engine), chunks):
+            metrics.merge(worker_metrics)
+            yield from rows
+
+
+def list_card_images(image_dir: str) -> list[str]:
+    """Return the sorted card image paths in a directory."""
+    return [
+        os.path.join(image_dir, filename)
+        for filename in sorted(os.listdir(image_dir))
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def iter_cached_card_data(filepaths: list[str], cache: OcrCache, workers: int = 1,
+                          engine: str = "easyocr", debug_crops: str = None):
+    """
+    Yield card data for each file, serving unchanged images from the cache.
+    
+    Only cache misses go through OCR. Each new result is stored as soon as
+    it is produced, so an interrupted scan resumes where it stopped.
+    
+    Args:
+        filepaths: Card image paths
+        cache: Open OCR result cache
+        workers: Number of OCR worker processes for cache misses
+        engine: One of ENGINES
+        debug_crops: Directory to save crop PNGs of cache misses to
+    """
+    keys = [cache.key_for(filepath) for filepath in filepaths]
+    cached = {key: cache.get(key) for key in keys}
+    misses = [filepath for filepath, key in zip(filepaths, keys) if cached[key] is None]
+    print(f"Cache: {len(filepaths) - len(misses)} hit(s), {len(misses)} to scan")
+    metrics.count("ocr.cache_hits", len(filepaths) - len(misses))
+    metrics.count("ocr.cache_misses", len(misses))
+    
+    fresh = iter_card_data(misses, workers, engine, debug_crops)
+    for filepath, key in zip(filepaths, keys):
+        if cached[key] is not None:
+            data = empty_card_data(filepath)
+            data["initiative"], data["level"] = cached[key]
+        else:
+            data = next(fresh)
+            # Rows with nothing read are usually load errors; retry them next run
+            if data["initiative"] is not None or data["level"] is not None:
+                cache.put(filepath, key, data["initiative"], data["level"])
+        yield data
+
+
+def scan_cards(image_dir: str, output_csv: str, workers: int = 1, use_cache: bool = True,
+               rebuild: bool = False, prune: bool = False, engine: str = "easyocr",
+               debug_crops: str = None) -> None:
     """
     Scan all card images in a directory and save data to CSV.
     
     Args:
         image_dir: Directory containing card images
         output_csv: Path to output CSV file
+        workers: Number of OCR worker processes (1 scans in-process)
+        use_cache: Serve unchanged images from the cache next to output_csv
+        rebuild: Discard the cache and re-OCR everything
+        prune: Evict cache entries for files that no longer exist
+        engine: One of ENGINES
+        debug_crops: Directory to save crop PNGs to (off by default)
     """
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+    filepaths = list_card_images(image_dir)
     
     cards_data = []
     
-    for filename in sorted(os.listdir(image_dir)):
-        if filename.lower().endswith(image_extensions):
-            filepath = os.path.join(image_dir, filename)
-            print(f"Scanning: {filename}")
-            
-            try:
-                data = extract_card_data(filepath)
-                cards_data.append(data)
-                print(f"  Initiative: {data['initiative']}, Level: {data['level']}")
-            except Exception as e:
-                print(f"  Error: {e}")
-                cards_data.append({
-                    "card_name": os.path.splitext(filename)[0],
-                    "initiative": None,
-                    "level": None,
-                    "file": filepath
-                })
+    cache = OcrCache(cache_path_for(output_csv), ocr_settings(engine)) if use_cache else None
+    try:
+        if cache and rebuild:
+            cache.clear()
+        if cache and prune:
+            print(f"Pruned {cache.prune()} deleted file(s) from cache")
+        
+        if cache:
+            rows = iter_cached_card_data(filepaths, cache, workers, engine, debug_crops)
+        else:
+            rows = iter_card_data(filepaths, workers, engine, debug_crops)
+        
+        for data in rows:
+            cards_data.append(data)
+            print(f"Scanned: {os.path.basename(data['file'])}")
+            print(f"  Initiative: {data['initiative']}, Level: {data['level']}")
+    finally:
+        if cache:
+            cache.close()
     
     # Write to CSV
     with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=["card_name", "initiative", "level", "file"])
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
         writer.writerows(cards_data)
     
@@ -128,7 +523,16 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scan Gloomhaven cards and extract data")
     parser.add_argument("image_dir", nargs="?", default="images", help="Directory containing card images")
     parser.add_argument("-o", "--output", default="cards.csv", help="Output CSV file")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="OCR worker processes (default: 1)")
+    parser.add_argument("--engine", choices=ENGINES, default="easyocr",
+                        help="Digit recognizer: easyocr, template, or hybrid (templates with EasyOCR fallback)")
+    parser.add_argument("--debug-crops", metavar="DIR", help="Save the initiative/level crops as PNGs in DIR")
+    parser.add_argument("--no-cache", action="store_true", help="Re-OCR every image without reading or writing the cache")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the OCR cache and rescan everything")
+    parser.add_argument("--prune", action="store_true", help="Evict cache entries for deleted files")
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
     
-    scan_cards(args.image_dir, args.output)
+    metrics.run(scan_cards, args, args.image_dir, args.output, args.workers, use_cache=not args.no_cache,
+                rebuild=args.rebuild, prune=args.prune, engine=args.engine, debug_crops=args.debug_crops)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Warm OCR server: keeps one EasyOCR model loaded and reads crop batches
+sent over a Unix domain socket.
+
+Start it once in a terminal:
+    python ocr_server.py
+and ocr_scan.py will send its crops here instead of loading its own model.
+When the server isn't running, ocr_scan.py falls back to in-process OCR.
+
+Wire format (both directions): a 4-byte big-endian length, then the payload.
+Requests are an .npz archive with crop_0..crop_N arrays and an 'allowlist'
+string; replies are a JSON list with one recognized string per crop.
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import tempfile
+
+import numpy as np
+
+# Seconds a client waits on the server (connect, send, reply) before running OCR itself;
+# a batch takes a few seconds on CPU, so this only trips on a hung server
+REQUEST_TIMEOUT = 60
+# Seconds the server waits for a client to finish sending a request
+RECEIVE_TIMEOUT = 10
+
+
+def default_socket_path() -> str:
+    """Per-user socket path, overridable with OCR_SERVER_SOCKET."""
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.environ.get("OCR_SERVER_SOCKET") or os.path.join(tempfile.gettempdir(), f"room-mavens-ocr-{uid}.sock")
+
+
+def _send_message(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("OCR server connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock: socket.socket) -> bytes:
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return _recv_exact(sock, size)
+
+
+def encode_request(crops: list[np.ndarray], allowlist: str) -> bytes:
+    buffer = io.BytesIO()
+    arrays = {f"crop_{i}": crop for i, crop in enumerate(crops)}
+    np.savez(buffer, allowlist=np.array(allowlist), **arrays)
+    return buffer.getvalue()
+
+
+def decode_request(payload: bytes) -> tuple[list[np.ndarray], str]:
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        count = len(data.files) - 1
+        return [data[f"crop_{i}"] for i in range(count)], str(data["allowlist"])
+
+
+def read_digits_remote(crops: list[np.ndarray], allowlist: str, socket_path: str = None,
+                       timeout: float = REQUEST_TIMEOUT):
+    """
+    Read crops through a running OCR server.
+
+    Returns:
+        Recognized text per crop, or None when no server is reachable or it
+        doesn't answer within timeout seconds (the caller then runs OCR in-process)
+    """
+    socket_path = socket_path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            _send_message(sock, encode_request(crops, allowlist))
+            return json.loads(_recv_message(sock))
+    except socket.timeout:
+        print(f"OCR server at {socket_path} did not answer within {timeout}s; reading in-process")
+        return None
+    except (ConnectionError, FileNotFoundError, OSError):
+        return None
+
+
+class OcrRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One client at a time: a stalled one must not hold up the rest
+        self.request.settimeout(RECEIVE_TIMEOUT)
+        try:
+            crops, allowlist = decode_request(_recv_message(self.request))
+        except (ConnectionError, socket.timeout, ValueError, KeyError) as e:
+            print(f"Bad request: {e}")
+            return
+
+        results = self.server.reader.readtext_batched(crops, allowlist=allowlist, batch_size=len(crops))
+        texts = [result[0][1] if result else "" for result in results]
+        try:
+            _send_message(self.request, json.dumps(texts).encode())
+        except OSError as e:
+            # The client gave up (REQUEST_TIMEOUT) and is reading in-process
+            print(f"Client went away before the reply: {e}")
+            return
+        print(f"Read {len(crops)} crop(s)")
+
+
+def serve(socket_path: str) -> None:
+    """Load the model once and serve OCR requests until interrupted."""
+    # Reuse ocr_scan's loader so both paths build the reader the same way
+    from ocr_scan import get_reader
+
+    reader = get_reader()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # The socket file is created owner-only, so no other user can connect even briefly
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, OcrRequestHandler)
+    finally:
+        os.umask(old_umask)
+
+    with server:
+        server.reader = reader
+        print(f"OCR server listening on {socket_path} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve EasyOCR over a Unix domain socket")
+    parser.add_argument("--socket", default=default_socket_path(), help="Socket path (default: %(default)s)")
+
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("Unix domain sockets are not available on this platform")
+
+    serve(args.socket)
@@ -1,10 +1,20 @@
 import requests
-from bs4 import BeautifulSoup
+import html.parser
 import os
+import json
 import urllib.parse
 import argparse
 import time
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+import replay_store
 
 
 HEADERS = {
@@ -13,6 +23,419 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.5",
 }
 
+# Sidecar file in each output directory recording ETag/Last-Modified per image
+DOWNLOAD_MANIFEST = ".downloads.json"
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+
+# Page readiness polling (seconds): a value counts as settled once unchanged for STABLE_FOR
+POLL_INTERVAL = 0.1
+STABLE_FOR = 0.5
+CARD_COUNT_EXPR = "Array.from(document.querySelectorAll('img')).filter(img => img.src.includes('character-ability-cards')).length"
+CARD_COUNT_JS = f"return {CARD_COUNT_EXPR}"
+SCROLL_STATE_JS = f"return [document.body.scrollHeight, {CARD_COUNT_EXPR}]"
+
+# Browserless discovery: card image URLs in the page, its scripts and the JSON they load
+# (no braces, so URLs still being assembled in template literals don't count)
+CARD_URL_RE = re.compile(r"""[^\s"'`<>(){}\\,;]*character-ability-cards/[^\s"'`<>(){}\\,;]+?\.(?:jpe?g|png|webp)"""
+                         r"""(?:\?[^\s"'`<>(){}\\,;]*)?""", re.IGNORECASE)
+JSON_ENDPOINT_RE = re.compile(r"""["'`]([^"'`\s<>]+\.json(?:\?[^"'`\s<>]*)?)["'`]""")
+# Script bundles and JSON endpoints fetched per page, at most
+MAX_STATIC_RESOURCES = 20
+
+
+def create_session(pool_size: int = DOWNLOAD_WORKERS, retries: int = DOWNLOAD_RETRIES) -> requests.Session:
+    """Create a pooled requests session that retries transient failures with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def image_filename(img_url: str, index: int) -> str:
+    """Local filename for an image URL (its basename, or a numbered fallback)."""
+    original_name = os.path.basename(urllib.parse.urlparse(img_url).path)
+    if not original_name:
+        original_name = f"image_{index:04d}.jpg"
+    return original_name
+
+
+def load_download_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, DOWNLOAD_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_download_manifest(output_dir: str, manifest: dict) -> None:
+    path = os.path.join(output_dir, DOWNLOAD_MANIFEST)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def download_image(session: requests.Session, img_url: str, filename: str, validators: dict = None):
+    """
+    Download one image, sending a conditional request when validators are known.
+    
+    The body is streamed to a temporary file and moved into place only when
+    complete, so an interrupted download never leaves a truncated image.
+    
+    Args:
+        session: Shared HTTP session
+        img_url: Image URL
+        filename: Destination path
+        validators: Previously recorded {"etag", "last_modified"}, if any
+    
+    Returns:
+        (status, validators) where status is "downloaded" or "not-modified"
+    """
+    store = replay_store.get_store()
+    if store.replaying:
+        store.copy_to(f"get:{img_url}", filename)
+        return "downloaded", store.lookup(f"get:{img_url}")["meta"]
+    
+    # Recording always fetches the full body so the store holds what the server sent
+    headers = {}
+    if validators and os.path.exists(filename) and not store.recording:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    
+    start = time.perf_counter()
+    with session.get(img_url, headers=headers, stream=True, timeout=30) as response:
+        if response.status_code == 304:
+            metrics.observe("download.latency_ms", (time.perf_counter() - start) * 1000)
+            return "not-modified", validators
+        response.raise_for_status()
+        
+        tmp_filename = filename + ".part"
+        try:
+            with open(tmp_filename, "wb") as f:
+                for block in response.iter_content(chunk_size=64 * 1024):
+                    f.write(block)
+                    metrics.count("download.bytes", len(block))
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        metrics.observe("download.latency_ms", (time.perf_counter() - start) * 1000)
+        
+        validators = {
+            "url": img_url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if store.recording:
+            store.put_file(f"get:{img_url}", filename, validators)
+        return "downloaded", validators
+
+
+def download_images(image_urls: list[str], output_dir: str, max_workers: int = DOWNLOAD_WORKERS,
+                    refresh: bool = False, session: requests.Session = None) -> list[str]:
+    """
+    Download image URLs into output_dir over a bounded thread pool.
+    
+    Files that already exist are skipped before any request is made, unless
+    refresh is set, in which case they are revalidated with a conditional
+    request using the ETag/Last-Modified recorded in DOWNLOAD_MANIFEST.
+    
+    Args:
+        image_urls: Image URLs to fetch
+        output_dir: Directory to save images to
+        max_workers: Concurrent downloads
+        refresh: Revalidate existing files instead of skipping them
+        session: Session to reuse (one is created if not given)
+    
+    URLs are deduplicated by local filename first, so no two downloads
+    ever write the same file; a second URL with an already taken basename
+    is skipped with a warning.
+    
+    Returns:
+        List of local image paths, in the order of image_urls
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_download_manifest(output_dir)
+    own_session = session is None
+    session = session or create_session(max_workers)
+    
+    targets = {}  # filename -> first URL that maps to it
+    for i, url in enumerate(image_urls):
+        filename = os.path.join(output_dir, image_filename(url, i))
+        if filename not in targets:
+            targets[filename] = url
+        elif targets[filename] != url:
+            print(f"Skipped {url}: {os.path.basename(filename)} already comes from {targets[filename]}")
+            metrics.count("download.name_collisions")
+    image_urls, filenames = list(targets.values()), list(targets)
+    recording = replay_store.get_store().recording
+    
+    def fetch(img_url: str, filename: str):
+        name = os.path.basename(filename)
+        if os.path.exists(filename) and not (refresh or recording):
+            print(f"Skipped (exists): {filename}")
+            metrics.count("download.skipped")
+            return filename
+        try:
+            status, validators = download_image(session, img_url, filename, manifest.get(name))
+        except Exception as e:
+            print(f"Failed to download {img_url}: {e}")
+            metrics.count("download.failed")
+            return None
+        manifest[name] = validators
+        metrics.count(f"download.{status}")
+        print(f"Skipped (not modified): {filename}" if status == "not-modified" else f"Downloaded: {filename}")
+        return filename
+    
+    try:
+        with metrics.span("download"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(fetch, image_urls, filenames))
+    finally:
+        if own_session:
+            session.close()
+        save_download_manifest(output_dir, manifest)
+    
+    return [filename for filename in results if filename]
+
+
+class PageResources(html.parser.HTMLParser):
+    """
+    Collect image URLs, script sources and JSON endpoints from a character page.
+
+    With container_class, only images inside an element carrying that class
+    count, so thumbnails elsewhere on the page (other classes, navigation)
+    are ignored.
+    """
+
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self, container_class: str = None):
+        super().__init__()
+        self.container_class = container_class
+        self.images = []
+        self.scripts = []
+        self.endpoints = []
+        self.inline_scripts = []
+        self.has_level_slider = False
+        self.in_script = False
+        self.open_tags = []  # (tag, opens a container)
+
+    def in_container(self) -> bool:
+        return not self.container_class or any(container for _, container in self.open_tags)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag not in self.VOID_TAGS:
+            classes = (attrs.get("class") or "").split()
+            self.open_tags.append((tag, bool(self.container_class) and self.container_class in classes))
+        if tag in ("img", "source") and self.in_container():
+            for name in ("src", "data-src"):
+                if attrs.get(name):
+                    self.images.append(attrs[name])
+            for name in ("srcset", "data-srcset"):
+                if attrs.get(name):
+                    self.images.extend(part.split()[0] for part in attrs[name].split(",") if part.strip())
+        elif tag == "input" and attrs.get("type") == "range" and attrs.get("id") == "level":
+            self.has_level_slider = True
+        elif tag == "script":
+            self.in_script = True
+            if attrs.get("src"):
+                self.scripts.append(attrs["src"])
+        elif tag == "link" and attrs.get("href") and attrs.get("as") in ("fetch", "script"):
+            (self.endpoints if attrs["as"] == "fetch" else self.scripts).append(attrs["href"])
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self.in_script = False
+        # Close back to the matching open tag (browsers tolerate unclosed <p>, <li>, ...)
+        for i in range(len(self.open_tags) - 1, -1, -1):
+            if self.open_tags[i][0] == tag:
+                del self.open_tags[i:]
+                break
+
+    def handle_data(self, data):
+        if self.in_script:
+            self.inline_scripts.append(data)
+            self.endpoints.extend(JSON_ENDPOINT_RE.findall(data))
+
+
+def find_card_urls(text: str) -> list[str]:
+    """Card image URL strings in HTML, JS or JSON text (JSON-escaped slashes included)."""
+    return CARD_URL_RE.findall(text.replace("\\/", "/"))
+
+
+def scope_tokens(url: str, character: str = None) -> set[str]:
+    """Lowercase names a character's card directory may carry: the page's last path segment and the folder name."""
+    tokens = set()
+    segment = urllib.parse.urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+    if segment:
+        tokens.add(os.path.splitext(segment)[0].lower())
+    if character:
+        name = character.lower()
+        tokens.update({name, name.replace(" ", "-"), name.replace(" ", "_"), name.replace(" ", "")})
+    return tokens
+
+
+def scope_to_character(image_urls: list[str], tokens: set[str]) -> list[str]:
+    """
+    Keep the card URLs that belong to one character.
+
+    URLs all in one directory are taken as they are. A shared bundle or
+    JSON file listing several classes spreads them over several
+    directories; then only the directories naming the character are kept,
+    and if none does the result is ambiguous and nothing is returned.
+    """
+    directories = {}
+    for image_url in image_urls:
+        directory = os.path.dirname(urllib.parse.urlparse(image_url).path).lower()
+        directories.setdefault(directory, []).append(image_url)
+    if len(directories) <= 1:
+        return image_urls
+    matching = {d for d in directories if any(token and token in d.rsplit("/", 1)[-1] for token in tokens)}
+    if not matching:
+        print(f"Card URLs span {len(directories)} directories and none names the character")
+        return []
+    return [image_url for d, urls in directories.items() if d in matching for image_url in urls]
+
+
+def count_card_images(directory: str) -> int:
+    """Card images already downloaded to a directory (0 if it doesn't exist)."""
+    try:
+        return sum(1 for name in os.listdir(directory) if name.lower().endswith((".jpeg", ".jpg", ".png", ".webp")))
+    except FileNotFoundError:
+        return 0
+
+
+def fetch_text(session: requests.Session, url: str, timeout: float = 30, key: str = None) -> str:
+    """
+    GET url as text through the replay store.
+
+    Replays read the text recorded under key (default "get:<url>") and raise
+    ReplayMiss if there is none; recordings store what the server sent.
+    """
+    store = replay_store.get_store()
+    key = key or f"get:{url}"
+    if store.replaying:
+        return store.get_bytes(key).decode("utf-8")
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    if store.recording:
+        store.put_bytes(key, response.text.encode("utf-8"), {"content_type": response.headers.get("Content-Type")})
+    return response.text
+
+
+def rendered_image_urls(url: str, page_source: str) -> list[str]:
+    """Card image URLs of a page rendered by the browser, picked like collect_image_urls picks them."""
+    parser = PageResources()
+    parser.feed(page_source)
+    image_urls = []
+    for src in parser.images:
+        absolute = urllib.parse.urljoin(url, src)
+        if "character-ability-cards" in absolute and absolute not in image_urls:
+            image_urls.append(absolute)
+    return image_urls
+
+
+def discover_static(url: str, session: requests.Session = None, timeout: float = 30, div_class: str = None,
+                    character: str = None, min_cards: int = 0) -> tuple[list[str], str]:
+    """
+    Find a character page's card image URLs over plain HTTP, without a browser.
+    
+    The page is parsed with the standard library's HTML parser for <img>/<source>
+    URLs inside div_class containers and card URLs in inline scripts, and
+    every same-origin script bundle and JSON endpoint it references
+    (<script src>, <link as=fetch|script>, ".json" string literals in scripts)
+    is fetched once and searched for character-ability-cards image URLs.
+    Relative URLs resolve against the page, like the browser's fetch() and
+    <img src> do. Matches are then scoped to the character (scope_to_character).
+    The page and every resource go through fetch_text, so a recorded run
+    can be replayed without the network.
+    
+    A result that looks partial is rejected, so the caller falls back to
+    Selenium, which moves the level slider to 9:
+    - fewer cards than min_cards (e.g. how many were downloaded last time)
+    - only server-rendered <img> cards on a page with a level slider and no
+      card list from a script or JSON to confirm them: those are the level 1 cards
+    
+    Args:
+        url: Character page URL
+        session: Session to reuse (one is created if not given)
+        timeout: Seconds per request
+        div_class: Class of the elements holding card images in the page
+        character: Character (folder) name, to pick its cards out of shared bundles
+        min_cards: Fewest cards a complete result can have
+    
+    Returns:
+        (image_urls, page_html); image_urls is empty when the cards are only
+        built by script at runtime or the result looks partial, in which case
+        the caller falls back to Selenium
+    """
+    own_session = session is None
+    session = session or create_session()
+    origin = urllib.parse.urlparse(url).netloc
+    page_found, resource_found = [], []
+    
+    def add(found, candidates):
+        for candidate in candidates:
+            absolute = urllib.parse.urljoin(url, candidate)
+            if absolute not in found:
+                found.append(absolute)
+    
+    seen = set()
+    try:
+        with metrics.span("discover.static"):
+            page = fetch_text(session, url, timeout, key=f"page:{url}")
+            parser = PageResources(div_class)
+            parser.feed(page)
+            add(page_found, (src for src in parser.images if "character-ability-cards" in src))
+            for script in parser.inline_scripts:
+                add(resource_found, find_card_urls(script))
+            
+            queue = [(u, "script") for u in parser.scripts] + [(u, "json") for u in parser.endpoints]
+            while queue and len(seen) < MAX_STATIC_RESOURCES:
+                resource, kind = queue.pop(0)
+                resource = urllib.parse.urljoin(url, resource)
+                if resource in seen or urllib.parse.urlparse(resource).netloc != origin:
+                    continue
+                seen.add(resource)
+                try:
+                    body = fetch_text(session, resource, timeout)
+                except (requests.RequestException, replay_store.ReplayMiss) as e:
+                    print(f"Skipped {resource}: {e}")
+                    continue
+                metrics.count("discover.static_resources")
+                add(resource_found, find_card_urls(body))
+                if kind == "script":
+                    queue.extend((endpoint, "json") for endpoint in JSON_ENDPOINT_RE.findall(body))
+    finally:
+        if own_session:
+            session.close()
+    
+    found = scope_to_character(page_found + [u for u in resource_found if u not in page_found],
+                               scope_tokens(url, character))
+    print(f"Found {len(found)} card images over HTTP ({len(seen)} scripts/endpoints fetched)")
+    metrics.count("discover.static_pages")
+    metrics.count("discover.image_urls", len(found))
+    if found and len(found) < min_cards:
+        print(f"Only {len(found)} of at least {min_cards} cards; the static result looks partial")
+        metrics.count("discover.static_partial")
+        return [], page
+    if found and parser.has_level_slider and not resource_found and not min_cards:
+        print("Only server-rendered cards on a page with a level slider; they may be level 1 only")
+        metrics.count("discover.static_partial")
+        return [], page
+    return found, page
+
 
 def create_driver():
     """Create a Selenium Chrome driver."""
@@ -23,7 +446,8 @@ def create_driver():
     options.add_argument("--headless")
     options.add_argument("--disable-gpu")
     options.add_argument(f"user-agent={HEADERS['User-Agent']}")
-    return webdriver.Chrome(options=options)
+    with metrics.span("browser.start"):
+        return webdriver.Chrome(options=options)
 
 
 def discover_page_elements(driver):
@@ -47,8 +471,8 @@ def discover_page_elements(driver):
     print("=== END DISCOVERY ===\n")
 
 
-def set_slider(driver, slider_value: int, wait_after: int = 2):
-    """Find and set level slider to a specific value."""
+def set_slider(driver, slider_value: int, wait_after: float = 2):
+    """Find and set level slider to a specific value, then wait (up to wait_after seconds) for the cards to settle."""
     from selenium.webdriver.common.by import By
     
     slider = driver.find_element(By.CSS_SELECTOR, "input#level[type='range']")
@@ -61,105 +485,259 @@ def set_slider(driver, slider_value: int, wait_after: int = 2):
     
     print(f"Found slider: min={slider.get_attribute('min')}, max={slider.get_attribute('max')}, current={slider.get_attribute('value')}")
     
+    before = driver.execute_script(CARD_COUNT_JS)
     driver.execute_script(f"arguments[0].value = {slider_value};", slider)
     driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", slider)
     driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", slider)
     
-    print(f"Set slider to {slider_value}, waiting {wait_after}s for content to update...")
-    time.sleep(wait_after)
+    print(f"Set slider to {slider_value}, waiting for content to update...")
+    settle_after_slider(driver, before, wait_after, rising=False)
     return True
 
 
-def extract_images(url: str, div_class: str, output_dir: str = "images", wait_time: int = 5) -> list[str]:
+def wait_for(driver, script: str, condition, timeout: float):
+    """
+    Poll a JS expression until condition(value) holds.
+    
+    Returns:
+        The first value meeting the condition, or the last value seen when timeout runs out
+    """
+    deadline = time.monotonic() + timeout
+    value = driver.execute_script(script)
+    while not condition(value) and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = driver.execute_script(script)
+    return value
+
+
+def wait_until_stable(driver, script: str, timeout: float, quiet: float = STABLE_FOR):
+    """
+    Poll a JS expression until its value stops changing.
+    
+    Args:
+        driver: Selenium driver
+        script: JS returning a JSON-comparable value (e.g. a count)
+        timeout: Give up after this many seconds and return the last value
+        quiet: Seconds the value must stay unchanged
+    
+    Returns:
+        The settled value
+    """
+    deadline = time.monotonic() + timeout
+    last = driver.execute_script(script)
+    since = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = driver.execute_script(script)
+        now = time.monotonic()
+        if value != last:
+            last, since = value, now
+        elif now - since >= quiet:
+            break
+    return last
+
+
+def settle_after_slider(driver, before: int, timeout: float, rising: bool = True) -> int:
+    """
+    Wait for the re-render a slider change triggers, then for it to settle.
+    
+    A stable card count alone can't tell a finished re-render from one that
+    hasn't started yet: the old count is stable too. So this first waits (up
+    to timeout) for the count to rise above before (or, unless rising, to
+    change at all), then for it to stop changing.
+    
+    Returns:
+        The settled card count
     """
-    Extract all card images for a character using Selenium.
+    deadline = time.monotonic() + timeout
+    changed = (lambda count: count > before) if rising else (lambda count: count != before)
+    if not changed(wait_for(driver, CARD_COUNT_JS, changed, timeout)):
+        print(f"Card count still {before} after {timeout}s; collecting what is there")
+        return before
+    return wait_until_stable(driver, CARD_COUNT_JS, max(0, deadline - time.monotonic()))
+
+
+def collect_image_urls(driver, wait_time: float = 5) -> list[str]:
+    """
+    Collect card image URLs from the character page in the current tab.
     Scrolls page to trigger lazy-loading of all images.
     
+    Every phase waits on page state instead of sleeping: cards appearing,
+    the card count settling after the slider moves, and the page height
+    and card count settling after each scroll. Each phase's time is logged.
+    
+    Args:
+        driver: Selenium driver whose current tab shows the character page
+        wait_time: Maximum seconds to wait for each phase
+    
+    Returns:
+        List of card image URLs
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    
+    timings = {}
+    
+    # Wait for the first cards to render
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, wait_time, poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+            and d.execute_script(CARD_COUNT_JS) > 0
+        )
+    except TimeoutException:
+        print(f"No card images after {wait_time}s, collecting what is there")
+    timings["load"] = time.monotonic() - start
+    
+    # Set slider to max
+    start = time.monotonic()
+    before = driver.execute_script(CARD_COUNT_JS)
+    moved = driver.execute_script("""
+        const slider = document.querySelector('input#level[type="range"]');
+        if (!slider) return false;
+        const nativeInputValueSetter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, 'value').set;
+        nativeInputValueSetter.call(slider, 9);
+        slider.dispatchEvent(new Event('input', { bubbles: true }));
+        slider.dispatchEvent(new Event('change', { bubbles: true }));
+        return true;
+    """)
+    if moved:
+        print("Set slider to level 9")
+        settle_after_slider(driver, before, wait_time)
+    timings["slider"] = time.monotonic() - start
+    
+    # Scroll down to trigger lazy loading
+    print("Scrolling to load all images...")
+    start = time.monotonic()
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    while True:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        new_height, _ = wait_until_stable(driver, SCROLL_STATE_JS, wait_time)
+        if new_height == last_height:
+            break
+        last_height = new_height
+    
+    # Scroll back up and collect all images
+    driver.execute_script("window.scrollTo(0, 0);")
+    timings["scroll"] = time.monotonic() - start
+    
+    # Get all image URLs from the page source
+    image_urls = driver.execute_script("""
+        return Array.from(document.querySelectorAll('img'))
+            .map(img => img.src)
+            .filter(src => src.includes('character-ability-cards'));
+    """)
+    
+    print(f"Found {len(image_urls)} card images")
+    print("Timing: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+    for phase, seconds in timings.items():
+        metrics.add_span(f"discover.{phase}", seconds)
+    metrics.count("discover.pages")
+    metrics.count("discover.image_urls", len(image_urls))
+    return image_urls
+
+
+def record_discovery(url: str, page_source: str, image_urls: list[str], discovery: dict = None) -> None:
+    """
+    Save a character page and its card URLs to the replay store when recording.
+
+    Args:
+        url: Character page URL
+        page_source: The page as fetched (static) or as rendered (browser)
+        image_urls: The card URLs discovered in it
+        discovery: How they were discovered, for replayed_image_urls to repeat:
+            {"source": "browser"} (default), or {"source": "static"} plus the
+            div_class, character and min_cards given to discover_static
+    """
+    store = replay_store.get_store()
+    if store.recording:
+        store.put_bytes(f"page:{url}", page_source.encode("utf-8"),
+                        {"content_type": "text/html", "discovery": discovery or {"source": "browser"}})
+        store.put_json(f"urls:{url}", image_urls)
+
+
+def replayed_image_urls(url: str) -> list[str]:
+    """
+    Card URLs of a recorded character page, extracted again from the stored page.
+
+    Statically discovered pages go through discover_static again, with their
+    scripts and JSON served from the store; browser-rendered pages are parsed
+    with rendered_image_urls. A result that differs from the URLs recorded at
+    the time is reported (and counted as replay.mismatches), and the recorded
+    URLs are used if the extraction finds none. Stores without the page fall
+    back to the recorded URLs.
+
+    Raises:
+        ReplayMiss: The page was never recorded
+    """
+    store = replay_store.get_store()
+    recorded = store.get_json(f"urls:{url}")
+    ref = store.lookup(f"page:{url}")
+    if ref is None:
+        print(f"No page recorded for {url}; using the {len(recorded)} recorded card URLs")
+        return recorded
+
+    discovery = dict(ref["meta"].get("discovery", {"source": "browser"}))
+    if discovery.pop("source") == "static":
+        image_urls, _ = discover_static(url, **discovery)
+    else:
+        image_urls = rendered_image_urls(url, store.get_bytes(f"page:{url}").decode("utf-8"))
+    if image_urls != recorded:
+        print(f"Replayed extraction found {len(image_urls)} card URLs, {len(recorded)} were recorded "
+              f"({len(set(image_urls) - set(recorded))} new, {len(set(recorded) - set(image_urls))} missing)")
+        metrics.count("replay.mismatches")
+    if not image_urls:
+        image_urls = recorded
+    print(f"Replayed {len(image_urls)} card image URLs for {url}")
+    return image_urls
+
+
+def extract_images(url: str, div_class: str, output_dir: str = "images", wait_time: float = 10,
+                   refresh: bool = False, browser: bool = False) -> list[str]:
+    """
+    Extract all card images for a character.
+    
+    Card URLs are looked up over plain HTTP first (discover_static); Selenium
+    only starts when that fails, finds nothing or finds fewer cards than
+    output_dir already holds, or when browser is set.
+    
     Args:
         url: The URL of the character page
         div_class: Class name of elements containing images
         output_dir: Directory to save downloaded images
-        wait_time: Seconds to wait for JS to load
+        wait_time: Maximum seconds to wait for each page phase
+        refresh: Revalidate already-downloaded images with conditional requests
+        browser: Always discover with Selenium
     
     Returns:
         List of downloaded image paths
     """
-    from selenium.webdriver.common.by import By
+    if replay_store.get_store().replaying:
+        return download_images(replayed_image_urls(url), output_dir, refresh=refresh)
+    
+    if not browser:
+        discovery = {"div_class": div_class, "min_cards": count_card_images(output_dir)}
+        try:
+            image_urls, page = discover_static(url, **discovery)
+        except requests.RequestException as e:
+            print(f"Static discovery failed: {e}")
+            image_urls = []
+        if image_urls:
+            record_discovery(url, page, image_urls, {"source": "static", **discovery})
+            return download_images(image_urls, output_dir, refresh=refresh)
+        print("No card images in the static page, falling back to Selenium")
     
     print(f"Fetching with Selenium: {url}")
     driver = create_driver()
     
     try:
         driver.get(url)
-        time.sleep(wait_time)
-        
-        # Set slider to max
-        driver.execute_script("""
-            const slider = document.querySelector('input#level[type="range"]');
-            if (slider) {
-                const nativeInputValueSetter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, 'value').set;
-                nativeInputValueSetter.call(slider, 9);
-                slider.dispatchEvent(new Event('input', { bubbles: true }));
-                slider.dispatchEvent(new Event('change', { bubbles: true }));
-            }
-        """)
-        print("Set slider to level 9")
-        time.sleep(2)
-        
-        # Scroll down to trigger lazy loading
-        print("Scrolling to load all images...")
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-        
-        # Scroll back up and collect all images
-        driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)
-        
-        # Get all image URLs from the page source
-        image_urls = driver.execute_script("""
-            return Array.from(document.querySelectorAll('img'))
-                .map(img => img.src)
-                .filter(src => src.includes('character-ability-cards'));
-        """)
-        
-        print(f"Found {len(image_urls)} card images")
-        
+        image_urls = collect_image_urls(driver, wait_time)
+        record_discovery(url, driver.page_source, image_urls)
     finally:
         driver.quit()
     
-    os.makedirs(output_dir, exist_ok=True)
-    
-    downloaded = []
-    for i, img_url in enumerate(image_urls):
-        try:
-            img_response = requests.get(img_url, headers=HEADERS)
-            img_response.raise_for_status()
-            
-            original_name = os.path.basename(urllib.parse.urlparse(img_url).path)
-            if not original_name:
-                original_name = f"image_{i:04d}.jpg"
-            filename = os.path.join(output_dir, original_name)
-            
-            if os.path.exists(filename):
-                print(f"Skipped (exists): {filename}")
-                downloaded.append(filename)
-                continue
-            
-            with open(filename, "wb") as f:
-                f.write(img_response.content)
-            
-            downloaded.append(filename)
-            print(f"Downloaded: {filename}")
-        except Exception as e:
-            print(f"Failed to download {img_url}: {e}")
-    
-    return downloaded
+    return download_images(image_urls, output_dir, refresh=refresh)
 
 
 if __name__ == "__main__":
@@ -167,9 +745,15 @@ if __name__ == "__main__":
     parser.add_argument("url", help="URL of the webpage")
     parser.add_argument("--class", dest="div_class", default="card-img", help="Class name of elements containing images (default: card-img)")
     parser.add_argument("-o", "--output", default="images", help="Output directory")
-    parser.add_argument("--wait", type=int, default=3, help="Seconds to wait for JS to load (default: 3)")
+    parser.add_argument("--wait", type=float, default=10, help="Maximum seconds to wait for each page phase (default: 10)")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate existing images (ETag/Last-Modified) instead of skipping them")
+    parser.add_argument("--browser", action="store_true", help="Discover cards with Selenium even if the static page has them")
+    replay_store.add_arguments(parser)
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
+    replay_store.configure_from_args(args)
     
-    images = extract_images(args.url, args.div_class, args.output, args.wait)
+    images = metrics.run(extract_images, args, args.url, args.div_class, args.output, args.wait, args.refresh,
+                         args.browser)
     print(f"\nDownloaded {len(images)} images")
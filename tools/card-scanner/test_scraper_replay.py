@@ -0,0 +1,105 @@
+"""
+Replay tests for the card scraper: record a discovery into a temporary
+store, then replay it with the fixture server shut down, so every page,
+script and JSON file has to come from the store.
+
+    python -m pytest tools/card-scanner/test_scraper_replay.py
+"""
+
+from pathlib import Path
+
+import pytest
+
+from bench_downloads import serve_directory
+from scraper import discover_static, record_discovery, rendered_image_urls, replayed_image_urls
+
+import metrics
+import replay_store
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+RENDERED_PAGE = """<!DOCTYPE html>
+<html><body>
+<input type="range" id="level" min="1" max="9" value="9">
+<header><img src="/img/logo.png"></header>
+<div id="cards">
+  <div class="card-img"><img src="character-ability-cards/fixture/card-01.jpeg"></div>
+  <div class="card-img"><img src="/character-ability-cards/fixture/card-02.jpeg"></div>
+  <div class="card-img"><img src="https://cdn.example/character-ability-cards/fixture/card-03.jpeg"></div>
+  <div class="card-img"><img src="character-ability-cards/fixture/card-01.jpeg"></div>
+</div>
+</body></html>
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Switch the process-wide replay store (in tmp_path) between modes; off again afterwards."""
+    yield lambda mode: replay_store.configure(mode, tmp_path)
+    replay_store.configure("off")
+
+
+def record_static(page: str, **discovery) -> tuple[str, list[str]]:
+    """Discover a fixture page over HTTP while recording; returns (url, image_urls)."""
+    server = serve_directory(FIXTURES_DIR)
+    url = f"http://127.0.0.1:{server.server_address[1]}/{page}"
+    try:
+        image_urls, page_source = discover_static(url, **discovery)
+        record_discovery(url, page_source, image_urls, {"source": "static", **discovery})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return url, image_urls
+
+
+def test_static_discovery_replays_from_store(store):
+    store("record")
+    url, image_urls = record_static("static_cards.html", div_class="card-img")
+    assert len(set(image_urls)) == 30
+
+    store("replay")
+    metrics.snapshot(reset=True)
+    assert replayed_image_urls(url) == image_urls
+    assert "replay.mismatches" not in metrics.snapshot(reset=True)["counters"]
+
+
+def test_shared_bundle_replays_scoped_to_character(store):
+    store("record")
+    url, image_urls = record_static("static_shared.html", div_class="card-img", character="Fixture")
+    assert len(image_urls) == 30
+    assert all("/fixture/" in image_url for image_url in image_urls)
+
+    store("replay")
+    assert replayed_image_urls(url) == image_urls
+
+
+def test_rendered_page_replays_from_store(store):
+    url = "http://fixture.invalid/class/fixture"
+    expected = [
+        "http://fixture.invalid/class/character-ability-cards/fixture/card-01.jpeg",
+        "http://fixture.invalid/character-ability-cards/fixture/card-02.jpeg",
+        "https://cdn.example/character-ability-cards/fixture/card-03.jpeg",
+    ]
+    assert rendered_image_urls(url, RENDERED_PAGE) == expected
+
+    store("record")
+    record_discovery(url, RENDERED_PAGE, expected)
+    store("replay")
+    assert replayed_image_urls(url) == expected
+
+
+def test_replay_reports_extraction_changes(store):
+    url = "http://fixture.invalid/class/fixture"
+    store("record")
+    record_discovery(url, RENDERED_PAGE, ["http://fixture.invalid/character-ability-cards/fixture/old.jpeg"])
+
+    store("replay")
+    metrics.snapshot(reset=True)
+    assert len(replayed_image_urls(url)) == 3
+    assert metrics.snapshot(reset=True)["counters"]["replay.mismatches"] == 1
+
+
+def test_unrecorded_page_is_a_miss(store):
+    store("replay")
+    with pytest.raises(replay_store.ReplayMiss):
+        replayed_image_urls("http://fixture.invalid/never-recorded")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Build the ability card manifest and its lookup index from images/.
+
+One character folder per subdirectory of images/, one card per image file.
+Two files are produced for the extension:
+
+    cards.json        {character: [card filename stem, ...]}
+    cards-index.json  precomputed name lookup, so content.js neither
+                      normalizes every card name nor brute-forces a
+                      Levenshtein distance against all of them at runtime
+
+The index holds the normalized names (same rules as normalizeForMatch in
+content.js), the (character, filename) each one maps to, and a BK-tree over
+the names for fuzzy matching within MAX_DISTANCE edits.
+
+Scanning is incremental: folders are listed with os.scandir and a folder is
+only re-read when its mtime changed since the last run (tracked in
+STAT_CACHE), and an output file is only rewritten when its content changed.
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+import metrics
+
+REPO_ROOT = Path(__file__).parent.parent
+IMAGES_DIR = REPO_ROOT / "images"
+MANIFEST_FILE = REPO_ROOT / "extension" / "cards.json"
+INDEX_FILE = REPO_ROOT / "extension" / "cards-index.json"
+STAT_CACHE = IMAGES_DIR / ".cards-manifest-cache.json"
+
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png', '.webp')
+# Item card images have their own manifest (extension/itemcards.json)
+EXCLUDED_FOLDERS = {"Items"}
+INDEX_VERSION = 1
+MAX_DISTANCE = 2
+
+
+def normalize_for_match(name: str) -> str:
+    """Python twin of normalizeForMatch in extension/content.js."""
+    name = name.lower()
+    name = re.sub(r"['`]", "", name)                  # strip apostrophes
+    name = re.sub(r"[^\w\s-]", "", name, flags=re.ASCII)  # strip other punctuation
+    name = re.sub(r"\s+", "-", name)                  # spaces to hyphens
+    name = re.sub(r"-+", "-", name)                   # collapse multiple hyphens
+    return name.strip("-")
+
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j - 1] + (ca != cb), previous[j] + 1, current[j - 1] + 1))
+        previous = current
+    return previous[-1]
+
+
+def load_stat_cache(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def scan_images(images_dir: Path = IMAGES_DIR, stat_cache: dict = None) -> tuple[dict, dict, int]:
+    """
+    List the card images in every character folder.
+
+    A folder's mtime changes whenever a file is added, removed or renamed in
+    it, so a folder whose mtime matches stat_cache reuses the cached list.
+
+    Args:
+        images_dir: Directory holding one folder per character
+        stat_cache: {folder: {"mtime_ns", "cards"}} from the previous run
+
+    Returns:
+        (cards, new_stat_cache, rescanned) where cards is {character: [stems]}
+        and rescanned is the number of folders that had to be read
+    """
+    stat_cache = stat_cache or {}
+    cards = {}
+    new_cache = {}
+    rescanned = 0
+
+    with os.scandir(images_dir) as entries:
+        folders = sorted((e for e in entries if e.is_dir() and e.name not in EXCLUDED_FOLDERS),
+                         key=lambda e: e.name)
+
+    for folder in folders:
+        mtime_ns = folder.stat().st_mtime_ns
+        cached = stat_cache.get(folder.name)
+        if cached and cached["mtime_ns"] == mtime_ns:
+            card_names = cached["cards"]
+        else:
+            rescanned += 1
+            with os.scandir(folder.path) as files:
+                card_names = sorted(
+                    os.path.splitext(f.name)[0] for f in files
+                    if f.is_file() and os.path.splitext(f.name)[1].lower() in IMAGE_EXTENSIONS
+                )
+        new_cache[folder.name] = {"mtime_ns": mtime_ns, "cards": card_names}
+
+        if card_names:
+            cards[folder.name] = card_names
+        else:
+            print(f"  Warning: No images in {folder.name}")
+
+    return cards, new_cache, rescanned
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over a list of names, by Levenshtein distance.
+
+    Nodes are [name_index, {distance: child}], which is also the JSON form
+    content.js walks. Ties between equally close names go to the lowest
+    index, matching the first-wins order of a linear scan.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.root = None
+        for i in range(len(names)):
+            self.add(i)
+
+    def add(self, index: int) -> None:
+        if self.root is None:
+            self.root = [index, {}]
+            return
+        node = self.root
+        while True:
+            distance = levenshtein(self.names[index], self.names[node[0]])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [index, {}]
+                return
+            node = child
+
+    def closest(self, query: str, max_distance: int = MAX_DISTANCE):
+        """Index of the closest name within max_distance, or None."""
+        best, best_distance = None, max_distance + 1
+        stack = [self.root] if self.root else []
+        while stack:
+            index, children = stack.pop()
+            distance = levenshtein(query, self.names[index])
+            if distance < best_distance or (best is not None and distance == best_distance and index < best):
+                best, best_distance = index, distance
+            radius = min(max_distance, best_distance)
+            for edge, child in children.items():
+                if abs(int(edge) - distance) <= radius:
+                    stack.append(child)
+        return best
+
+    @classmethod
+    def from_json(cls, names: list[str], root) -> "BKTree":
+        tree = cls([])
+        tree.names = names
+        tree.root = root
+        return tree
+
+
+def build_index(cards: dict) -> dict:
+    """
+    Build the lookup index for a {character: [stems]} manifest.
+
+    Returns:
+        {"version", "max_distance", "names": [normalized],
+         "targets": [[character, filename]], "bktree": node}
+        where names[i] maps to targets[i]
+    """
+    lookup = {}
+    for character, card_names in cards.items():
+        for card_name in card_names:
+            # Later entries win, like the runtime map content.js used to build
+            lookup[normalize_for_match(card_name)] = [character, card_name]
+
+    names = list(lookup)
+    return {
+        "version": INDEX_VERSION,
+        "max_distance": MAX_DISTANCE,
+        "names": names,
+        "targets": [lookup[name] for name in names],
+        "bktree": BKTree(names).root,
+    }
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write content to path unless it already holds exactly that; returns whether it wrote."""
+    try:
+        if path.read_text(encoding='utf-8') == content:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".part")
+    tmp_path.write_text(content, encoding='utf-8')
+    os.replace(tmp_path, path)
+    return True
+
+
+def build_manifest(images_dir: Path = IMAGES_DIR, manifest_file: Path = MANIFEST_FILE,
+                   index_file: Path = INDEX_FILE, stat_cache_file: Path = STAT_CACHE,
+                   force: bool = False) -> dict:
+    """
+    Scan images_dir and refresh manifest_file (and index_file, if given).
+
+    Args:
+        images_dir: Directory holding one folder per character
+        manifest_file: Where to write cards.json
+        index_file: Where to write cards-index.json, or None to skip it
+        stat_cache_file: Folder mtime cache kept between runs
+        force: Ignore the stat cache and re-read every folder
+
+    Returns:
+        The {character: [stems]} manifest
+    """
+    with metrics.span("manifest.scan"):
+        stat_cache = {} if force else load_stat_cache(stat_cache_file)
+        cards, new_cache, rescanned = scan_images(images_dir, stat_cache)
+        if new_cache != stat_cache:
+            write_if_changed(stat_cache_file, json.dumps(new_cache))
+    metrics.count("manifest.folders", len(new_cache))
+    metrics.count("manifest.folders_rescanned", rescanned)
+    metrics.count("manifest.folders_cached", len(new_cache) - rescanned)
+
+    outputs = [(manifest_file, json.dumps(cards, indent=2))]
+    if index_file:
+        with metrics.span("manifest.index"):
+            outputs.append((index_file, json.dumps(build_index(cards), separators=(',', ':'))))
+
+    total_cards = sum(len(c) for c in cards.values())
+    metrics.count("manifest.cards", total_cards)
+    print(f"Scanned {len(cards)} character(s) and {total_cards} card(s) ({rescanned} folder(s) re-read)")
+    with metrics.span("manifest.write"):
+        for path, content in outputs:
+            written = write_if_changed(path, content)
+            metrics.count("manifest.files_written" if written else "manifest.files_unchanged")
+            print(f"  {'Wrote' if written else 'Unchanged'}: {path}")
+    return cards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build cards.json and cards-index.json from images/")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_FILE, help="cards.json output path")
+    parser.add_argument("--index", type=Path, default=INDEX_FILE, help="cards-index.json output path")
+    parser.add_argument("--no-index", action="store_true", help="Only write cards.json")
+    parser.add_argument("--force", action="store_true", help="Re-read every folder, ignoring the stat cache")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(build_manifest, args, manifest_file=args.manifest,
+                index_file=None if args.no_index else args.index, force=args.force)
@@ -0,0 +1,14 @@
+"""Content hash of a file, shared by the manifest, rendition, OCR, scraper and refresh tools."""
+
+import hashlib
+
+BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path) -> str:
+    """Return the hex SHA-256 of a file's contents, read BLOCK_SIZE bytes at a time."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
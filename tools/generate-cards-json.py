@@ -1,37 +1,20 @@
 #!/usr/bin/env python3
-"""Generate cards.json manifest from images folder structure."""
+"""Generate cards.json manifest and cards-index.json from images folder structure."""
 
-import json
-import os
-from pathlib import Path
+import argparse
+
+import metrics
+from card_manifest import build_manifest
+
+
+def generate_cards_manifest(force: bool = False):
+    return build_manifest(force=force)
 
-def generate_cards_manifest():
-    script_dir = Path(__file__).parent
-    repo_root = script_dir.parent
-    images_dir = repo_root / "images"
-    output_file = repo_root / "extension" / "cards.json"
-    
-    cards = {}
-    
-    for folder in sorted(images_dir.iterdir()):
-        if folder.is_dir():
-            character_name = folder.name
-            card_names = []
-            
-            for image_file in sorted(folder.iterdir()):
-                if image_file.suffix.lower() in ('.jpeg', '.jpg', '.png', '.webp'):
-                    card_names.append(image_file.stem)
-            
-            if card_names:
-                cards[character_name] = card_names
-    
-    with open(output_file, 'w') as f:
-        json.dump(cards, f, indent=2)
-    
-    total_cards = sum(len(c) for c in cards.values())
-    print(f"Generated cards.json with {len(cards)} character(s) and {total_cards} card(s)")
-    for char, char_cards in cards.items():
-        print(f"  {char}: {len(char_cards)} cards")
 
 if __name__ == "__main__":
-    generate_cards_manifest()
+    parser = argparse.ArgumentParser(description="Update extension/cards.json and extension/cards-index.json")
+    parser.add_argument("--force", action="store_true", help="Re-read every folder, ignoring the stat cache")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics.run(generate_cards_manifest, args, args.force)
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Find duplicate and misnamed art in images/ with perceptual hashes.
+
+Card images get their names from the URL (scraper.py) or from the scraped
+item name and code (item_scraper.py), so a re-scrape can leave the same art
+under two names, and level variants can end up sharing one picture. Every
+image gets two HASH_SIZE x HASH_SIZE bit fingerprints, computed with NumPy
+over batches of images:
+
+    dHash  sign of the horizontal gradient of a (HASH_SIZE+1) x HASH_SIZE thumbnail
+    pHash  low-frequency DCT coefficients above their median (4x oversampled)
+
+All cards share the same frame, so 64 bit hashes put different cards within
+a few bits of each other; at 16x16 (256 bits) distinct cards stay well apart.
+
+Hashes are cached by file content (sha256) in CACHE_FILE, with a (size,
+mtime) stat cache so unchanged files are not even re-read, and files with
+identical bytes are only decoded once.
+
+Near-duplicate search uses a multi-index hash table: the hash is split into
+max_distance + 1 chunks, and by the pigeonhole principle two hashes within
+max_distance bits agree exactly on at least one chunk. Only images sharing a
+chunk are compared, so queries and the all-pairs report stay far below the
+n^2 comparisons of a linear scan. Bits the shared card frame fixes carry no
+information, so they are left out of the chunks; with them, one dHash chunk
+put 53 of the 175 distinct images in a single bucket.
+
+    python image_hashes.py                       # report near-duplicate groups
+    python image_hashes.py --query new-card.jpeg # closest existing images
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+import metrics
+from card_manifest import IMAGES_DIR, REPO_ROOT, load_stat_cache, write_if_changed
+from file_hash import file_sha256
+
+CACHE_FILE = IMAGES_DIR / ".image-hashes.json"
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png', '.webp')
+HASH_SIZE = 16
+HASH_KINDS = ("dhash", "phash")
+DEFAULT_MAX_DISTANCE = 10
+BATCH_SIZE = 64
+# Members of a group printed before "... and N more" (the JSON report has them all)
+MAX_LISTED = 10
+CACHE_VERSION = 1
+# A bit with the same value in at least this share of the indexed hashes is frame, not card
+FRAME_BIT_SHARE = 0.99
+
+
+def dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix, so D @ X @ D.T is the 2D DCT of X."""
+    k = np.arange(n)
+    matrix = np.sqrt(2 / n) * np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def load_thumbnails(path, hash_size: int = HASH_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """Grayscale (hash_size, hash_size+1) dHash and (4*hash_size)^2 pHash thumbnails of one image."""
+    with Image.open(path) as img:
+        # JPEGs decode straight at a reduced scale
+        img.draft("L", (4 * hash_size, 4 * hash_size))
+        gray = img.convert("L")
+        small = gray.resize((hash_size + 1, hash_size), Image.BILINEAR)
+        large = gray.resize((4 * hash_size, 4 * hash_size), Image.BILINEAR)
+    return np.asarray(small, dtype=np.float32), np.asarray(large, dtype=np.float32)
+
+
+def dhash_batch(thumbnails: np.ndarray) -> np.ndarray:
+    """(n, h, h+1) thumbnails -> (n, h*h/8) packed dHash bits."""
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    return np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+
+
+def phash_batch(thumbnails: np.ndarray, hash_size: int = HASH_SIZE) -> np.ndarray:
+    """(n, 4h, 4h) thumbnails -> (n, h*h/8) packed pHash bits."""
+    dct = dct_matrix(thumbnails.shape[1])
+    coefficients = dct @ thumbnails @ dct.T
+    low = coefficients[:, :hash_size, :hash_size].reshape(len(thumbnails), -1)
+    # The DC term only carries overall brightness; leave it out of the median
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(low > median, axis=1)
+
+
+def hash_files(paths: list[str], hash_size: int = HASH_SIZE) -> list[dict]:
+    """
+    dHash and pHash of several images, vectorized over the batch.
+
+    Returns:
+        [{"dhash": hex, "phash": hex}] in the order of paths
+    """
+    small, large = zip(*(load_thumbnails(path, hash_size) for path in paths))
+    dhashes = dhash_batch(np.stack(small))
+    phashes = phash_batch(np.stack(large), hash_size)
+    return [{"dhash": d.tobytes().hex(), "phash": p.tobytes().hex()} for d, p in zip(dhashes, phashes)]
+
+
+def list_images(images_dir: Path = IMAGES_DIR) -> list[Path]:
+    """Every image in every folder of images_dir, sorted (Items included)."""
+    images = []
+    with os.scandir(images_dir) as entries:
+        folders = [e for e in entries if e.is_dir()]
+    for folder in folders:
+        with os.scandir(folder.path) as files:
+            images.extend(Path(f.path) for f in files
+                          if f.is_file() and os.path.splitext(f.name)[1].lower() in IMAGE_EXTENSIONS)
+    return sorted(images)
+
+
+def load_hashes(images_dir: Path = IMAGES_DIR, cache_file: Path = CACHE_FILE, workers: int = None,
+                force: bool = False) -> tuple[list[str], list[str], dict]:
+    """
+    Hash every image under images_dir, reusing the cache.
+
+    Args:
+        images_dir: Directory holding one folder per character (and Items)
+        cache_file: Hash cache kept between runs
+        workers: Decoder processes (default: all cores)
+        force: Ignore the cache and rehash everything
+
+    Returns:
+        (paths, sha256s, hashes): image paths relative to the repo root, the
+        content hash of each, and {sha256: {"dhash", "phash"}}
+    """
+    cache = {} if force else load_stat_cache(cache_file)
+    if cache.get("version") != CACHE_VERSION or cache.get("hash_size") != HASH_SIZE:
+        cache = {}
+    stat_cache = cache.get("files", {})
+    hashes = cache.get("hashes", {})
+
+    paths, sha256s, files = [], [], {}
+    todo = {}  # sha256 -> one path with that content
+    for path in list_images(images_dir):
+        key = path.relative_to(REPO_ROOT).as_posix()
+        stat = path.stat()
+        cached = stat_cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            sha256 = cached[2]
+        else:
+            with metrics.span("hashes.sha256"):
+                sha256 = file_sha256(path)
+        files[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+        paths.append(key)
+        sha256s.append(sha256)
+        if sha256 not in hashes:
+            todo.setdefault(sha256, str(path))
+
+    print(f"{len(paths)} image(s), {len(set(sha256s))} distinct, {len(todo)} to hash")
+    metrics.count("hashes.images", len(paths))
+    metrics.count("hashes.computed", len(todo))
+    if todo:
+        pending = list(todo.items())
+        batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+        with metrics.span("hashes.compute"), ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(hash_files, [[path for _, path in batch] for batch in batches])
+            for batch, batch_hashes in zip(batches, results):
+                for (sha256, _), entry in zip(batch, batch_hashes):
+                    hashes[sha256] = entry
+
+    # Drop hashes of content no file has any more
+    hashes = {sha256: hashes[sha256] for sha256 in sorted(set(sha256s))}
+    cache = {"version": CACHE_VERSION, "hash_size": HASH_SIZE, "files": files, "hashes": hashes}
+    write_if_changed(cache_file, json.dumps(cache))
+    return paths, sha256s, hashes
+
+
+def to_bits(hex_hashes: list[str]) -> np.ndarray:
+    """Hex hashes -> (n, bytes) uint8 array."""
+    return np.array([np.frombuffer(bytes.fromhex(h), dtype=np.uint8) for h in hex_hashes]).reshape(len(hex_hashes), -1)
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bit distance between packed hashes, broadcasting over leading axes."""
+    return np.bitwise_count(a ^ b).sum(axis=-1, dtype=np.int64)
+
+
+class MultiIndexHash:
+    """
+    Multi-index hash table over packed binary hashes.
+
+    The bits are cut into max_distance + 1 chunks (more if needed so every
+    chunk key fits in 64 bits), and each chunk gets a table from its value
+    to the rows having it. Any two hashes within max_distance bits share at
+    least one chunk value, so candidates come from one lookup per chunk and
+    are then checked with a vectorized Hamming distance.
+
+    Bits that are the same in FRAME_BIT_SHARE of the hashes are left out of
+    the chunks (the pigeonhole argument holds for any subset of the bits,
+    and distances are still measured on all of them), and the remaining bits
+    are dealt out round-robin, so each chunk samples the whole image rather
+    than one band of it. On the card images this cuts the dHash all-pairs
+    candidates from 6618 to 732 (of 15225 pairs) and the largest bucket from
+    53 to 16 images.
+    """
+
+    def __init__(self, hashes: np.ndarray, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.hashes = hashes
+        self.max_distance = max_distance
+        share = np.unpackbits(hashes, axis=1).mean(axis=0) if len(hashes) else np.full(hashes.shape[1] * 8, 0.5)
+        columns = np.flatnonzero(np.maximum(share, 1 - share) < FRAME_BIT_SHARE)
+        if len(columns) <= max_distance:
+            columns = np.arange(hashes.shape[1] * 8)
+        chunks = min(len(columns), max(max_distance + 1, -(-len(columns) // 64)))
+        self.chunks = [columns[i::chunks] for i in range(chunks)]
+        keys = self.chunk_keys(hashes)
+        self.tables = []
+        for column in keys.T:
+            order = np.argsort(column, kind="stable")
+            values, starts = np.unique(column[order], return_index=True)
+            self.tables.append((values, np.split(order, starts[1:])))
+
+    def chunk_keys(self, hashes: np.ndarray) -> np.ndarray:
+        """(n, chunks) uint64 key of every chunk of every hash."""
+        bits = np.unpackbits(hashes, axis=1).astype(np.uint64)
+        keys = np.empty((len(hashes), len(self.chunks)), dtype=np.uint64)
+        for i, columns in enumerate(self.chunks):
+            weights = np.uint64(1) << np.arange(len(columns), dtype=np.uint64)
+            keys[:, i] = bits[:, columns] @ weights
+        return keys
+
+    def query(self, hash_bits: np.ndarray, max_distance: int = None) -> list[tuple[int, int]]:
+        """Rows within max_distance (<= the index's) of one hash, as sorted (distance, row)."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        keys = self.chunk_keys(hash_bits[None, :])[0]
+        candidates = []
+        for key, (values, rows) in zip(keys, self.tables):
+            position = np.searchsorted(values, key)
+            if position < len(values) and values[position] == key:
+                candidates.append(rows[position])
+        if not candidates:
+            return []
+        candidates = np.unique(np.concatenate(candidates))
+        distances = hamming(self.hashes[candidates], hash_bits)
+        keep = distances <= max_distance
+        return sorted(zip(distances[keep].tolist(), candidates[keep].tolist()))
+
+    def pairs(self) -> list[tuple[int, int, int]]:
+        """Every pair of rows within max_distance, as sorted (distance, i, j) with i < j."""
+        n = len(self.hashes)
+        found = []
+        for _, rows in self.tables:
+            for bucket in rows:
+                if len(bucket) < 2:
+                    continue
+                i, j = np.triu_indices(len(bucket), 1)
+                first, second = bucket[i], bucket[j]
+                found.append(np.minimum(first, second).astype(np.int64) * n + np.maximum(first, second))
+        if not found:
+            return []
+        # A pair agreeing on several chunks is found once per chunk
+        codes = np.unique(np.concatenate(found))
+        first, second = codes // n, codes % n
+        distances = hamming(self.hashes[first], self.hashes[second])
+        keep = distances <= self.max_distance
+        return sorted(zip(distances[keep].tolist(), first[keep].tolist(), second[keep].tolist()))
+
+
+def group_pairs(count: int, pairs: list[tuple[int, int, int]]) -> list[list[int]]:
+    """Connected groups of the near-duplicate graph over rows 0..count-1, singletons included."""
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for _, i, j in pairs:
+        parent[find(i)] = find(j)
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def find_duplicates(images_dir: Path = IMAGES_DIR, cache_file: Path = CACHE_FILE, kind: str = "phash",
+                    max_distance: int = DEFAULT_MAX_DISTANCE, workers: int = None, force: bool = False,
+                    queries: list[Path] = (), report_file: Path = None) -> dict:
+    """
+    Report groups of near-duplicate images, or the closest matches of query images.
+
+    Files with identical bytes are indexed once, so a cluster of exact copies
+    costs one entry instead of n^2 pairs.
+
+    Args:
+        images_dir: Directory holding one folder per character (and Items)
+        cache_file: Hash cache kept between runs
+        kind: Hash the index is built on ("dhash" or "phash")
+        max_distance: Largest bit distance counted as a near duplicate
+        workers: Decoder processes (default: all cores)
+        force: Ignore the cache and rehash everything
+        queries: Images to look up in the index instead of reporting all pairs
+        report_file: Also write the report as JSON here
+
+    Returns:
+        {"kind", "max_distance", "groups": [[{"path", "sha256", "dhash", "phash"}]],
+         "queries": {image: [...]}} where dhash/phash are the distances to the
+        group's first image (or to the query)
+    """
+    paths, sha256s, hashes = load_hashes(images_dir, cache_file, workers, force)
+    contents = sorted(set(sha256s))
+    paths_by_content = {sha256: [] for sha256 in contents}
+    for path, sha256 in zip(paths, sha256s):
+        paths_by_content[sha256].append(path)
+    bits = {k: to_bits([hashes[sha256][k] for sha256 in contents]) for k in HASH_KINDS}
+    with metrics.span("hashes.index"):
+        index = MultiIndexHash(bits[kind], max_distance)
+
+    def describe(row, reference):
+        distances = {k: int(hamming(bits[k][row], reference[k])) for k in HASH_KINDS}
+        return [{"path": path, "sha256": contents[row], **distances} for path in paths_by_content[contents[row]]]
+
+    def show(members):
+        for member in members[:MAX_LISTED]:
+            print(f"  {member['path']}  dhash {member['dhash']}, phash {member['phash']}")
+        if len(members) > MAX_LISTED:
+            print(f"  ... and {len(members) - MAX_LISTED} more")
+
+    report = {"kind": kind, "max_distance": max_distance, "groups": [], "queries": {}}
+    if queries:
+        for query, entry in zip(queries, hash_files([str(q) for q in queries])):
+            reference = {k: to_bits([entry[k]])[0] for k in HASH_KINDS}
+            matches = [m for _, row in index.query(reference[kind]) for m in describe(row, reference)]
+            report["queries"][str(query)] = matches
+            print(f"\n{query}: {len(matches)} match(es) within {max_distance} bits")
+            show(matches)
+    else:
+        with metrics.span("hashes.pairs"):
+            pairs = index.pairs()
+        for group in group_pairs(len(contents), pairs):
+            reference = {k: bits[k][group[0]] for k in HASH_KINDS}
+            members = [m for row in group for m in describe(row, reference)]
+            if len(members) > 1:
+                report["groups"].append(members)
+        report["groups"].sort(key=lambda members: (-len(members), members[0]["path"]))
+
+        print(f"{len(pairs)} near-duplicate pair(s) of distinct files within {max_distance} bits of {kind}, "
+              f"{len(report['groups'])} group(s)")
+        for members in report["groups"]:
+            identical = len({m["sha256"] for m in members}) == 1
+            print(f"\n{len(members)} images{' (identical files)' if identical else ''}:")
+            show(members)
+
+    if report_file:
+        write_if_changed(Path(report_file), json.dumps(report, indent=1))
+        print(f"\nReport written to {report_file}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find duplicate and misnamed images with perceptual hashes")
+    parser.add_argument("--query", nargs="+", type=Path, metavar="IMAGE",
+                        help="Look up these images instead of reporting all near-duplicate pairs")
+    parser.add_argument("--hash", choices=HASH_KINDS, default="phash", help="Hash to match on (default: phash)")
+    parser.add_argument("-d", "--max-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f"Largest bit distance (of {HASH_SIZE * HASH_SIZE}) counted as a duplicate "
+                             f"(default: {DEFAULT_MAX_DISTANCE})")
+    parser.add_argument("-o", "--output", type=Path, help="Also write the report as JSON")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Decoder processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="Rehash every image, ignoring the cache")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(find_duplicates, args, kind=args.hash, max_distance=args.max_distance, workers=args.workers,
+                force=args.force, queries=args.query or (), report_file=args.output)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Transcode card images into small, cache-forever renditions for the extension.
+
+Every images/<Character>/<card>.jpeg is resized to each width in WIDTHS
+(never upscaled) and encoded as WebP, and optionally AVIF. Files are written
+to renditions/<Character>/ with the first HASH_LENGTH hex digits of their
+content hash in the name:
+
+    renditions/Bruiser/brute-force-240w.3f9c0a1b2d.webp
+
+so a URL never changes meaning and can be cached indefinitely.
+
+Two files record the result:
+
+    extension/card-renditions.json   what content.js loads: each card's
+        renditions as [format, width, path] rows, so it can pick the
+        smallest rendition that covers the card's on-screen width
+        {"version", "fields", "cards": {"Character/card": [[format, width, path], ...]}}
+    images/.renditions-cache.json    build state for incremental runs: the
+        settings, each card's source hash (with the size and mtime it was
+        taken at, so unchanged sources are not re-read) and every
+        rendition's height and byte count (not shipped with the extension)
+
+A card is only re-encoded when its source hash or the encoding settings
+changed, or a rendition file has gone missing; encoding runs across a
+process pool. Without the build state every card is encoded again, which
+gives the same files.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+import metrics
+from card_manifest import EXCLUDED_FOLDERS, IMAGES_DIR, REPO_ROOT, write_if_changed
+from file_hash import file_sha256
+
+RENDITIONS_DIR = REPO_ROOT / "renditions"
+RENDITIONS_MANIFEST = REPO_ROOT / "extension" / "card-renditions.json"
+RENDITIONS_STATE = IMAGES_DIR / ".renditions-cache.json"
+
+SOURCE_EXTENSIONS = ('.jpeg', '.jpg', '.png')
+WIDTHS = (240, 480, 750)
+# Preferred format first; content.js uses the first format a card has
+FORMATS = {
+    "avif": {"quality": 50, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+}
+DEFAULT_FORMATS = ("webp",)
+HASH_LENGTH = 10
+MANIFEST_VERSION = 2
+MANIFEST_FIELDS = ["format", "width", "path"]
+STATE_VERSION = 1
+
+
+def rendition_settings(formats: tuple) -> dict:
+    """Settings that change rendition output; a change re-encodes every card."""
+    return {
+        "widths": list(WIDTHS),
+        "formats": {name: FORMATS[name] for name in formats},
+    }
+
+
+def list_sources(images_dir: Path = IMAGES_DIR) -> list[tuple[str, str, Path]]:
+    """Return sorted (character, card, path) for every card image."""
+    sources = []
+    with os.scandir(images_dir) as entries:
+        folders = [e for e in entries if e.is_dir() and e.name not in EXCLUDED_FOLDERS]
+    for folder in folders:
+        with os.scandir(folder.path) as files:
+            for f in files:
+                stem, ext = os.path.splitext(f.name)
+                if f.is_file() and ext.lower() in SOURCE_EXTENSIONS:
+                    sources.append((folder.name, stem, Path(f.path)))
+    return sorted(sources)
+
+
+def encode_card(character: str, card: str, source: str, formats: tuple,
+                output_dir: str = str(RENDITIONS_DIR)) -> list[dict]:
+    """
+    Write every rendition of one card image.
+
+    Args:
+        character: Character folder name
+        card: Card filename stem
+        source: Source image path
+        formats: Names from FORMATS, preferred first
+        output_dir: Renditions root
+
+    Returns:
+        [{"format", "width", "height", "bytes", "path"}], path relative to output_dir,
+        grouped by format and ordered by width
+    """
+    renditions = []
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        for format_name in formats:
+            for width in sorted({min(w, img.width) for w in WIDTHS}):
+                height = round(img.height * width / img.width)
+                resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+
+                buffer = io.BytesIO()
+                resized.save(buffer, format_name.upper(), **FORMATS[format_name])
+                data = buffer.getvalue()
+
+                digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+                rel_path = f"{character}/{card}-{width}w.{digest}.{format_name}"
+                path = Path(output_dir) / rel_path
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_name(path.name + ".part")
+                    tmp_path.write_bytes(data)
+                    os.replace(tmp_path, path)
+
+                renditions.append({"format": format_name, "width": width, "height": height,
+                                   "bytes": len(data), "path": rel_path})
+    return renditions
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def runtime_manifest(cards: dict) -> dict:
+    """The extension's manifest: only what content.js reads of each rendition."""
+    return {
+        "version": MANIFEST_VERSION,
+        "fields": MANIFEST_FIELDS,
+        "cards": {key: [[r[field] for field in MANIFEST_FIELDS] for r in entry["renditions"]]
+                  for key, entry in sorted(cards.items())},
+    }
+
+
+def prune_renditions(output_dir: Path, keep: set) -> int:
+    """Delete rendition files that no card references any more; returns how many.
+
+    Top-level EXCLUDED_FOLDERS are left alone (renditions/Items/ holds item_atlas.py's sheets).
+    """
+    removed = 0
+    for root, dirs, files in os.walk(output_dir):
+        if Path(root) == output_dir:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_FOLDERS]
+        for name in files:
+            path = Path(root) / name
+            if path.relative_to(output_dir).as_posix() not in keep:
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def build_renditions(images_dir: Path = IMAGES_DIR, output_dir: Path = RENDITIONS_DIR,
+                     manifest_file: Path = RENDITIONS_MANIFEST, state_file: Path = RENDITIONS_STATE,
+                     formats: tuple = DEFAULT_FORMATS, workers: int = None, force: bool = False) -> dict:
+    """
+    Bring output_dir, manifest_file and state_file up to date with images_dir.
+
+    Args:
+        images_dir: Directory holding one folder per character
+        output_dir: Renditions root
+        manifest_file: Where to write the extension's renditions manifest
+        state_file: Where to keep the build state
+        formats: Names from FORMATS, preferred first
+        workers: Encoder processes (default: all cores)
+        force: Re-encode every card even if nothing changed
+
+    Returns:
+        The extension's manifest
+    """
+    settings = rendition_settings(formats)
+    previous = load_manifest(state_file)
+    if not previous and load_manifest(manifest_file).get("version") == 1:
+        # Version 1 manifests held the build state themselves
+        previous = load_manifest(manifest_file)
+    previous_cards = previous.get("cards", {}) if previous.get("settings") == settings and not force else {}
+    # Source hashes stay valid across settings changes; only re-hash files whose size or mtime changed
+    known = previous.get("cards", {})
+
+    cards = {}
+    todo = []
+    for character, card, source in list_sources(images_dir):
+        key = f"{character}/{card}"
+        st = source.stat()
+        known_entry = known.get(key)
+        if known_entry and known_entry.get("size") == st.st_size and known_entry.get("mtime_ns") == st.st_mtime_ns:
+            sha256 = known_entry["source_sha256"]
+        else:
+            sha256 = file_sha256(source)
+            metrics.count("sources.hashed")
+        entry = previous_cards.get(key)
+        if (entry and entry["source_sha256"] == sha256
+                and all((output_dir / r["path"]).exists() for r in entry["renditions"])):
+            cards[key] = entry
+        else:
+            cards[key] = {"source_sha256": sha256, "renditions": []}
+            todo.append((character, card, source))
+        cards[key].update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+    metrics.count("cards", len(cards))
+    metrics.count("cards.encoded", len(todo))
+    print(f"{len(cards)} card(s), {len(todo)} to encode ({', '.join(formats)} at {list(WIDTHS)}px)")
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (f"{character}/{card}", executor.submit(encode_card, character, card, str(source), formats,
+                                                        str(output_dir)))
+                for character, card, source in todo
+            ]
+            for key, future in futures:
+                cards[key]["renditions"] = future.result()
+                print(f"  Encoded: {key}")
+
+    state = {"version": STATE_VERSION, "settings": settings, "cards": dict(sorted(cards.items()))}
+    manifest = runtime_manifest(cards)
+    keep = {r["path"] for entry in cards.values() for r in entry["renditions"]}
+    removed = prune_renditions(output_dir, keep) if output_dir.exists() else 0
+
+    source_bytes = sum(entry["size"] for entry in cards.values())
+    smallest = sum(min(r["bytes"] for r in entry["renditions"]) for entry in cards.values() if entry["renditions"])
+    largest = sum(max(r["bytes"] for r in entry["renditions"]) for entry in cards.values() if entry["renditions"])
+    print(f"Sources {source_bytes / 1e6:.1f} MB; renditions {smallest / 1e6:.1f} MB smallest, "
+          f"{largest / 1e6:.1f} MB largest; {removed} stale file(s) removed")
+
+    write_if_changed(state_file, json.dumps(state, separators=(",", ":")))
+    text = json.dumps(manifest, separators=(",", ":"))
+    status = "Wrote" if write_if_changed(manifest_file, text) else "Unchanged"
+    print(f"  {status}: {manifest_file} ({len(text.encode()) / 1e3:.0f} KB)")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build WebP/AVIF card renditions with content-hashed names")
+    parser.add_argument("--avif", action="store_true", help="Also encode AVIF (preferred by the extension when present)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Encoder processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="Re-encode every card")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    formats = ("avif", "webp") if args.avif else DEFAULT_FORMATS
+    metrics.run(build_renditions, args, formats=formats, workers=args.workers, force=args.force)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark item_scraper against a locally served copy of the shop page.
+
+Builds a shop page from extension/itemcards.json (one div.overlay-card per
+item, pointing at images/Items/), serves it with the repo's images from
+localhost, and times:
+- card extraction: per-element Playwright calls vs one page.evaluate
+- image downloads: sequential page.request.get vs the concurrent downloader
+"""
+
+import argparse
+import asyncio
+import functools
+import html
+import http.server
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+import item_scraper
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+
+
+def build_shop_page(itemcards_path: Path) -> str:
+    """Render a shop page fixture with the same markup the scraper reads."""
+    data = json.loads(itemcards_path.read_text(encoding="utf-8"))
+    icons = data["equip_slot_icons"]
+    cards = []
+    for item in data["items"]:
+        icon = icons[item["equip_slot_icon"]] if item.get("equip_slot_icon") is not None else ""
+        cards.append(
+            '<div class="overlay-card">'
+            f'<svg class="fs_image item" viewBox="0 0 400 600"><g><image width="400" height="600" href="/{html.escape(item["local_image"])}"></image></g></svg>'
+            f'<p class="name">{html.escape(item["name"])}</p>'
+            f'<p class="cost">{html.escape(item["cost"])}</p>'
+            f'<p class="code">{html.escape(item["code"])}</p>'
+            f'<div class="overlay icon equip-slot"><svg class="icon small">{icon}</svg></div>'
+            '</div>'
+        )
+    return "<!DOCTYPE html><html><body>" + "\n".join(cards) + "</body></html>"
+
+
+class ShopHandler(http.server.SimpleHTTPRequestHandler):
+    page = b""
+
+    def do_GET(self):
+        if self.path == "/shop.html":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(self.page)))
+            self.end_headers()
+            self.wfile.write(self.page)
+        else:
+            super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def extract_per_element(page) -> list[dict]:
+    """The previous extraction: several awaited round trips per card."""
+    results = []
+    for card in await page.query_selector_all("div.overlay-card"):
+        name_elem = await card.query_selector("p.name")
+        cost_elem = await card.query_selector("p.cost")
+        code_elem = await card.query_selector("p.code")
+        equip_slot_elem = await card.query_selector("div.equip-slot svg.icon > svg")
+        image_elem = await card.query_selector("svg.fs_image image")
+        results.append({
+            "name": await name_elem.inner_text() if name_elem else None,
+            "cost": await cost_elem.inner_text() if cost_elem else None,
+            "code": await code_elem.inner_text() if code_elem else None,
+            "equip_slot_svg": await equip_slot_elem.evaluate("el => el.outerHTML") if equip_slot_elem else None,
+            "image_href": await image_elem.get_attribute("href") if image_elem else None,
+        })
+    return results
+
+
+async def download_sequential(page, items: list[dict], output_dir: Path) -> None:
+    """The previous download loop: one awaited page.request.get per image."""
+    for item in items:
+        response = await page.request.get(item["image_url"])
+        (output_dir / Path(item["local_image"]).name).write_bytes(await response.body())
+
+
+async def bench(base_url: str, concurrency: int) -> None:
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(f"{base_url}/shop.html", wait_until="networkidle")
+
+        start = time.perf_counter()
+        old_cards = await extract_per_element(page)
+        old_extract = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cards = await page.eval_on_selector_all("div.overlay-card", item_scraper.EXTRACT_CARDS_JS)
+        new_extract = time.perf_counter() - start
+
+        assert len(cards) == len(old_cards)
+        items = [item for i, card in enumerate(cards) if (item := item_scraper.build_item(i, card, base_url))]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            await download_sequential(page, items, Path(tmp))
+            old_download = time.perf_counter() - start
+        await browser.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        await item_scraper.download_images(items, Path(tmp), concurrency)
+        new_download = time.perf_counter() - start
+
+    print(f"\n{len(cards)} cards, {len(items)} images")
+    print(f"{'extract, per-element calls':<32} {old_extract:>7.3f}s")
+    print(f"{'extract, one page.evaluate':<32} {new_extract:>7.3f}s")
+    print(f"{'download, sequential':<32} {old_download:>7.3f}s")
+    print(f"{f'download, {concurrency} concurrent':<32} {new_download:>7.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark item scraping against a local shop page")
+    parser.add_argument("--concurrency", type=int, default=item_scraper.DOWNLOAD_CONCURRENCY)
+    args = parser.parse_args()
+
+    ShopHandler.page = build_shop_page(REPO_ROOT / "extension" / "itemcards.json").encode()
+    handler = functools.partial(ShopHandler, directory=str(REPO_ROOT))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        asyncio.run(bench(f"http://127.0.0.1:{server.server_address[1]}", args.concurrency))
+    finally:
+        server.shutdown()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Pack the item card images into a few sprite sheets (atlases) of thumbnails.
+
+Each images/Items/*.webp listed in extension/itemcards.json is resized to
+the thumbnail width, and items are grouped by equip slot. Every group is
+shelf-packed into one or more sheets of at most MAX_SHEET_SIZE pixels,
+written next to the card renditions with a content hash in the name, so
+they can be cached forever:
+
+    renditions/Items/slot-2-0.1a2b3c4d5e.webp
+
+extension/item-atlas.json records every sheet's size and each item's
+rectangle in it:
+
+    {"version", "settings", "sheets": [{"name", "path", "width", "height", "bytes",
+                                        "inputs", "items": {local_image: [x, y, w, h]}}]}
+
+item_manifest.py copies the rectangles into itemcards.min.json, so an item
+grid can draw every item from a handful of cached files.
+
+The sheets and item-atlas.json are build output (refresh.py's item-atlas
+stage) and are not committed: they are rebuilt from whatever images/Items
+holds locally.
+
+Builds are deterministic: groups, item order and placements depend only on
+the manifest and the image sizes. A sheet is only re-encoded when its
+members, their content or the settings changed ("inputs" hash), or its file
+has gone missing.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from item_manifest import ATLAS_FILE, DEBUG_MANIFEST, icon_symbols
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+from card_manifest import REPO_ROOT, write_if_changed
+from file_hash import file_sha256
+from image_renditions import FORMATS, HASH_LENGTH, RENDITIONS_DIR, load_manifest, prune_renditions
+
+ATLAS_DIR = "Items"  # under RENDITIONS_DIR
+DEFAULT_THUMB_WIDTH = 120
+MAX_SHEET_SIZE = 2048
+ATLAS_VERSION = 1
+NO_SLOT = "slot-none"
+
+
+def atlas_settings(thumb_width: int, max_sheet_size: int) -> dict:
+    """Settings that change sheet output; a change re-encodes every sheet."""
+    return {"thumb_width": thumb_width, "max_sheet_size": max_sheet_size, "webp": FORMATS["webp"]}
+
+
+def thumb_size(size: tuple, thumb_width: int) -> tuple:
+    """(width, height) of a thumbnail of an image of size, never upscaled."""
+    width = min(thumb_width, size[0])
+    return width, max(1, round(size[1] * width / size[0]))
+
+
+def pack_shelves(sizes: list[tuple], max_size: int) -> list[tuple]:
+    """
+    Shelf-pack rectangles into as few sheets of at most max_size x max_size as possible.
+
+    Rectangles are placed tallest first (ties keep their input order) on
+    left-to-right shelves. The sheet width is chosen so a full sheet comes
+    out roughly square.
+
+    Args:
+        sizes: (width, height) of each rectangle
+        max_size: Largest sheet width and height
+
+    Returns:
+        (sheet, x, y) for each rectangle, in input order
+    """
+    if not sizes:
+        return []
+    if any(w > max_size or h > max_size for w, h in sizes):
+        raise ValueError(f"a thumbnail is larger than the {max_size}px sheet size")
+    area = sum(w * h for w, h in sizes)
+    width = min(max_size, max(max(w for w, _ in sizes), math.ceil(math.sqrt(area))))
+
+    placements = [None] * len(sizes)
+    sheet = x = y = shelf_height = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + h > max_size:
+            sheet, x, y, shelf_height = sheet + 1, 0, 0, 0
+        placements[i] = (sheet, x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return placements
+
+
+def plan_sheets(items: list[dict], thumb_width: int, max_sheet_size: int) -> list[dict]:
+    """
+    Group items by equip slot and pack each group.
+
+    Args:
+        items: Items of itemcards.json that have a local_image on disk
+        thumb_width: Thumbnail width in pixels
+        max_sheet_size: Largest sheet width and height
+
+    Returns:
+        [{"name", "width", "height", "members": [(local_image, [x, y, w, h])]}], sorted by name
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item["slot"], []).append(item)
+
+    sheets = []
+    for slot, members in sorted(groups.items()):
+        members.sort(key=lambda item: (int(item["code"]) if item["code"].isdigit() else math.inf,
+                                       item["code"], item["local_image"]))
+        sizes = [thumb_size(item["size"], thumb_width) for item in members]
+        by_sheet = {}
+        for item, size, (sheet, x, y) in zip(members, sizes, pack_shelves(sizes, max_sheet_size)):
+            by_sheet.setdefault(sheet, []).append((item["local_image"], [x, y, *size]))
+        for sheet, placed in sorted(by_sheet.items()):
+            sheets.append({
+                "name": f"{slot}-{sheet}",
+                "width": max(x + w for _, (x, _, w, _) in placed),
+                "height": max(y + h for _, (_, y, _, h) in placed),
+                "members": placed,
+            })
+    return sheets
+
+
+def render_sheet(sheet: dict, output_dir: Path) -> tuple[str, int]:
+    """
+    Draw and encode one sheet.
+
+    Returns:
+        (path relative to output_dir, bytes)
+    """
+    canvas = Image.new("RGB", (sheet["width"], sheet["height"]))
+    for local_image, (x, y, w, h) in sheet["members"]:
+        with Image.open(REPO_ROOT / local_image) as img:
+            canvas.paste(img.convert("RGB").resize((w, h), Image.LANCZOS), (x, y))
+
+    buffer = io.BytesIO()
+    canvas.save(buffer, "WEBP", **FORMATS["webp"])
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    rel_path = f"{ATLAS_DIR}/{sheet['name']}.{digest}.webp"
+    path = output_dir / rel_path
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    return rel_path, len(data)
+
+
+def load_items(debug_manifest: Path = DEBUG_MANIFEST) -> list[dict]:
+    """Items with an image on disk, with their equip slot symbol and image size."""
+    with open(debug_manifest, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    symbols = icon_symbols(data.get("equip_slot_icons", []))
+
+    items = []
+    for item in data.get("items", []):
+        local_image = item.get("local_image")
+        if not local_image or not (REPO_ROOT / local_image).exists():
+            print(f"  {item.get('name')}: no local image, skipped")
+            continue
+        with Image.open(REPO_ROOT / local_image) as img:
+            size = img.size
+        slot = symbols.get(item.get("equip_slot_icon"), NO_SLOT)
+        items.append({"local_image": local_image, "code": str(item.get("code", "")), "slot": slot, "size": size})
+    return items
+
+
+def build_atlas(debug_manifest: Path = DEBUG_MANIFEST, output_dir: Path = RENDITIONS_DIR,
+                atlas_file: Path = ATLAS_FILE, thumb_width: int = DEFAULT_THUMB_WIDTH,
+                max_sheet_size: int = MAX_SHEET_SIZE, force: bool = False) -> dict:
+    """
+    Bring the item sheets and atlas_file up to date with the item manifest.
+
+    Args:
+        debug_manifest: itemcards.json
+        output_dir: Renditions root; sheets go to its Items/ folder
+        atlas_file: Where to write the atlas index
+        thumb_width: Thumbnail width in pixels
+        max_sheet_size: Largest sheet width and height
+        force: Re-encode every sheet
+
+    Returns:
+        The atlas index
+    """
+    settings = atlas_settings(thumb_width, max_sheet_size)
+    previous = load_manifest(atlas_file)
+    previous_sheets = {sheet["name"]: sheet for sheet in previous.get("sheets", [])
+                       if previous.get("settings") == settings and not force}
+
+    items = load_items(debug_manifest)
+    hashes = {item["local_image"]: file_sha256(REPO_ROOT / item["local_image"]) for item in items}
+
+    sheets = []
+    encoded = 0
+    for plan in plan_sheets(items, thumb_width, max_sheet_size):
+        inputs = hashlib.sha256(json.dumps(
+            [settings, [(image, hashes[image], rect) for image, rect in plan["members"]]]
+        ).encode()).hexdigest()[:16]
+        entry = previous_sheets.get(plan["name"])
+        if not (entry and entry["inputs"] == inputs and (output_dir / entry["path"]).exists()):
+            with metrics.span("sheet"):
+                path, size = render_sheet(plan, output_dir)
+            entry = {"name": plan["name"], "path": path, "width": plan["width"], "height": plan["height"],
+                     "bytes": size, "inputs": inputs, "items": dict(plan["members"])}
+            encoded += 1
+            metrics.count("sheets.encoded")
+            print(f"  Encoded: {path} ({len(plan['members'])} items, {plan['width']}x{plan['height']})")
+        sheets.append(entry)
+
+    atlas = {"version": ATLAS_VERSION, "settings": settings, "sheets": sheets}
+    keep = {sheet["path"] for sheet in sheets}
+    atlas_dir = output_dir / ATLAS_DIR
+    removed = prune_renditions(atlas_dir, {path.split("/", 1)[1] for path in keep}) if atlas_dir.exists() else 0
+
+    source_bytes = sum((REPO_ROOT / image).stat().st_size for image in hashes)
+    print(f"{len(items)} item(s) in {len(sheets)} sheet(s), {encoded} encoded, {len(sheets) - encoded} up to date; "
+          f"sources {source_bytes / 1e6:.1f} MB, sheets {sum(s['bytes'] for s in sheets) / 1e6:.2f} MB; "
+          f"{removed} stale file(s) removed")
+
+    # One sheet per line keeps the index diffable
+    text = "{\n" + f'"version":{ATLAS_VERSION},\n"settings":{json.dumps(settings)},\n"sheets":[\n'
+    text += ",\n".join(json.dumps(sheet, separators=(",", ":")) for sheet in sheets) + "\n]}\n"
+    status = "Wrote" if write_if_changed(atlas_file, text) else "Unchanged"
+    print(f"  {status}: {atlas_file}")
+    return atlas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack item images into per-equip-slot thumbnail sheets")
+    parser.add_argument("--width", type=int, default=DEFAULT_THUMB_WIDTH,
+                        help=f"Thumbnail width in pixels (default: {DEFAULT_THUMB_WIDTH})")
+    parser.add_argument("--max-sheet", type=int, default=MAX_SHEET_SIZE,
+                        help=f"Largest sheet width/height in pixels (default: {MAX_SHEET_SIZE})")
+    parser.add_argument("--force", action="store_true", help="Re-encode every sheet")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(build_atlas, args, thumb_width=args.width, max_sheet_size=args.max_sheet, force=args.force)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Fill in missing item descriptions in extension/itemcards.json by OCR of the item art.
+
+item_scraper.py only reads name, cost and code from the shop page, so most
+items have an empty "description", and content.js only labels items that
+have one. This crops TEXT_BOX out of each images/Items/*.webp and reads it
+with EasyOCR across a process pool, with the model loaded once per worker.
+
+Results are cached by image content in CACHE_FILE. A stat cache (size,
+mtime) avoids re-hashing unchanged files, and identical images are read
+once, so a warm run over every item takes well under a second.
+
+Descriptions written by hand are never touched: items this fills get
+"description_source": "ocr", and only those (or items without a
+description) are updated on later runs. Blank OCR results leave the item
+as it was. itemcards.min.json is rebuilt afterwards (item_manifest.py).
+Without EasyOCR installed, a run that has images to read exits with an
+error before starting any workers.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from item_manifest import DEBUG_MANIFEST, write_compact
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+from card_manifest import REPO_ROOT, load_stat_cache, write_if_changed
+from file_hash import file_sha256
+
+CACHE_FILE = REPO_ROOT / "images" / "Items" / ".item-descriptions.json"
+OCR_SOURCE = "ocr"
+CACHE_VERSION = 1
+
+# Item art is 400x600; the description is printed on the lower panel. TEXT_BOX is an
+# estimate: images/Items only holds placeholder art so far, so it is unchecked against real cards
+REFERENCE_SIZE = (400, 600)
+TEXT_BOX = (20, 330, 380, 530)  # (left, top, right, bottom)
+CHUNK_SIZE = 8
+
+READER = None
+
+
+def get_reader():
+    global READER
+    if READER is None:
+        import easyocr
+        print("Loading EasyOCR model...")
+        READER = easyocr.Reader(['en'], gpu=False)
+    return READER
+
+
+def description_settings(text_box: tuple = TEXT_BOX) -> dict:
+    """Settings that change OCR output; a change invalidates every cached result."""
+    return {"version": CACHE_VERSION, "reference_size": list(REFERENCE_SIZE), "text_box": list(text_box)}
+
+
+def load_text_crop(image_path: str, text_box: tuple = TEXT_BOX) -> np.ndarray:
+    """The description region of an item image, scaled from REFERENCE_SIZE to the image's size."""
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        scale_x, scale_y = img.width / REFERENCE_SIZE[0], img.height / REFERENCE_SIZE[1]
+        left, top, right, bottom = text_box
+        box = (round(left * scale_x), round(top * scale_y), round(right * scale_x), round(bottom * scale_y))
+        return np.array(img.crop(box))
+
+
+def clean_text(lines: list[str]) -> str:
+    """Join OCR paragraphs into one line of text."""
+    return re.sub(r"\s+", " ", " ".join(lines)).strip()
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Process pool initializer: load the model once per worker."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    get_reader()
+
+
+def _read_chunk(image_paths: list[str], text_box: tuple) -> tuple[list, dict]:
+    """Process pool task: OCR one chunk (None for unreadable files) and hand back this worker's metrics."""
+    reader = get_reader()
+    texts = []
+    for image_path in image_paths:
+        try:
+            with metrics.span("ocr"):
+                crop = load_text_crop(image_path, text_box)
+                texts.append(clean_text(reader.readtext(crop, detail=0, paragraph=True)))
+        except Exception as e:
+            print(f"  Error reading {image_path}: {e}")
+            texts.append(None)
+    return texts, metrics.snapshot(reset=True)
+
+
+def read_descriptions(image_paths: list[str], workers: int = None, text_box: tuple = TEXT_BOX) -> list:
+    """
+    OCR the description region of each image across a process pool.
+
+    Returns:
+        Text per image, in input order ("" if nothing was read, None on errors)
+    """
+    if not image_paths:
+        return []
+    chunks = [image_paths[i:i + CHUNK_SIZE] for i in range(0, len(image_paths), CHUNK_SIZE)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    texts = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(torch_threads,)) as executor:
+        for chunk_texts, worker_metrics in executor.map(_read_chunk, chunks, [text_box] * len(chunks)):
+            metrics.merge(worker_metrics)
+            texts.extend(chunk_texts)
+    return texts
+
+
+def content_hashes(paths: list[Path], stat_cache: dict) -> dict:
+    """
+    sha256 of each path, re-hashing only files whose size or mtime changed.
+
+    stat_cache ({repo-relative path: {"size", "mtime_ns", "sha256"}}) is updated in place.
+    """
+    hashes = {}
+    for path in paths:
+        key = path.relative_to(REPO_ROOT).as_posix()
+        st = path.stat()
+        entry = stat_cache.get(key)
+        if not (entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns):
+            entry = stat_cache[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(path)}
+        hashes[path] = entry["sha256"]
+    return hashes
+
+
+def fill_descriptions(debug_manifest: Path = DEBUG_MANIFEST, cache_file: Path = CACHE_FILE,
+                      workers: int = None, text_box: tuple = TEXT_BOX, rebuild: bool = False) -> dict:
+    """
+    OCR the items that need a description and merge the results into debug_manifest.
+
+    Args:
+        debug_manifest: itemcards.json
+        cache_file: Result cache
+        workers: OCR worker processes (default: all cores)
+        text_box: Description region at REFERENCE_SIZE
+        rebuild: Ignore cached results
+
+    Returns:
+        {"filled", "kept", "blank"} item counts
+    """
+    with open(debug_manifest, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    settings = description_settings(text_box)
+    cache = load_stat_cache(cache_file)
+    results = cache.get("results", {}) if cache.get("settings") == settings and not rebuild else {}
+    files = cache.get("files", {})
+
+    # Hand-written descriptions are final; only empty and OCR-filled ones are (re)read
+    todo = [item for item in data.get("items", [])
+            if (not item.get("description") or item.get("description_source") == OCR_SOURCE)
+            and item.get("local_image") and (REPO_ROOT / item["local_image"]).exists()]
+    kept = sum(1 for item in data.get("items", []) if item.get("description")
+               and item.get("description_source") != OCR_SOURCE)
+
+    hashes = content_hashes(sorted({REPO_ROOT / item["local_image"] for item in todo}), files)
+    misses = {}  # sha256 -> first path with that content
+    for path, sha256 in hashes.items():
+        if sha256 not in results:
+            misses.setdefault(sha256, path)
+    print(f"{len(todo)} item(s) to describe ({kept} hand-written kept): "
+          f"{len(hashes)} image(s), {len(set(hashes.values()))} distinct, {len(misses)} to OCR")
+    metrics.count("descriptions.cache_hits", len(hashes) - len(misses))
+    metrics.count("descriptions.cache_misses", len(misses))
+
+    if misses and importlib.util.find_spec("easyocr") is None:
+        raise SystemExit(f"EasyOCR is not installed (pip install easyocr); {len(misses)} image(s) need OCR, "
+                         f"{debug_manifest} was not changed")
+    if misses:
+        with metrics.span("descriptions.ocr"):
+            texts = read_descriptions([str(path) for path in misses.values()], workers, text_box)
+        for sha256, text in zip(misses, texts):
+            # Failed reads stay uncached so the next run retries them
+            if text is not None:
+                results[sha256] = text
+
+    filled = blank = 0
+    for item in todo:
+        text = results.get(hashes[REPO_ROOT / item["local_image"]])
+        if not text:
+            blank += 1
+            continue
+        if item.get("description") != text:
+            print(f"  [{item['code']}] {item['name']}: {text}")
+        item["description"] = text
+        item["description_source"] = OCR_SOURCE
+        filled += 1
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(cache_file, json.dumps({"settings": settings, "files": files, "results": results}, indent=1))
+    if write_if_changed(debug_manifest, json.dumps(data, indent=2, ensure_ascii=False) + "\n"):
+        print(f"Updated {debug_manifest}")
+        write_compact(debug_manifest)
+    print(f"{filled} item(s) described by OCR, {blank} with no readable text, {kept} hand-written kept")
+    return {"filled": filled, "kept": kept, "blank": blank}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill missing item descriptions in itemcards.json by OCR")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="OCR worker processes (default: all cores)")
+    parser.add_argument("--box", type=int, nargs=4, default=TEXT_BOX, metavar=("LEFT", "TOP", "RIGHT", "BOTTOM"),
+                        help=f"Description region on a {REFERENCE_SIZE[0]}x{REFERENCE_SIZE[1]} card "
+                             f"(default: {' '.join(map(str, TEXT_BOX))})")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore cached OCR results")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(fill_descriptions, args, workers=args.workers, text_box=tuple(args.box), rebuild=args.rebuild)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Build the compact production item manifest from extension/itemcards.json.
+
+itemcards.json stays the pretty, human-editable copy (it carries the manual
+descriptions). From it this writes:
+
+    extension/itemcards.min.json  minified, keyed by the site's image id:
+                                  {"version", "sprite", "items": {"8639": {...}}}
+    extension/equip-slots.svg     every distinct equip-slot icon as a <symbol>
+
+Icons are minified and deduplicated on their normalized form (parsed XML with
+whitespace, namespace declarations and attribute order ignored), so two
+icons that only differ in formatting share one symbol. Items refer to their
+icon by symbol id; ids inside each symbol are prefixed with the symbol id so
+the masks of different icons can't collide once they share a document.
+
+When extension/item-atlas.json exists (item_atlas.py), each item also gets
+"thumb": [sheet, x, y, w, h], indexing the manifest's "sheets" list of
+thumbnail sheets under renditions/.
+"""
+
+import argparse
+import html
+import json
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+DEBUG_MANIFEST = REPO_ROOT / "extension" / "itemcards.json"
+COMPACT_MANIFEST = REPO_ROOT / "extension" / "itemcards.min.json"
+SPRITE_FILE = REPO_ROOT / "extension" / "equip-slots.svg"
+ATLAS_FILE = REPO_ROOT / "extension" / "item-atlas.json"
+
+MANIFEST_VERSION = 1
+IMAGE_ID_RE = re.compile(r"/(\d+)\.image\.webp$")
+SVG_NS = "http://www.w3.org/2000/svg"
+
+
+def image_id(image_url: str):
+    """The site's numeric image id from an item image URL (same regex as content.js)."""
+    match = IMAGE_ID_RE.search(image_url or "")
+    return match.group(1) if match else None
+
+
+def _local(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def _serialize(element, id_prefix: str) -> str:
+    """Minified markup for element, without namespace declarations, attributes sorted."""
+    attributes = []
+    for name, value in sorted(element.attrib.items(), key=lambda item: _local(item[0])):
+        name = _local(name)
+        if id_prefix and name == "id":
+            value = f"{id_prefix}-{value}"
+        elif id_prefix:
+            value = re.sub(r"url\(#([^)]+)\)", rf"url(#{id_prefix}-\1)", value)
+            if name == "href" and value.startswith("#"):
+                value = f"#{id_prefix}-{value[1:]}"
+        attributes.append(f' {name}="{html.escape(value, quote=True)}"')
+
+    text = (element.text or "").strip()
+    children = "".join(_serialize(child, id_prefix) for child in element)
+    tag = _local(element.tag)
+    if not text and not children:
+        return f"<{tag}{''.join(attributes)}/>"
+    return f"<{tag}{''.join(attributes)}>{html.escape(text, quote=False)}{children}</{tag}>"
+
+
+def normalize_svg(svg: str) -> str:
+    """Canonical minified form of an icon, used as its dedupe key."""
+    return _serialize(ET.fromstring(svg), "")
+
+
+def svg_symbol(svg: str, symbol_id: str) -> str:
+    """Turn an <svg> icon into a <symbol> with the same viewBox and prefixed ids."""
+    root = ET.fromstring(svg)
+    view_box = root.get("viewBox")
+    body = "".join(_serialize(child, symbol_id) for child in root)
+    view_box_attr = f' viewBox="{view_box}"' if view_box else ""
+    return f'<symbol id="{symbol_id}"{view_box_attr}>{body}</symbol>'
+
+
+def icon_symbols(icons: list[str]) -> dict:
+    """Debug icon index -> symbol id; icons with the same normalized form share one id."""
+    symbols = {}  # normalized svg -> symbol id
+    symbol_for_icon = {}
+    for i, svg in enumerate(icons):
+        symbol_for_icon[i] = symbols.setdefault(normalize_svg(svg), f"slot-{len(symbols)}")
+    return symbol_for_icon
+
+
+def build_compact(data: dict, sprite_name: str = SPRITE_FILE.name, atlas: dict = None) -> tuple[dict, str]:
+    """
+    Build the compact manifest and the sprite sheet from the debug manifest.
+
+    Args:
+        data: The debug manifest
+        sprite_name: Sprite file name recorded in the manifest
+        atlas: item-atlas.json from item_atlas.py; when given, items get a
+            "thumb": [sheet, x, y, w, h] into the manifest's "sheets"
+
+    Returns:
+        (manifest, sprite_svg)
+    """
+    icons = data.get("equip_slot_icons", [])
+    symbol_for_icon = icon_symbols(icons)
+    sprite_parts = {}  # symbol id -> <symbol>, from the first icon with that id
+    for i, svg in enumerate(icons):
+        if symbol_for_icon[i] not in sprite_parts:
+            sprite_parts[symbol_for_icon[i]] = svg_symbol(svg, symbol_for_icon[i])
+
+    thumbs = {}  # local_image -> [sheet, x, y, w, h]
+    sheets = []
+    for sheet in (atlas or {}).get("sheets", []):
+        for local_image, rect in sheet["items"].items():
+            thumbs[local_image] = [len(sheets), *rect]
+        sheets.append({"path": sheet["path"], "width": sheet["width"], "height": sheet["height"]})
+
+    items = {}
+    for item in data.get("items", []):
+        item_id = image_id(item.get("image_url"))
+        if item_id is None:
+            continue
+        entry = {"name": item["name"], "code": item["code"], "cost": item["cost"]}
+        if item.get("equip_slot_icon") is not None:
+            entry["icon"] = symbol_for_icon[item["equip_slot_icon"]]
+        if item.get("description"):
+            entry["description"] = item["description"]
+        if item.get("local_image") in thumbs:
+            entry["thumb"] = thumbs[item["local_image"]]
+        items[item_id] = entry
+
+    manifest = {"version": MANIFEST_VERSION, "sprite": sprite_name, "items": items}
+    if sheets:
+        manifest["sheets"] = sheets
+    sprite = f'<svg xmlns="{SVG_NS}" style="display:none">{"".join(sprite_parts.values())}</svg>\n'
+    return manifest, sprite
+
+
+def write_compact(debug_manifest: Path = DEBUG_MANIFEST, compact_manifest: Path = COMPACT_MANIFEST,
+                  sprite_file: Path = SPRITE_FILE, atlas_file: Path = ATLAS_FILE) -> dict:
+    """Regenerate the compact manifest and sprite from debug_manifest (and atlas_file, if built)."""
+    with open(debug_manifest, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        with open(atlas_file, "r", encoding="utf-8") as f:
+            atlas = json.load(f)
+    except FileNotFoundError:
+        atlas = None
+
+    manifest, sprite = build_compact(data, sprite_file.name, atlas)
+    compact = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"))
+    compact_manifest.write_text(compact, encoding="utf-8")
+    sprite_file.write_text(sprite, encoding="utf-8")
+
+    print(f"Wrote {len(manifest['items'])} items to {compact_manifest}")
+    print(f"Wrote {sprite.count('<symbol ')} equip slot symbols "
+          f"(from {len(data.get('equip_slot_icons', []))} icons) to {sprite_file}")
+    return manifest
+
+
+def report(debug_manifest: Path = DEBUG_MANIFEST, compact_manifest: Path = COMPACT_MANIFEST,
+           sprite_file: Path = SPRITE_FILE, repeats: int = 200) -> None:
+    """Print the byte size and parse-plus-index time of both formats."""
+    def old_load(text):
+        by_id = {}
+        for item in json.loads(text)["items"]:
+            item_id = image_id(item["image_url"])
+            if item_id:
+                by_id[item_id] = item
+        return by_id
+
+    def new_load(text):
+        return json.loads(text)["items"]
+
+    rows = [
+        ("itemcards.json (pretty + regex index)", debug_manifest.read_text(encoding="utf-8"), old_load),
+        ("itemcards.min.json (keyed by id)", compact_manifest.read_text(encoding="utf-8"), new_load),
+    ]
+    for label, text, load in rows:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            by_id = load(text)
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"{label:<40} {len(text.encode('utf-8')):>7} bytes {elapsed * 1000:>7.3f}ms  ({len(by_id)} items)")
+    print(f"{'equip-slots.svg':<40} {sprite_file.stat().st_size:>7} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build itemcards.min.json and equip-slots.svg from itemcards.json")
+    parser.add_argument("--report", action="store_true", help="Also print size and parse time before/after")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics.run(write_compact, args)
+    if args.report:
+        report()
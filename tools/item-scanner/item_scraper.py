@@ -1,138 +1,434 @@
+import argparse
 import asyncio
+import hashlib
+import html.parser
 import json
+import os
 import re
+import sys
+import time
 from pathlib import Path
+
+import requests
 from playwright.async_api import async_playwright
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import metrics
+import replay_store
+from file_hash import file_sha256
+from item_manifest import write_compact
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "card-scanner"))
+from scraper import create_session, load_download_manifest, save_download_manifest
+
 BASE_URL = "https://gloomhaven.smigiel.us"
 ANON_URL = "https://gloomhaven.smigiel.us/v2/#/c/s/shop-items/?anon=a14207-09530f8a-a011-49fa-9016-861e7e61f1a6"
 REPO_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_DIR = REPO_ROOT / "images" / "Items"
 JSON_OUTPUT = REPO_ROOT / "extension" / "itemcards.json"
 
+DOWNLOAD_CONCURRENCY = 8
+
+# Pulls every card's fields in one round trip instead of ~6 per card
+EXTRACT_CARDS_JS = """
+cards => cards.map(card => {
+    const text = selector => {
+        const el = card.querySelector(selector);
+        return el ? el.innerText : null;
+    };
+    // Equip slot icon SVG content (nested svg inside svg.icon)
+    const equipSlot = card.querySelector("div.equip-slot svg.icon > svg");
+    // Image URL from the image tag inside the SVG
+    const image = card.querySelector("svg.fs_image image");
+    return {
+        name: text("p.name"),
+        cost: text("p.cost"),
+        code: text("p.code"),
+        equip_slot_svg: equipSlot ? equipSlot.outerHTML : null,
+        image_href: image ? image.getAttribute("href") : null,
+    };
+})
+"""
+
+
+class ItemCards(html.parser.HTMLParser):
+    """
+    Extract item cards from saved page HTML the way EXTRACT_CARDS_JS does in the browser.
+
+    Used to replay a recorded shop page (page.content()) without a browser.
+    The equip slot SVG is cut out of the page text as is, so it matches the
+    browser's outerHTML of the same DOM.
+    """
+
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+    FIELDS = ("name", "cost", "code")
+
+    def __init__(self, page: str):
+        super().__init__()
+        self.page = page
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", page)]
+        self.cards = []
+        self.card = None
+        self.open_tags = []  # (tag, classes)
+        self.card_depth = self.field = self.text = self.svg = None
+
+    def position(self) -> int:
+        """Offset of the tag being handled in the page text."""
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def inside(self, tag: str, cls: str) -> bool:
+        return any(t == tag and cls in classes for t, classes in self.open_tags[self.card_depth:])
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        parent = self.open_tags[-1] if self.open_tags else (None, [])
+        if tag not in self.VOID_TAGS:
+            self.open_tags.append((tag, classes))
+        depth = len(self.open_tags)
+
+        if self.card is None:
+            if tag == "div" and "overlay-card" in classes:
+                self.card = {field: None for field in self.FIELDS}
+                self.card.update(equip_slot_svg=None, image_href=None)
+                self.card_depth = depth
+            return
+        field = next((f for f in self.FIELDS if f in classes), None)
+        if tag == "p" and field and self.field is None and self.card[field] is None:
+            self.field, self.text = (field, depth), []
+        elif (tag == "svg" and self.svg is None and self.card["equip_slot_svg"] is None
+              and parent[0] == "svg" and "icon" in parent[1] and self.inside("div", "equip-slot")):
+            self.svg = (self.position(), depth)
+        elif tag == "image" and self.card["image_href"] is None and self.inside("svg", "fs_image"):
+            self.card["image_href"] = attrs.get("href")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS:
+            self.open_tags.pop()
+
+    def handle_endtag(self, tag):
+        # Close back to the matching open tag, finishing whatever it held
+        for i in range(len(self.open_tags) - 1, -1, -1):
+            if self.open_tags[i][0] != tag:
+                continue
+            depth = i + 1
+            if self.svg and depth <= self.svg[1]:
+                if depth == self.svg[1]:
+                    end = self.page.index(">", self.position()) + 1
+                    self.card["equip_slot_svg"] = self.page[self.svg[0]:end]
+                self.svg = None
+            if self.field and depth <= self.field[1]:
+                self.card[self.field[0]] = " ".join("".join(self.text).split())
+                self.field = None
+            if self.card is not None and depth <= self.card_depth:
+                self.cards.append(self.card)
+                self.card = None
+            del self.open_tags[i:]
+            break
+
+    def handle_data(self, data):
+        if self.field:
+            self.text.append(data)
+
+
+def extract_cards_from_html(page: str) -> list[dict]:
+    """Every item card's fields from saved page HTML (see ItemCards)."""
+    parser = ItemCards(page)
+    parser.feed(page)
+    parser.close()
+    return parser.cards
+
+
+def replayed_cards(url: str) -> list[dict]:
+    """
+    Item cards of the recorded shop page, extracted again from the stored HTML.
+
+    A result that differs from the cards recorded at the time is reported
+    (and counted as replay.mismatches), and the recorded cards are used if
+    the extraction finds none. Stores without the page fall back to the
+    recorded cards.
+
+    Raises:
+        ReplayMiss: The page was never recorded
+    """
+    store = replay_store.get_store()
+    recorded = store.get_json(f"cards:{url}")
+    if store.lookup(f"page:{url}") is None:
+        print(f"No page recorded for {url}; using the {len(recorded)} recorded item cards")
+        return recorded
+
+    cards = extract_cards_from_html(store.get_bytes(f"page:{url}").decode("utf-8"))
+    if cards != recorded:
+        changed = sum(1 for card, old in zip(cards, recorded) if card != old)
+        print(f"Replayed extraction found {len(cards)} item cards, {len(recorded)} were recorded "
+              f"({changed} differ)")
+        metrics.count("replay.mismatches")
+    if not cards:
+        cards = recorded
+    print(f"Replayed {len(cards)} item cards for {url}")
+    return cards
+
+
+def build_item(i: int, card: dict, base_url: str = BASE_URL):
+    """Turn one extracted card into an item entry (None if it has no image)."""
+    name = (card["name"] or f"Unknown_{i}").strip()
+    cost = (card["cost"] or "0").strip()
+    code = (card["code"] or str(i)).strip()
+    image_href = card["image_href"]
+    if not image_href:
+        return None
+
+    # Build full URL if relative
+    if image_href.startswith("/"):
+        image_url = base_url + image_href
+    else:
+        image_url = image_href
+
+    # Generate filename from name
+    safe_name = "".join(c if c.isalnum() or c in " -_" else "" for c in name)
+    safe_name = safe_name.replace(" ", "_")
+    ext = Path(image_href).suffix or ".webp"
+    filename = f"{code}_{safe_name}{ext}"
+
+    return {
+        "name": name,
+        "code": code,
+        "cost": cost,
+        "equip_slot_svg": card["equip_slot_svg"],
+        "image_url": image_url,
+        "local_image": f"images/Items/{filename}"
+    }
+
+
+def download_file(session: requests.Session, url: str, filepath: Path, validators: dict = None) -> tuple[str, dict]:
+    """
+    Fetch url into filepath unless the server says the local copy is current.
+
+    With validators from an earlier download and the file still on disk,
+    the GET is conditional (If-None-Match/If-Modified-Since), like
+    scraper.py's download_image. Otherwise the body is streamed to a
+    temporary file and only moved into place when its hash differs from the
+    existing file's.
+
+    Args:
+        session: Shared HTTP session
+        url: Image URL
+        filepath: Destination path
+        validators: Previously recorded {"url", "etag", "last_modified"}, if any
+
+    Returns:
+        (status, validators) where status is "not-modified", "unchanged" or "downloaded"
+    """
+    store = replay_store.get_store()
+    if store.replaying:
+        store.copy_to(f"get:{url}", filepath)
+        return "downloaded", store.lookup(f"get:{url}")["meta"]
+
+    # Recording always fetches the full body so the store holds what the server sent
+    headers = {}
+    if validators and validators.get("url") == url and filepath.exists() and not store.recording:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    tmp_path = filepath.with_name(filepath.name + ".part")
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    with session.get(url, headers=headers, stream=True, timeout=30) as response:
+        if response.status_code == 304:
+            metrics.observe("download.latency_ms", (time.perf_counter() - start) * 1000)
+            return "not-modified", validators
+        response.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for block in response.iter_content(chunk_size=64 * 1024):
+                digest.update(block)
+                f.write(block)
+                metrics.count("download.bytes", len(block))
+        validators = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+    metrics.observe("download.latency_ms", (time.perf_counter() - start) * 1000)
+
+    status = "downloaded"
+    if filepath.exists() and file_sha256(filepath) == digest.hexdigest():
+        os.remove(tmp_path)
+        status = "unchanged"
+    else:
+        os.replace(tmp_path, filepath)
+    if store.recording:
+        store.put_file(f"get:{url}", filepath, validators)
+    return status, validators
+
+
+def carry_over_descriptions(items: list[dict], json_output: Path = JSON_OUTPUT) -> int:
+    """
+    Copy descriptions from the existing itemcards.json onto freshly scraped items.
+
+    The shop page has no descriptions: they are written by hand or filled in
+    by item_descriptions.py, and a re-scrape must not wipe them. Items are
+    matched on their image URL.
+
+    Returns:
+        Number of items that got a description back
+    """
+    try:
+        with open(json_output, "r", encoding="utf-8") as f:
+            previous = {item.get("image_url"): item for item in json.load(f).get("items", [])}
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous = {}
+
+    carried = 0
+    for item in items:
+        old = previous.get(item["image_url"], {})
+        item["description"] = old.get("description", "")
+        if "description_source" in old:
+            item["description_source"] = old["description_source"]
+        carried += bool(item["description"])
+    return carried
+
+
+async def download_images(items: list[dict], output_dir: Path = OUTPUT_DIR,
+                          concurrency: int = DOWNLOAD_CONCURRENCY) -> None:
+    """
+    Download every item image concurrently, at most `concurrency` at a time.
+
+    Uses scraper.py's session (browser headers, retries) and keeps each
+    image's ETag/Last-Modified in output_dir's DOWNLOAD_MANIFEST, so
+    unchanged images are revalidated with a conditional request.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    session = create_session(concurrency)
+    manifest = load_download_manifest(str(output_dir))
+
+    async def download(item: dict) -> str:
+        async with semaphore:
+            filepath = output_dir / Path(item["local_image"]).name
+            try:
+                status, validators = await asyncio.to_thread(download_file, session, item["image_url"], filepath,
+                                                             manifest.get(filepath.name))
+            except Exception as e:
+                print(f"  Error downloading {item['name']}: {e}")
+                return "failed"
+            manifest[filepath.name] = validators
+            return status
+
+    try:
+        with metrics.span("download"):
+            statuses = await asyncio.gather(*(download(item) for item in items))
+    finally:
+        session.close()
+        save_download_manifest(str(output_dir), manifest)
+    for status in statuses:
+        metrics.count(f"download.{status}")
+
+    counts = {status: statuses.count(status) for status in sorted(set(statuses))}
+    print("  " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+
+
+async def extract_cards(url: str) -> list[dict]:
+    """Load the shop page in headless Chromium and extract every item card's fields."""
+    store = replay_store.get_store()
 
-async def scrape_items():
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        
-        print(f"Navigating to {ANON_URL}")
-        await page.goto(ANON_URL, wait_until="networkidle")
-        
-        # Wait for the overlay-card elements to appear
-        print("Waiting for item cards to load...")
-        await page.wait_for_selector("div.overlay-card", timeout=30000)
-        
+        with metrics.span("browser.start"):
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+
+        print(f"Navigating to {url}")
+        with metrics.span("discover.load"):
+            await page.goto(url, wait_until="networkidle")
+
+            # Wait for the overlay-card elements to appear
+            print("Waiting for item cards to load...")
+            await page.wait_for_selector("div.overlay-card", timeout=30000)
+
         # Give extra time for all cards to render
-        await asyncio.sleep(2)
-        
+        with metrics.span("discover.sleep"):
+            await asyncio.sleep(2)
+
         # Extract all item cards
-        cards = await page.query_selector_all("div.overlay-card")
+        with metrics.span("discover.extract"):
+            cards = await page.eval_on_selector_all("div.overlay-card", EXTRACT_CARDS_JS)
         print(f"Found {len(cards)} item cards")
-        
-        items = []
-        for i, card in enumerate(cards):
-            try:
-                # Extract name
-                name_elem = await card.query_selector("p.name")
-                name = await name_elem.inner_text() if name_elem else f"Unknown_{i}"
-                name = name.strip()
-                
-                # Extract cost
-                cost_elem = await card.query_selector("p.cost")
-                cost = await cost_elem.inner_text() if cost_elem else "0"
-                cost = cost.strip()
-                
-                # Extract item code
-                code_elem = await card.query_selector("p.code")
-                code = await code_elem.inner_text() if code_elem else str(i)
-                code = code.strip()
-                
-                # Extract equip slot icon SVG content (nested svg inside svg.icon)
-                equip_slot_elem = await card.query_selector("div.equip-slot svg.icon > svg")
-                equip_slot_svg = None
-                if equip_slot_elem:
-                    equip_slot_svg = await equip_slot_elem.evaluate("el => el.outerHTML")
-                
-                # Extract image URL from the image tag inside the SVG
-                image_elem = await card.query_selector("svg.fs_image image")
-                image_href = await image_elem.get_attribute("href") if image_elem else None
-                
-                if image_href:
-                    # Build full URL if relative
-                    if image_href.startswith("/"):
-                        image_url = BASE_URL + image_href
-                    else:
-                        image_url = image_href
-                    
-                    # Generate filename from name
-                    safe_name = "".join(c if c.isalnum() or c in " -_" else "" for c in name)
-                    safe_name = safe_name.replace(" ", "_")
-                    ext = Path(image_href).suffix or ".webp"
-                    filename = f"{code}_{safe_name}{ext}"
-                    
-                    items.append({
-                        "name": name,
-                        "code": code,
-                        "cost": cost,
-                        "equip_slot_svg": equip_slot_svg,
-                        "image_url": image_url,
-                        "local_image": f"images/Items/{filename}"
-                    })
-                    
-                    print(f"  [{code}] {name} - {cost}g")
-                    
-            except Exception as e:
-                print(f"Error processing card {i}: {e}")
-        
-        # Download images
-        print(f"\nDownloading {len(items)} images...")
-        for item in items:
-            try:
-                response = await page.request.get(item["image_url"])
-                if response.ok:
-                    content = await response.body()
-                    filepath = OUTPUT_DIR / Path(item["local_image"]).name
-                    with open(filepath, "wb") as f:
-                        f.write(content)
-                else:
-                    print(f"  Failed to download {item['name']}: {response.status}")
-            except Exception as e:
-                print(f"  Error downloading {item['name']}: {e}")
-        
+        metrics.count("discover.cards", len(cards))
+
+        if store.recording:
+            store.put_bytes(f"page:{url}", (await page.content()).encode("utf-8"))
+            store.put_json(f"cards:{url}", cards)
+
         await browser.close()
-    
+
+    return cards
+
+
+async def scrape_items(url: str = ANON_URL, base_url: str = BASE_URL, output_dir: Path = OUTPUT_DIR,
+                       json_output: Path = JSON_OUTPUT, concurrency: int = DOWNLOAD_CONCURRENCY):
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Replays never start a browser: the cards are extracted from the stored page
+    if replay_store.get_store().replaying:
+        cards = replayed_cards(url)
+    else:
+        cards = await extract_cards(url)
+
+    items = []
+    for i, card in enumerate(cards):
+        item = build_item(i, card, base_url)
+        if item:
+            items.append(item)
+            print(f"  [{item['code']}] {item['name']} - {item['cost']}g")
+
+    # Download images
+    print(f"\nDownloading {len(items)} images...")
+    await download_images(items, output_dir, concurrency)
+
     # Dedupe equip slot icons and create index
     unique_icons = []
     icon_map = {}  # svg -> index
-    
+
     for item in items:
         svg = item.get("equip_slot_svg")
         if svg and svg not in icon_map:
             icon_map[svg] = len(unique_icons)
             unique_icons.append(svg)
-    
+
     # Replace SVG with index in items
     for item in items:
         svg = item.pop("equip_slot_svg", None)
         item["equip_slot_icon"] = icon_map.get(svg) if svg else None
-    
+
+    carried = carry_over_descriptions(items, json_output)
+
     # Build output with icons array and items
     output = {
         "equip_slot_icons": unique_icons,
         "items": items
     }
-    
+
     # Save JSON
-    with open(JSON_OUTPUT, "w", encoding="utf-8") as f:
+    with open(json_output, "w", encoding="utf-8") as f:
         json.dump(output, f, indent=2, ensure_ascii=False)
-    
+        f.write("\n")
+
     print(f"\nFound {len(unique_icons)} unique equip slot icons")
-    print(f"Saved {len(items)} items to {JSON_OUTPUT}")
-    print(f"Images saved to {OUTPUT_DIR}")
+    print(f"Kept {carried} existing item descriptions")
+    print(f"Saved {len(items)} items to {json_output}")
+    write_compact(json_output)
+    print(f"Images saved to {output_dir}")
 
 
 if __name__ == "__main__":
-    asyncio.run(scrape_items())
+    parser = argparse.ArgumentParser(description="Scrape item cards from the shop page")
+    parser.add_argument("--concurrency", type=int, default=DOWNLOAD_CONCURRENCY,
+                        help=f"Concurrent image downloads (default: {DOWNLOAD_CONCURRENCY})")
+    replay_store.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    replay_store.configure_from_args(args)
+
+    metrics.run(asyncio.run, args, scrape_items(concurrency=args.concurrency))
@@ -0,0 +1,72 @@
+"""
+Replay tests for the item scraper: a shop page recorded into a temporary
+store is extracted again without a browser.
+
+    python -m pytest tools/item-scanner/test_item_scraper_replay.py
+"""
+
+import pytest
+
+from item_scraper import build_item, extract_cards_from_html, replayed_cards
+
+import metrics
+import replay_store
+
+URL = "https://shop.invalid/v2/#/c/s/shop-items/"
+
+SLOT_SVG = '<svg viewBox="0 0 10 10"><path d="M0 0h10v10z"></path></svg>'
+
+# Shaped like page.content() of the shop page: what EXTRACT_CARDS_JS reads, plus some noise
+SHOP_PAGE = f"""<!DOCTYPE html><html><head><title>Shop</title></head><body>
+<div class="equip-slot"><svg class="icon">{SLOT_SVG.replace("M0", "M1")}</svg></div>
+<div class="overlay-card">
+  <div class="equip-slot"><svg class="icon">{SLOT_SVG}</svg></div>
+  <p class="name">Boots of
+    Striding</p><p class="cost">20</p><p class="code">1</p>
+  <svg class="fs_image"><image href="/img/items/boots.webp"></image></svg>
+</div>
+<div class="overlay-card">
+  <p class="name">Minor Healing Potion</p>
+  <p class="cost">10</p>
+  <p class="code">12</p>
+  <svg class="fs_image"><g><image href="https://cdn.invalid/potion.webp"/></g></svg>
+</div>
+<div class="overlay-card"><p class="name">No Image</p></div>
+</body></html>
+"""
+
+EXPECTED = [
+    {"name": "Boots of Striding", "cost": "20", "code": "1", "equip_slot_svg": SLOT_SVG,
+     "image_href": "/img/items/boots.webp"},
+    {"name": "Minor Healing Potion", "cost": "10", "code": "12", "equip_slot_svg": None,
+     "image_href": "https://cdn.invalid/potion.webp"},
+    {"name": "No Image", "cost": None, "code": None, "equip_slot_svg": None, "image_href": None},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Switch the process-wide replay store (in tmp_path) between modes; off again afterwards."""
+    yield lambda mode: replay_store.configure(mode, tmp_path)
+    replay_store.configure("off")
+
+
+def test_extract_cards_from_html():
+    assert extract_cards_from_html(SHOP_PAGE) == EXPECTED
+
+
+def test_recorded_page_replays_into_items(store):
+    store("record")
+    replay_store.get_store().put_bytes(f"page:{URL}", SHOP_PAGE.encode("utf-8"))
+    replay_store.get_store().put_json(f"cards:{URL}", EXPECTED)
+
+    store("replay")
+    metrics.snapshot(reset=True)
+    cards = replayed_cards(URL)
+    assert cards == EXPECTED
+    assert "replay.mismatches" not in metrics.snapshot(reset=True)["counters"]
+
+    items = [item for i, card in enumerate(cards) if (item := build_item(i, card, "https://shop.invalid"))]
+    assert [item["image_url"] for item in items] == ["https://shop.invalid/img/items/boots.webp",
+                                                     "https://cdn.invalid/potion.webp"]
+    assert items[0]["local_image"] == "images/Items/1_Boots_of_Striding.webp"
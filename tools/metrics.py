@@ -0,0 +1,209 @@
+"""
+Lightweight stage timing, counters and latency histograms for the tools.
+
+Every tool records into the process-wide registry:
+
+    with metrics.span("download"):         # wall time per stage (summed, counted)
+        ...
+    metrics.count("download.bytes", n)     # counters
+    metrics.gauge("download.images_per_second", rate)
+    metrics.observe("ocr.latency_ms", ms)  # latency histograms
+
+and its CLI gains two flags via add_arguments()/run():
+
+    --metrics out.json   dump every span, counter, gauge and histogram
+    --profile [report]   run under cProfile and write a hotspot report
+                         (sorted by cumulative and by own time)
+
+Worker processes can hand their registry back with snapshot(reset=True) and
+the parent folds it in with merge().
+"""
+
+import cProfile
+import io
+import json
+import math
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds (ms); the last bucket catches everything above
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf)
+DEFAULT_PROFILE_REPORT = "profile.txt"
+PROFILE_LINES = 40
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.spans = {}       # name -> {"seconds", "count"}
+        self.counters = {}    # name -> number
+        self.gauges = {}      # name -> number
+        self.histograms = {}  # name -> list of observed values
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name: str, seconds: float, count: int = 1) -> None:
+        with self.lock:
+            entry = self.spans.setdefault(name, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += count
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            self.histograms.setdefault(name, []).append(value)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """Raw registry contents (picklable); reset=True starts a fresh registry."""
+        with self.lock:
+            snap = {
+                "spans": {k: dict(v) for k, v in self.spans.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {k: list(v) for k, v in self.histograms.items()},
+            }
+            if reset:
+                self.spans, self.counters, self.gauges, self.histograms = {}, {}, {}, {}
+        return snap
+
+    def merge(self, snap: dict) -> None:
+        """Fold in another registry's snapshot (e.g. from a worker process)."""
+        for name, entry in snap["spans"].items():
+            self.add_span(name, entry["seconds"], entry["count"])
+        for name, value in snap["counters"].items():
+            self.count(name, value)
+        with self.lock:
+            self.gauges.update(snap["gauges"])
+            for name, values in snap["histograms"].items():
+                self.histograms.setdefault(name, []).extend(values)
+
+    def summary(self) -> dict:
+        """JSON-able report: spans, counters (with per-second rates), gauges, histograms."""
+        snap = self.snapshot()
+        wall = time.perf_counter() - self.started
+        return {
+            "wall_seconds": wall,
+            "spans": snap["spans"],
+            "counters": {name: {"value": value, "per_second": value / wall if wall else 0.0}
+                         for name, value in sorted(snap["counters"].items())},
+            "gauges": snap["gauges"],
+            "histograms": {name: summarize(values) for name, values in sorted(snap["histograms"].items())},
+        }
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"Metrics written to {path}")
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: list[float]) -> dict:
+    """Count, mean, percentiles and bucket counts of a histogram's values."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    buckets = {}
+    for bound in BUCKETS_MS:
+        key = "inf" if bound == math.inf else str(bound)
+        buckets[key] = sum(1 for v in ordered if v <= bound) - sum(buckets.values())
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": percentile(ordered, 0.5),
+        "p90": percentile(ordered, 0.9),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+        "buckets_le": {k: n for k, n in buckets.items() if n},
+    }
+
+
+# The registry every tool in this process records into
+METRICS = Metrics()
+
+
+def span(name: str):
+    return METRICS.span(name)
+
+
+def add_span(name: str, seconds: float, count: int = 1) -> None:
+    METRICS.add_span(name, seconds, count)
+
+
+def count(name: str, value: float = 1) -> None:
+    METRICS.count(name, value)
+
+
+def gauge(name: str, value: float) -> None:
+    METRICS.gauge(name, value)
+
+
+def observe(name: str, value: float) -> None:
+    METRICS.observe(name, value)
+
+
+def snapshot(reset: bool = False) -> dict:
+    return METRICS.snapshot(reset)
+
+
+def merge(snap: dict) -> None:
+    METRICS.merge(snap)
+
+
+def add_arguments(parser) -> None:
+    """Add the shared --metrics/--profile options to an argparse parser."""
+    parser.add_argument("--metrics", metavar="OUT.json",
+                        help="Write stage timings, counters and latency histograms to this JSON file")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_REPORT, metavar="REPORT",
+                        help=f"Run under cProfile and write a hotspot report (default: {DEFAULT_PROFILE_REPORT})")
+
+
+def write_profile(profiler: cProfile.Profile, path: str) -> None:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    for key in ("cumulative", "tottime"):
+        out.write(f"=== Top {PROFILE_LINES} by {key} ===\n")
+        stats.sort_stats(key).print_stats(PROFILE_LINES)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    print(f"Profile written to {path}")
+
+
+def run(main, args, *main_args, **main_kwargs):
+    """
+    Call main(*main_args, **main_kwargs) honouring args.metrics and args.profile.
+
+    The metrics and profile are written even if main raises.
+    """
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        with span("total"):
+            if profiler:
+                return profiler.runcall(main, *main_args, **main_kwargs)
+            return main(*main_args, **main_kwargs)
+    finally:
+        if profiler:
+            write_profile(profiler, args.profile)
+        if args.metrics:
+            METRICS.dump(args.metrics)
+        sys.stdout.flush()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Refresh every generated file in the repo, rerunning only what is stale.
+
+Each step (scrapers, manifest builders, renditions, OCR per character, the
+card browser bundles) is a Stage with declared inputs and outputs, run as
+its own CLI in a subprocess.
+A stage is stale when:
+- it has never run, or an output is missing
+- the content fingerprint of its inputs (including its own scripts and
+  settings) differs from the one recorded after its last successful run
+- it is forced (--force), or it scrapes the network and --scrape was given
+
+Fingerprints hash file contents; a stat cache (size, mtime) in STATE_FILE
+avoids re-reading files that did not change. Stages start as soon as the
+stages they depend on finish, up to --jobs at a time, so the ability card
+and item branches run concurrently, and OCR reruns only for the characters
+whose images changed.
+
+    python refresh.py --dry-run            # show what is stale and why
+    python refresh.py                      # rebuild stale outputs
+    python refresh.py --scrape             # also re-scrape the sites
+    python refresh.py --only ocr:Bruiser   # one stage (prefixes work too)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TOOLS_DIR = REPO_ROOT / "tools"
+SCANNER_DIR = TOOLS_DIR / "card-scanner"
+ITEM_DIR = TOOLS_DIR / "item-scanner"
+IMAGES_DIR = REPO_ROOT / "images"
+BROWSER_DIR = TOOLS_DIR / "card-browser"
+OCR_OUTPUT_DIR = BROWSER_DIR / "data"
+STATE_FILE = REPO_ROOT / ".refresh-state.json"
+
+OCR_ENGINES = ("easyocr", "template", "hybrid")
+DEFAULT_JOBS = 4
+
+sys.path.insert(0, str(SCANNER_DIR))
+from download_all import parse_linksandnames
+from file_hash import file_sha256
+
+
+class Stage:
+    def __init__(self, name: str, command: list[str], inputs: list[Path], outputs: list[Path],
+                 after: tuple = (), network: bool = False):
+        """
+        Args:
+            name: Unique stage name
+            command: Arguments after the Python interpreter
+            inputs: Files or directories whose content the stage reads
+            outputs: Files or directories the stage writes
+            after: Names of stages that must finish first
+            network: Scrapes a website, so its real inputs can't be fingerprinted
+        """
+        self.name = name
+        self.command = [sys.executable] + [str(arg) for arg in command]
+        self.inputs = inputs
+        self.outputs = outputs
+        self.after = after
+        self.network = network
+        self.metrics_file = None
+
+    def settings(self) -> dict:
+        """The command line, repo-relative, as part of the input fingerprint."""
+        return {"command": [Path(arg).relative_to(REPO_ROOT).as_posix() if arg.startswith(str(REPO_ROOT)) else arg
+                            for arg in self.command[1:]]}
+
+
+def _tracked(path: Path) -> bool:
+    # Download manifests, partial files and caches aren't content
+    return not (path.name.startswith(".") or path.name.endswith(".part") or path.name == "__pycache__")
+
+
+class Fingerprinter:
+    """Content hashes of files and directories, with a (size, mtime_ns) cache."""
+
+    def __init__(self, cache: dict):
+        self.cache = cache  # relpath -> [size, mtime_ns, sha256]
+        self.lock = threading.Lock()
+
+    def file_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = path.relative_to(REPO_ROOT).as_posix()
+        with self.lock:
+            cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        sha256 = file_sha256(path)
+        with self.lock:
+            self.cache[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+        return sha256
+
+    def files(self, path: Path) -> list[Path]:
+        if path.is_file():
+            return [path]
+        found = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if _tracked(Path(d)))
+            found.extend(Path(root) / name for name in sorted(names) if _tracked(Path(name)))
+        return found
+
+    def fingerprint(self, paths: list[Path], extra=None) -> str:
+        """Hash of every file under paths (by relative path and content) plus extra."""
+        digest = hashlib.sha256(json.dumps(extra, sort_keys=True).encode())
+        for path in paths:
+            digest.update(path.relative_to(REPO_ROOT).as_posix().encode() + b"\0")
+            if not path.exists():
+                digest.update(b"<missing>\0")
+                continue
+            for f in self.files(path):
+                digest.update(f"{f.relative_to(REPO_ROOT).as_posix()}\0{self.file_hash(f)}\0".encode())
+        return digest.hexdigest()
+
+
+def load_state(path: Path = STATE_FILE) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state: dict, path: Path = STATE_FILE) -> None:
+    tmp_path = path.with_name(path.name + ".part")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def character_folders() -> list[str]:
+    """Characters to OCR: every images/ folder except Items, plus any listed in linksandnames.md."""
+    listed = [folder for folder, _ in parse_linksandnames(SCANNER_DIR / "linksandnames.md")]
+    existing = [p.name for p in IMAGES_DIR.iterdir() if p.is_dir() and p.name != "Items"] if IMAGES_DIR.exists() else []
+    return sorted(set(listed) | set(existing))
+
+
+def build_stages(args) -> list[Stage]:
+    """The pipeline graph for the parsed CLI args."""
+    replay = [f"--{args.replay_mode}"] if args.replay_mode != "off" else []
+    characters = character_folders()
+    listed = [folder for folder, _ in parse_linksandnames(SCANNER_DIR / "linksandnames.md")]
+    ocr_scripts = [SCANNER_DIR / "ocr_scan.py", SCANNER_DIR / "digit_templates.py",
+                   SCANNER_DIR / "digit_templates.npz"]
+
+    stages = [
+        # Ability cards: scrape -> manifest/index, renditions, OCR per character
+        Stage("download-cards",
+              [SCANNER_DIR / "download_all.py", *replay],
+              inputs=[SCANNER_DIR / "download_all.py", SCANNER_DIR / "scraper.py", SCANNER_DIR / "linksandnames.md"],
+              outputs=[IMAGES_DIR / folder for folder in listed],
+              network=True),
+        Stage("cards-manifest",
+              [TOOLS_DIR / "generate-cards-json.py"],
+              inputs=[TOOLS_DIR / "card_manifest.py", *(IMAGES_DIR / c for c in characters)],
+              outputs=[REPO_ROOT / "extension" / "cards.json", REPO_ROOT / "extension" / "cards-index.json"],
+              after=("download-cards",)),
+        Stage("card-renditions",
+              [TOOLS_DIR / "image_renditions.py", *(["--avif"] if args.avif else [])],
+              inputs=[TOOLS_DIR / "image_renditions.py", *(IMAGES_DIR / c for c in characters)],
+              outputs=[REPO_ROOT / "renditions", REPO_ROOT / "extension" / "card-renditions.json",
+                       IMAGES_DIR / ".renditions-cache.json"],
+              after=("download-cards",)),
+        # Items: scrape -> thumbnail atlas -> compact manifest (also rebuilt when itemcards.json is edited by hand)
+        # -> OCR descriptions, last, so missing OCR only fails its own stage
+        Stage("scrape-items",
+              [ITEM_DIR / "item_scraper.py", *replay],
+              inputs=[ITEM_DIR / "item_scraper.py"],
+              outputs=[REPO_ROOT / "extension" / "itemcards.json", IMAGES_DIR / "Items"],
+              network=True),
+        Stage("item-atlas",
+              [ITEM_DIR / "item_atlas.py"],
+              inputs=[ITEM_DIR / "item_atlas.py", REPO_ROOT / "extension" / "itemcards.json", IMAGES_DIR / "Items"],
+              outputs=[REPO_ROOT / "extension" / "item-atlas.json", REPO_ROOT / "renditions" / "Items"],
+              after=("scrape-items",)),
+        Stage("item-manifest",
+              [ITEM_DIR / "item_manifest.py"],
+              inputs=[ITEM_DIR / "item_manifest.py", REPO_ROOT / "extension" / "itemcards.json",
+                      REPO_ROOT / "extension" / "item-atlas.json"],
+              outputs=[REPO_ROOT / "extension" / "itemcards.min.json", REPO_ROOT / "extension" / "equip-slots.svg"],
+              after=("scrape-items", "item-atlas")),
+        # Rewrites itemcards.json and, when it changed, itemcards.min.json itself
+        Stage("item-descriptions",
+              [ITEM_DIR / "item_descriptions.py"],
+              inputs=[ITEM_DIR / "item_descriptions.py", IMAGES_DIR / "Items"],
+              outputs=[REPO_ROOT / "extension" / "itemcards.json"],
+              after=("scrape-items", "item-manifest")),
+    ]
+    for character in characters:
+        output = OCR_OUTPUT_DIR / f"{character}.csv"
+        stages.append(Stage(
+            f"ocr:{character}",
+            [SCANNER_DIR / "ocr_scan.py", Path("images") / character, "-o", output, "--engine", args.ocr_engine],
+            inputs=[*ocr_scripts, IMAGES_DIR / character],
+            outputs=[output],
+            after=("download-cards",),
+        ))
+
+    # Card browser bundles: cards.json + every character's OCR CSV
+    stages.append(Stage(
+        "card-browser-data",
+        [BROWSER_DIR / "build_data.py"],
+        inputs=[BROWSER_DIR / "build_data.py", BROWSER_DIR / "card-data.csv", BROWSER_DIR / "x-cards.csv",
+                REPO_ROOT / "extension" / "cards.json", *(OCR_OUTPUT_DIR / f"{character}.csv" for character in characters)],
+        outputs=[OCR_OUTPUT_DIR / "index.json"],
+        after=("cards-manifest", *(f"ocr:{character}" for character in characters)),
+    ))
+
+    if args.metrics_dir:
+        for stage in stages:
+            name = stage.name.replace(":", "-").replace(" ", "_")
+            stage.metrics_file = Path(args.metrics_dir).resolve() / f"{name}.json"
+    return stages
+
+
+def select(stages: list[Stage], patterns: list[str]) -> list[Stage]:
+    """Stages whose name equals or starts with one of patterns (all when none are given)."""
+    if not patterns:
+        return stages
+    return [s for s in stages if any(s.name == p or s.name.startswith(p) for p in patterns)]
+
+
+def stale_reason(stage: Stage, record: dict, fingerprint: str, force: bool, scrape: bool):
+    """Why stage must run, or None if its outputs are current."""
+    if force:
+        return "forced"
+    missing = [p for p in stage.outputs if not p.exists()]
+    if missing:
+        return f"missing {missing[0].relative_to(REPO_ROOT)}"
+    if stage.network:
+        return "--scrape" if scrape else None
+    if record is None:
+        return "never run"
+    if record["inputs"] != fingerprint:
+        return "inputs changed"
+    return None
+
+
+def run_stage(stage: Stage) -> tuple[int, str, float]:
+    for output in stage.outputs:
+        output.parent.mkdir(parents=True, exist_ok=True)
+    command = stage.command + (["--metrics", str(stage.metrics_file)] if stage.metrics_file else [])
+    start = time.monotonic()
+    result = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.returncode, result.stdout + result.stderr, time.monotonic() - start
+
+
+def refresh(stages: list[Stage], jobs: int = DEFAULT_JOBS, force: bool = False, scrape: bool = False,
+            dry_run: bool = False, verbose: bool = False) -> bool:
+    """
+    Run the stale stages of the graph, dependencies first.
+
+    Stages not in `stages` (filtered out with --only) count as finished.
+
+    Returns:
+        True if no stage failed
+    """
+    state = load_state()
+    records = state.setdefault("stages", {})
+    fingerprinter = Fingerprinter(state.setdefault("files", {}))
+    names = {stage.name for stage in stages}
+    status = {}  # name -> "ran", "fresh", "stale", "failed" or "blocked"
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for stage in list(pending):
+                deps = [d for d in stage.after if d in names]
+                if any(d not in status for d in deps):
+                    continue
+                pending.remove(stage)
+
+                if any(status[d] in ("failed", "blocked") for d in deps):
+                    status[stage.name] = "blocked"
+                    print(f"[{stage.name}] blocked by a failed dependency")
+                    continue
+
+                upstream = [d for d in deps if status[d] == "stale"]
+                fingerprint = fingerprinter.fingerprint(stage.inputs, stage.settings())
+                reason = stale_reason(stage, records.get(stage.name), fingerprint, force, scrape)
+                if dry_run:
+                    if reason is None and upstream:
+                        reason = f"after {upstream[0]}"
+                    status[stage.name] = "stale" if reason else "fresh"
+                    print(f"[{stage.name}] {'would run: ' + reason if reason else 'up to date'}")
+                elif reason is None:
+                    status[stage.name] = "fresh"
+                    print(f"[{stage.name}] up to date")
+                else:
+                    print(f"[{stage.name}] running ({reason})")
+                    running[executor.submit(run_stage, stage)] = (stage, fingerprint)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, fingerprint = running.pop(future)
+                returncode, output, elapsed = future.result()
+                if returncode == 0:
+                    status[stage.name] = "ran"
+                    # Record what the inputs were when the stage started
+                    records[stage.name] = {
+                        "inputs": fingerprint,
+                        "outputs": fingerprinter.fingerprint(stage.outputs),
+                        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "seconds": round(elapsed, 2),
+                    }
+                    save_state(state)
+                    print(f"[{stage.name}] done in {elapsed:.1f}s")
+                    if verbose:
+                        print(output)
+                else:
+                    status[stage.name] = "failed"
+                    print(f"[{stage.name}] FAILED (exit {returncode}) after {elapsed:.1f}s:\n{output}")
+
+    if not dry_run:
+        save_state(state)
+    counts = {s: list(status.values()).count(s) for s in ("ran", "fresh", "stale", "failed", "blocked")}
+    print("\n" + ", ".join(f"{n} {s}" for s, n in counts.items() if n))
+    return counts["failed"] == 0 and counts["blocked"] == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stale generated files (scrapes, manifests, renditions, OCR)")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="Run only these stages (name or prefix, e.g. ocr)")
+    parser.add_argument("--force", action="store_true", help="Rerun the selected stages even if up to date")
+    parser.add_argument("--scrape", action="store_true", help="Re-scrape the card and item sites")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Stages running at once (default: {DEFAULT_JOBS})")
+    parser.add_argument("--ocr-engine", choices=OCR_ENGINES, default="template",
+                        help="ocr_scan.py --engine (default: template, which wrote the committed CSVs)")
+    parser.add_argument("--avif", action="store_true", help="Also build AVIF renditions")
+    parser.add_argument("--metrics-dir", help="Have every stage write --metrics JSON into this directory")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each stage's output")
+    parser.add_argument("--record", action="store_const", dest="replay_mode", const="record",
+                        help="Pass --record to the scrapers")
+    parser.add_argument("--replay", action="store_const", dest="replay_mode", const="replay",
+                        help="Pass --replay to the scrapers (no network)")
+    parser.set_defaults(replay_mode="off")
+
+    args = parser.parse_args()
+
+    if args.metrics_dir:
+        os.makedirs(args.metrics_dir, exist_ok=True)
+    stages = select(build_stages(args), args.only)
+    ok = refresh(stages, args.jobs, args.force, args.scrape, args.dry_run, args.verbose)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,158 @@
+"""
+Record/replay store for the scrapers' network traffic.
+
+Page HTML, discovered URL lists and downloaded image bytes are kept in a
+content-addressed store (default: .replay/ at the repo root):
+
+    objects/<sha256[:2]>/<sha256>   blob contents, stored once per content
+    refs/<sha256(key)[:2]>/<sha256(key)>.json
+                                    {"key", "sha256", "meta"} for each key
+
+Keys name what was fetched, e.g. "page:<url>", "urls:<url>", "get:<url>".
+Replays run the stored pages through the scrapers' extraction code again
+(scraper.replayed_image_urls, item_scraper.replayed_cards); the recorded
+URL and card lists are what that output is checked against.
+
+Modes:
+    off     talk to the network, store nothing (default)
+    record  talk to the network and (re)write every response to the store
+    replay  never touch the network; serve everything from the store and
+            raise ReplayMiss for anything that was not recorded
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from file_hash import file_sha256
+
+REPO_ROOT = Path(__file__).parent.parent
+DEFAULT_STORE = REPO_ROOT / ".replay"
+MODES = ("off", "record", "replay")
+
+
+class ReplayMiss(KeyError):
+    """A replay run asked for something that was never recorded."""
+
+
+class ReplayStore:
+    def __init__(self, root: Path = DEFAULT_STORE, mode: str = "off"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {MODES}")
+        self.root = Path(root)
+        self.mode = mode
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _ref_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / "refs" / digest[:2] / f"{digest}.json"
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _write_ref(self, key: str, sha256: str, meta: dict = None) -> None:
+        ref = {"key": key, "sha256": sha256, "meta": meta or {}}
+        self._write_atomic(self._ref_path(key), json.dumps(ref).encode("utf-8"))
+
+    def lookup(self, key: str):
+        """Return the ref dict for key, or None if it was never recorded."""
+        path = self._ref_path(key)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def object_path(self, key: str) -> Path:
+        """Path of the blob recorded under key; raises ReplayMiss if absent."""
+        ref = self.lookup(key)
+        if ref is None:
+            raise ReplayMiss(key)
+        return self._object_path(ref["sha256"])
+
+    def get_bytes(self, key: str) -> bytes:
+        return self.object_path(key).read_bytes()
+
+    def put_bytes(self, key: str, data: bytes, meta: dict = None) -> str:
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha256)
+        if not path.exists():
+            self._write_atomic(path, data)
+        self._write_ref(key, sha256, meta)
+        return sha256
+
+    def put_file(self, key: str, filepath, meta: dict = None) -> str:
+        """Record a file's contents under key without reading it all into memory."""
+        sha256 = file_sha256(filepath)
+        path = self._object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            os.close(fd)
+            shutil.copyfile(filepath, tmp)
+            os.replace(tmp, path)
+        self._write_ref(key, sha256, meta)
+        return sha256
+
+    def copy_to(self, key: str, filepath) -> None:
+        """Write the blob recorded under key to filepath (atomically)."""
+        source = self.object_path(key)
+        filepath = Path(filepath)
+        tmp = filepath.with_name(filepath.name + ".part")
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, filepath)
+
+    def get_json(self, key: str):
+        return json.loads(self.get_bytes(key))
+
+    def put_json(self, key: str, value, meta: dict = None) -> str:
+        return self.put_bytes(key, json.dumps(value, sort_keys=True).encode("utf-8"), meta)
+
+
+# The store every tool in this process uses; set from --record/--replay
+STORE = ReplayStore()
+
+
+def configure(mode: str = "off", root=DEFAULT_STORE) -> ReplayStore:
+    """Set the process-wide store mode (call once from a tool's CLI)."""
+    global STORE
+    STORE = ReplayStore(root, mode)
+    if mode != "off":
+        print(f"Replay store: {mode} ({STORE.root})")
+    return STORE
+
+
+def get_store() -> ReplayStore:
+    return STORE
+
+
+def add_arguments(parser) -> None:
+    """Add the shared --record/--replay/--replay-store options to an argparse parser."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", action="store_const", dest="replay_mode", const="record",
+                       help="Fetch from the network and refresh the local replay store")
+    group.add_argument("--replay", action="store_const", dest="replay_mode", const="replay",
+                       help="Serve pages, URL lists and images from the replay store only (no network)")
+    parser.add_argument("--replay-store", default=str(DEFAULT_STORE),
+                        help="Replay store directory (default: %(default)s)")
+    parser.set_defaults(replay_mode="off")
+
+
+def configure_from_args(args) -> ReplayStore:
+    return configure(args.replay_mode, args.replay_store)
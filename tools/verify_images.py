@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Verify the image tree and the manifests that point into it.
+
+Problems like truncated downloads or odd-sized cards otherwise only show up
+when ocr_scan.py returns None for a card or the extension shows a broken
+image. This checks, for every file under images/:
+
+- the format, read from the file's header, matches its extension
+- the dimensions, also from the header, have the layout's aspect ratio
+  (ocr_scan.REFERENCE_SIZE for ability cards, ITEM_SIZE for items) and are
+  not smaller than it
+- the file is complete: a JPEG ends with its EOI marker, a PNG with IEND,
+  a WebP's RIFF size matches the file size
+- no partial (.part) downloads are left behind
+
+and cross-checks extension/cards.json (every card must exist as .jpeg) and
+extension/itemcards.json (every local_image must resolve) against the files
+on disk, in both directions.
+
+Only headers and the last few bytes of each file are read, across a thread
+pool, and results are cached by (size, mtime) in CACHE_FILE, so a clean
+tree re-verifies without opening any image. Exits with 1 if any error was
+found.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import metrics
+from card_manifest import IMAGES_DIR, MANIFEST_FILE, REPO_ROOT, load_stat_cache, write_if_changed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "card-scanner"))
+from ocr_scan import REFERENCE_SIZE
+
+ITEMS_FILE = REPO_ROOT / "extension" / "itemcards.json"
+CACHE_FILE = IMAGES_DIR / ".verify-cache.json"
+ITEMS_FOLDER = "Items"
+# Item card art as served by the item site (and drawn by its 400x600 <svg>)
+ITEM_SIZE = (400, 600)
+FORMATS_BY_EXTENSION = {".jpeg": "JPEG", ".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+ASPECT_TOLERANCE = 0.01
+DEFAULT_WORKERS = 16
+CACHE_VERSION = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+# Start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) share the range
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class HeaderError(Exception):
+    pass
+
+
+def jpeg_header(f, size: int) -> tuple[int, int, list[str]]:
+    if f.read(2) != b"\xff\xd8":
+        raise HeaderError("not a JPEG (no SOI marker)")
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise HeaderError("JPEG ends before its frame header")
+        if byte != b"\xff":
+            raise HeaderError("corrupt JPEG marker sequence")
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            raise HeaderError("JPEG ends before its frame header")
+        marker = marker[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers carry no length
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise HeaderError("JPEG ends before its frame header")
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                raise HeaderError("JPEG ends inside its frame header")
+            height, width = struct.unpack(">HH", data[1:5])
+            break
+        f.seek(length - 2, os.SEEK_CUR)
+
+    f.seek(max(0, size - 2))
+    problems = [] if f.read(2) == b"\xff\xd9" else ["truncated: no JPEG EOI marker at the end"]
+    return width, height, problems
+
+
+def png_header(f, size: int) -> tuple[int, int, list[str]]:
+    header = f.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise HeaderError("not a PNG (no signature/IHDR)")
+    width, height = struct.unpack(">II", header[16:24])
+    f.seek(max(0, size - len(PNG_IEND)))
+    problems = [] if f.read(len(PNG_IEND)) == PNG_IEND else ["truncated: no PNG IEND chunk at the end"]
+    return width, height, problems
+
+
+def webp_header(f, size: int) -> tuple[int, int, list[str]]:
+    header = f.read(30)
+    if len(header) < 16 or header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+        raise HeaderError("not a WebP (no RIFF/WEBP header)")
+    riff_size = struct.unpack("<I", header[4:8])[0]
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = (v & 0x3FFF for v in struct.unpack("<HH", header[26:30]))
+    elif chunk == b"VP8L" and header[20] == 0x2F:
+        bits = int.from_bytes(header[21:25], "little")
+        width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+    else:
+        raise HeaderError(f"unsupported WebP chunk {chunk!r}")
+    # The RIFF size counts everything after its own 8 byte header (padded to even)
+    expected = 8 + riff_size + (riff_size & 1)
+    problems = [] if size >= expected else [f"truncated: {size} of {expected} bytes"]
+    return width, height, problems
+
+
+HEADER_READERS = {b"\xff\xd8": ("JPEG", jpeg_header), b"\x89P": ("PNG", png_header), b"RI": ("WEBP", webp_header)}
+
+
+def expected_size(relpath: str):
+    """Reference (width, height) for an image under images/, by folder."""
+    return ITEM_SIZE if Path(relpath).parent.name == ITEMS_FOLDER else REFERENCE_SIZE
+
+
+def check_image(path: str, relpath: str, size: int) -> dict:
+    """
+    Check one image from its header and its last bytes.
+
+    Returns:
+        {"format", "width", "height", "problems": [str]}
+    """
+    result = {"format": None, "width": None, "height": None, "problems": []}
+    problems = result["problems"]
+    if size == 0:
+        problems.append("empty file")
+        return result
+
+    with open(path, "rb") as f:
+        magic = f.read(2)
+        f.seek(0)
+        reader = HEADER_READERS.get(magic)
+        if reader is None:
+            problems.append(f"unknown format (starts with {magic.hex()})")
+            return result
+        result["format"], read_header = reader
+        try:
+            result["width"], result["height"], tail_problems = read_header(f, size)
+        except (HeaderError, struct.error, IndexError) as e:
+            problems.append(str(e))
+            return result
+    problems.extend(tail_problems)
+
+    extension_format = FORMATS_BY_EXTENSION.get(Path(relpath).suffix.lower())
+    if extension_format != result["format"]:
+        problems.append(f"{result['format']} data in a {Path(relpath).suffix} file")
+
+    width, height = result["width"], result["height"]
+    reference = expected_size(relpath)
+    if not width or not height:
+        problems.append(f"invalid dimensions {width}x{height}")
+    elif abs(width / height - reference[0] / reference[1]) > ASPECT_TOLERANCE * reference[0] / reference[1]:
+        problems.append(f"{width}x{height} doesn't have the {reference[0]}x{reference[1]} layout's aspect ratio")
+    elif width < reference[0]:
+        problems.append(f"{width}x{height} is smaller than the {reference[0]}x{reference[1]} layout")
+    return result
+
+
+def list_files(images_dir: Path = IMAGES_DIR) -> list[tuple[str, os.stat_result]]:
+    """(repo-relative path, stat) of every non-hidden file in the folders of images_dir."""
+    found = []
+    with os.scandir(images_dir) as entries:
+        folders = [e for e in entries if e.is_dir()]
+    for folder in folders:
+        with os.scandir(folder.path) as files:
+            for f in files:
+                if f.is_file() and not f.name.startswith("."):
+                    found.append((Path(f.path).relative_to(REPO_ROOT).as_posix(), f.stat()))
+    return sorted(found)
+
+
+def check_manifests(on_disk: set, manifest_file: Path = MANIFEST_FILE, items_file: Path = ITEMS_FILE,
+                    images_dir: Path = IMAGES_DIR) -> tuple[list[str], list[str]]:
+    """
+    Cross-check cards.json and itemcards.json against the files on disk.
+
+    Args:
+        on_disk: Repo-relative paths of every file under images_dir
+
+    Returns:
+        (errors, warnings)
+    """
+    errors, warnings = [], []
+    images_prefix = images_dir.relative_to(REPO_ROOT).as_posix()
+
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        cards = json.load(f)
+    listed = set()
+    for character, names in cards.items():
+        for name in names:
+            # content.js always builds <character>/<name>.jpeg
+            relpath = f"{images_prefix}/{character}/{name}.jpeg"
+            listed.add(relpath)
+            if relpath not in on_disk:
+                errors.append(f"{manifest_file.name}: {relpath} does not exist")
+
+    with open(items_file, "r", encoding="utf-8") as f:
+        items = json.load(f)["items"]
+    for item in items:
+        relpath = item.get("local_image")
+        if not relpath:
+            errors.append(f"{items_file.name}: {item.get('name')} has no local_image")
+            continue
+        listed.add(relpath)
+        if relpath not in on_disk:
+            errors.append(f"{items_file.name}: {relpath} ({item.get('name')}) does not exist")
+
+    for relpath in sorted(on_disk - listed):
+        manifest = items_file.name if Path(relpath).parent.name == ITEMS_FOLDER else manifest_file.name
+        warnings.append(f"{relpath} is not in {manifest}")
+    return errors, warnings
+
+
+def verify(images_dir: Path = IMAGES_DIR, manifest_file: Path = MANIFEST_FILE, items_file: Path = ITEMS_FILE,
+           cache_file: Path = CACHE_FILE, workers: int = DEFAULT_WORKERS, force: bool = False) -> dict:
+    """
+    Check every image and both manifests, reusing cached results of unchanged files.
+
+    Args:
+        images_dir: Directory holding one folder per character (and Items)
+        manifest_file: cards.json
+        items_file: itemcards.json
+        cache_file: Per-file results kept between runs
+        workers: Threads reading headers
+        force: Ignore the cache
+
+    Returns:
+        {"errors": [str], "warnings": [str]}
+    """
+    cache = {} if force else load_stat_cache(cache_file)
+    reference = [list(REFERENCE_SIZE), list(ITEM_SIZE)]
+    if cache.get("version") != CACHE_VERSION or cache.get("reference") != reference:
+        cache = {}
+    cached_files = cache.get("files", {})
+
+    files = list_files(images_dir)
+    results, todo, hits = {}, [], 0
+    for relpath, stat in files:
+        cached = cached_files.get(relpath)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            results[relpath] = cached
+            hits += 1
+        elif relpath.endswith(".part"):
+            results[relpath] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                "problems": ["partial download left behind"]}
+        else:
+            todo.append((relpath, stat))
+
+    metrics.count("verify.files", len(files))
+    metrics.count("verify.checked", len(todo))
+    with metrics.span("verify.headers"), ThreadPoolExecutor(max_workers=workers) as executor:
+        checked = executor.map(lambda entry: check_image(str(REPO_ROOT / entry[0]), entry[0], entry[1].st_size), todo)
+        for (relpath, stat), result in zip(todo, checked):
+            results[relpath] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, **result}
+
+    errors = [f"{relpath}: {problem}" for relpath, result in results.items() for problem in result["problems"]]
+    with metrics.span("verify.manifests"):
+        on_disk = {relpath for relpath in results if not relpath.endswith(".part")}
+        manifest_errors, warnings = check_manifests(on_disk, manifest_file, items_file, images_dir)
+    errors.extend(manifest_errors)
+
+    cache = {"version": CACHE_VERSION, "reference": reference, "files": results}
+    write_if_changed(cache_file, json.dumps(cache))
+
+    for warning in warnings:
+        print(f"  warning: {warning}")
+    for error in errors:
+        print(f"  ERROR: {error}")
+    print(f"{len(files)} file(s), {len(todo)} checked, {hits} cached: "
+          f"{len(errors)} error(s), {len(warnings)} warning(s)")
+    return {"errors": errors, "warnings": warnings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check images/ and the card/item manifests for broken files")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Threads reading headers (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--force", action="store_true", help="Recheck every file, ignoring the cache")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    report = metrics.run(verify, args, workers=args.workers, force=args.force)
+    sys.exit(1 if report["errors"] else 0)